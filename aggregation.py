@@ -0,0 +1,74 @@
+"""aggregation.py: Single pass grouped aggregation used by the Sdc, Plant and RD tables"""
+from dataclasses import dataclass
+import pandas as pd
+from instrumentation import traced
+from process_pool import aggregate_partitioned, pool_workers
+
+
+@dataclass
+class Metric:
+    """
+    One output column of a grouped aggregation.
+
+    how is 'sum' (sum of column), 'count' (non null values of column) or 'nunique'
+    (distinct values of column). mask names a boolean column restricting the rows the
+    metric looks at, e.g. deployed sites.
+    """
+    name: str
+    column: str
+    how: str
+    mask: str = None
+
+
+def masked_values(df: pd.DataFrame, metric: Metric) -> pd.Series:
+    """
+    Blanks out the metric column on rows outside the metric's mask. Every aggregation
+    used here skips nulls, so masked rows drop out of the result.
+
+    returns: pd.Series
+    """
+    values: pd.Series = df[metric.column]
+    if metric.mask:
+        values = values.where(df[metric.mask].fillna(False).astype(bool))
+    return values
+
+
+def plain_groups(df: pd.DataFrame, columns) -> pd.DataFrame:
+    """
+    Turns categorical group columns of a result back into their values' dtype, so the
+    tables come out the same whether or not the DataContext compacts the frames
+
+    returns: pd.DataFrame
+    """
+    plain: dict = {column: df[column].astype(df[column].cat.categories.dtype)
+                   for column in columns if isinstance(df[column].dtype, pd.CategoricalDtype)}
+    return df.assign(**plain) if plain else df
+
+
+@traced('aggregate')
+def aggregate(df: pd.DataFrame, by: str, metrics: list) -> pd.DataFrame:
+    """
+    Computes every metric in one groupby pass. Masked columns are precomputed so all
+    metrics can be expressed as a single named aggregation.
+
+    Large frames are aggregated on the process pool when the DataContext enables it,
+    partitioned by fdbid when the distinct counts allow it, by group otherwise.
+
+    returns: pd.DataFrame with the by column and one column per metric
+    """
+    columns: dict = {by: df[by].array}
+    named: dict = {}
+    for position, metric in enumerate(metrics):
+        column = f'_metric_{position}'
+        columns[column] = masked_values(df, metric).array
+        named[metric.name] = (column, metric.how)
+    work = pd.DataFrame(columns)
+    workers = pool_workers(len(work))
+    if workers:
+        by_key = 'fdbid' in df.columns and all(
+            metric.column == 'fdbid' for metric in metrics if metric.how == 'nunique')
+        result = aggregate_partitioned(work, by, named, workers,
+                                       key=df['fdbid'] if by_key else None)
+    else:
+        result = work.groupby(by, observed=True).agg(**named).reset_index()
+    return plain_groups(result, [by])
@@ -0,0 +1,186 @@
+"""backfill.py: Reruns the SDC and Plant status reports over the dated history of the share files"""
+import argparse
+import re
+import time
+from bisect import bisect_right
+from datetime import datetime
+import pandas as pd
+from data_context import DataContext, get_context, set_context
+from history_store import long_rows
+from instrumentation import traced
+from plants import Plant
+from process_pool import get_pool
+from report_runner import REPORT_COLUMNS
+from sdc_class import Sdc
+from server_class import Server
+
+# Dates written into the share file names, e.g. Comcast_site_tracking_2025-06-01.csv
+FILE_DATE_PATTERN = re.compile(r'(20\d{2})[-_.]?(\d{2})[-_.]?(\d{2})')
+# Frames of the DataContext that depend on the share files of a snapshot
+SHARE_FRAMES = ('sdc_site_tracking', 'msp_plants')
+
+
+def file_date(path, mtime: float) -> pd.Timestamp:
+    """
+    returns: pd.Timestamp of the date in the file name, of the mtime when it has none
+    """
+    match = FILE_DATE_PATTERN.search(str(path.name))
+    if match:
+        try:
+            return pd.Timestamp(datetime(*map(int, match.groups())))
+        except ValueError:
+            pass
+    return pd.Timestamp(datetime.fromtimestamp(mtime).date())
+
+
+def share_history(index, prefixes) -> dict:
+    """
+    Lists every dated version of each prefix's file from one listing of the share
+
+    returns: dict of prefix to a list of (pd.Timestamp, Path), oldest first
+    """
+    return {prefix: sorted((file_date(path, mtime), path) for path, mtime in index.files(prefix))
+            for prefix in prefixes}
+
+
+def snapshots(history: dict, freq: str = None, start=None, end=None) -> list:
+    """
+    Builds as-of snapshots: for each as-of date every prefix takes its newest file dated
+    on or before it. As-of dates are every date a file changed, or the period ends of
+    freq (e.g. 'W' for weekly). Dates before every prefix has a file are skipped, so
+    each snapshot has a complete set of files.
+
+    returns: list of (pd.Timestamp as-of date, dict of prefix to Path), oldest first
+    """
+    if not history or any(not versions for versions in history.values()):
+        return []
+    first = max(versions[0][0] for versions in history.values())
+    last = max(versions[-1][0] for versions in history.values())
+    start = max(first, pd.Timestamp(start)) if start is not None else first
+    end = min(last, pd.Timestamp(end)) if end is not None else last
+    if freq:
+        as_of_dates = list(pd.date_range(start, end, freq=freq))
+    else:
+        as_of_dates = sorted({date for versions in history.values() for date, _ in versions
+                              if start <= date <= end} | {start})
+    dates: dict = {prefix: [date for date, _ in versions] for prefix, versions in history.items()}
+    result: list = []
+    for as_of in as_of_dates:
+        files = {prefix: versions[bisect_right(dates[prefix], as_of) - 1][1]
+                 for prefix, versions in history.items()}
+        result.append((as_of, files))
+    return result
+
+
+class SnapshotIndex:
+    """
+    Stands in for the DataContext's ShareIndex so Server reads the files of one snapshot
+    as if they were the newest on the share
+    """
+    def __init__(self, files: dict) -> None:
+        self.snapshot_files: dict = files
+
+    def files(self, prefix: str) -> list:
+        path = self.snapshot_files.get(prefix)
+        return [(path, 0.0)] if path is not None else []
+
+    def latest(self, prefix: str):
+        return self.snapshot_files.get(prefix)
+
+    def latest_many(self, prefixes) -> dict:
+        return {prefix: self.snapshot_files.get(prefix) for prefix in prefixes}
+
+    def invalidate(self) -> None:
+        return None
+
+
+def run_snapshots(context_kwargs: dict, file_sets: list) -> list:
+    """
+    Builds the SDC and Plant tables of each snapshot's files. One DataContext serves the
+    whole batch, so the site list and tipne are read once and only the share frames are
+    rebuilt per snapshot. Runs in the backfill worker processes.
+
+    returns: list of dict of report name to table, in the order of file_sets
+    """
+    previous = get_context()
+    context = set_context(DataContext(**context_kwargs))
+    tables: list = []
+    try:
+        for files in file_sets:
+            context.share_index = SnapshotIndex(files)
+            for name in SHARE_FRAMES:
+                context.invalidate(name)
+            tables.append({'SDC': Sdc().merge_count_costs(),
+                           'Plant': Plant().get_final_plant_df()})
+    finally:
+        set_context(previous)
+    return tables
+
+
+@traced('backfill')
+def backfill(freq: str = None, start=None, end=None, workers: int = None,
+             record: bool = True) -> pd.DataFrame:
+    """
+    Reruns the SDC and Plant reports for every snapshot of the share history, see
+    snapshots. Snapshots resolving to the same files are computed once. With workers > 1
+    the snapshots are split into batches run on the process pool. When the DataContext
+    keeps a HistoryStore each snapshot is recorded with its as-of date as run time.
+
+    returns: pd.DataFrame with as_of, report, vendor, metric and value
+    """
+    context = get_context()
+    server = Server()
+    prefixes: list = ['msp', *server.param_dict.values()]
+    points: list = snapshots(share_history(context.share_index, prefixes), freq, start, end)
+    unique: dict = {}
+    for _, files in points:
+        unique.setdefault(tuple(str(files[prefix]) for prefix in prefixes), files)
+    file_sets: list = list(unique.values())
+    context_kwargs: dict = {'splunk_path': context.splunk_path,
+                            'frame_cache': context.frame_cache,
+                            'share_path': context.share_path,
+                            'tipne_chunksize': context.tipne_chunksize,
+                            'compact_frames': context.compact_frames}
+
+    if workers and workers > 1 and len(file_sets) > 1:
+        batches: list = [file_sets[part::workers] for part in range(min(workers, len(file_sets)))]
+        futures = [get_pool(workers).submit(run_snapshots, context_kwargs, batch)
+                   for batch in batches]
+        by_batch: list = [future.result() for future in futures]
+        tables: list = [None] * len(file_sets)
+        for part, batch_tables in enumerate(by_batch):
+            tables[part::len(batches)] = batch_tables
+    else:
+        tables = run_snapshots(context_kwargs, file_sets)
+    tables_by_files: dict = dict(zip(unique, tables))
+
+    vendor_columns: dict = {report: columns[0] for report, columns in REPORT_COLUMNS.items()}
+    rows: list = []
+    for as_of, files in points:
+        snapshot_tables = tables_by_files[tuple(str(files[prefix]) for prefix in prefixes)]
+        if record and context.history is not None:
+            sources = {prefix: context.frame_cache.fingerprint(path)
+                       for prefix, path in files.items()}
+            context.history.record(snapshot_tables, vendor_columns, sources, run_at=as_of,
+                                   skip_unchanged=False)
+        for report, table in snapshot_tables.items():
+            rows.append(long_rows(report, table, vendor_columns[report]).assign(as_of=as_of))
+    columns = ['as_of', 'report', 'vendor', 'metric', 'value']
+    return pd.concat(rows, ignore_index=True)[columns] if rows else pd.DataFrame(columns=columns)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--freq', help="as-of period, e.g. 'W', every file date by default")
+    parser.add_argument('--start')
+    parser.add_argument('--end')
+    parser.add_argument('--workers', type=int, help='worker processes running the snapshots')
+    parser.add_argument('--metric', default='Deployed')
+    args = parser.parse_args()
+    started = time.perf_counter()
+    rows = backfill(args.freq, args.start, args.end, args.workers)
+    minutes = (time.perf_counter() - started) / 60
+    print(rows[rows['metric'] == args.metric]
+          .pivot_table(index='as_of', columns=['report', 'vendor'], values='value')
+          .to_string())
+    print(f"{rows['as_of'].nunique()} snapshots, {rows['as_of'].nunique() / minutes:.1f} per minute")
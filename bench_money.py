@@ -0,0 +1,79 @@
+"""bench_money.py: Times money.parse_money against the regex chains it replaced in Site"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+from money import parse_money
+
+
+def make_site_list(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Builds nrc and old_mrc columns shaped like the site list export: '$1,234.56' nrc
+    with '-', 'TBD' and blanks mixed in, plain '123.45' old_mrc with '-' placeholders
+
+    returns: pd.DataFrame with the str columns nrc and old_mrc
+    """
+    rng = np.random.default_rng(seed)
+    nrc = pd.Series(rng.random(rows) * 5000).map('${:,.2f}'.format).astype(object)
+    nrc[rng.random(rows) < 0.05] = '-'
+    nrc[rng.random(rows) < 0.02] = 'TBD'
+    nrc[rng.random(rows) < 0.01] = np.nan
+    old_mrc = pd.Series(rng.random(rows) * 300).map('{:.2f}'.format).astype(object)
+    old_mrc[rng.random(rows) < 0.05] = '-'
+    return pd.DataFrame({'nrc': nrc, 'old_mrc': old_mrc})
+
+
+def regex_nrc(nrc: pd.Series) -> pd.Series:
+    """
+    The Site.format_nrc chain before parse_money
+
+    returns: pd.Series of float
+    """
+    return (nrc.astype(str)
+            .str.extract(r'([\d,]+\.\d{2})')[0]
+            .str.replace(',', '', regex=True)
+            .astype(float))
+
+
+def replace_old_mrc(old_mrc: pd.Series) -> pd.Series:
+    """
+    The Site.format_old_mrc chain before parse_money
+
+    returns: pd.Series of float
+    """
+    return old_mrc.replace('-', np.nan).dropna().astype(float).reindex(old_mrc.index)
+
+
+def best_of(function, values: pd.Series, repeat: int) -> tuple:
+    """
+    returns: tuple of (best wall time in seconds, last result)
+    """
+    runs: list = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(values)
+        runs.append(time.perf_counter() - start)
+    return min(runs), result
+
+
+def run(rows: int = 1_000_000, repeat: int = 3) -> dict:
+    """
+    Times both parsers on each column and checks they agree
+
+    returns: dict of column to dict with 'before' and 'after' in seconds and the speedup
+    """
+    site_list = make_site_list(rows)
+    timings: dict = {}
+    for column, before, fallback in (('nrc', regex_nrc, 'extract'),
+                                     ('old_mrc', replace_old_mrc, 'numeric')):
+        before_time, expected = best_of(before, site_list[column], repeat)
+        after_time, result = best_of(lambda values: parse_money(values, fallback=fallback),
+                                     site_list[column], repeat)
+        pd.testing.assert_series_equal(result, expected, check_names=False)
+        timings[column] = {'before': round(before_time, 3), 'after': round(after_time, 3),
+                           'speedup': round(before_time / after_time, 1)}
+    return timings
+
+
+if __name__ == '__main__':
+    print(run(rows=int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
@@ -0,0 +1,163 @@
+"""bench_pipeline.py: Times the Sdc, Plant and RD reports stage by stage on synthetic data"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from data_context import DataContext, get_context, set_context
+from frame_cache import FrameCache
+from plants import Plant
+from rd import RD
+from sdc_class import Sdc
+from site_tracking import Site, Tipne
+from synthetic_data import BASE_SITES, generate
+
+DEFAULT_RESULTS_DIR = Path('bench_results')
+
+# Stages in run order. Each one receives the objects built by the earlier stages.
+# site_list and tipne are loaded first so the report stages time their own work only.
+# The init stages build the lazy tables the objects hold, their constructors read nothing.
+STAGES: list = [
+    ('site_list', lambda objects: Site().get_site_list()),
+    ('tipne', lambda objects: Tipne().get_tipne()),
+    ('sdc.init', lambda objects: objects.setdefault('sdc', Sdc()).merged_df),
+    ('sdc.merge_count_costs', lambda objects: objects['sdc'].merge_count_costs()),
+    ('plant.init', lambda objects: objects.setdefault('plant', Plant()).plant_df),
+    ('plant.get_final_plant_df', lambda objects: objects['plant'].get_final_plant_df()),
+    ('rd.init', lambda objects: objects.setdefault('rd', RD()).rd_df),
+    ('rd.merge', lambda objects: objects['rd'].merge()),
+]
+
+
+def run_stages(paths: dict, trace_memory: bool) -> dict:
+    """
+    Runs every stage once in a fresh DataContext with the frame cache disabled, so each
+    run parses the csv files like a cold start
+
+    returns: dict of stage to seconds, or to peak MB allocated when trace_memory is True
+    """
+    previous = get_context()
+    set_context(DataContext(frame_cache=FrameCache(enabled=False), **paths))
+    objects: dict = {}
+    results: dict = {}
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        for stage, function in STAGES:
+            if trace_memory:
+                tracemalloc.reset_peak()
+                start = tracemalloc.get_traced_memory()[0]
+                function(objects)
+                results[stage] = round((tracemalloc.get_traced_memory()[1] - start) / 2**20, 2)
+            else:
+                start = time.perf_counter()
+                function(objects)
+                results[stage] = round(time.perf_counter() - start, 4)
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        set_context(previous)
+    return results
+
+
+def max_rss_mb() -> float:
+    """
+    Peak resident memory of the process so far. Unlike tracemalloc this includes the
+    Arrow buffers backing string columns.
+
+    returns: float MB
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in KB on Linux
+    return round(rss / 2**20 if sys.platform == 'darwin' else rss / 2**10, 1)
+
+
+def benchmark(scale: int, data_dir=None, repeat: int = 3, memory: bool = True) -> dict:
+    """
+    Generates the synthetic files for the scale and times the stages. Times are the best
+    of repeat runs. Peak memory per stage comes from a separate tracemalloc run, since
+    tracing slows the stages down.
+
+    returns: dict with the scale, sites, seconds and peak_mb per stage and max_rss_mb
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        paths: dict = generate(Path(data_dir or tmp) / f'scale_{scale}', scale=scale)
+        runs: list = [run_stages(paths, trace_memory=False) for _ in range(repeat)]
+        seconds: dict = {stage: min(run[stage] for run in runs) for stage, _ in STAGES}
+        seconds['total'] = round(sum(seconds.values()), 4)
+        result: dict = {'scale': scale, 'sites': BASE_SITES * scale, 'seconds': seconds}
+        if memory:
+            result['peak_mb'] = run_stages(paths, trace_memory=True)
+        result['max_rss_mb'] = max_rss_mb()
+    return result
+
+
+def git_commit() -> str:
+    """
+    returns: the short hash of HEAD, None outside a git checkout
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save(results: list, results_dir=DEFAULT_RESULTS_DIR) -> Path:
+    """
+    Writes the results as <commit>_<timestamp>.json so runs of different commits can be
+    compared
+
+    returns: Path of the file written
+    """
+    commit = git_commit()
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = Path(results_dir) / f'{commit or "nogit"}_{stamp}.json'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({'commit': commit, 'created': stamp, 'results': results},
+                               indent=2))
+    return path
+
+
+def compare(before_path, after_path) -> list:
+    """
+    Lines up the stage times of two saved runs by scale
+
+    returns: list of (scale, stage, before seconds, after seconds, after / before)
+    """
+    before, after = ({result['scale']: result['seconds']
+                      for result in json.loads(Path(path).read_text())['results']}
+                     for path in (before_path, after_path))
+    rows: list = []
+    for scale in sorted(before.keys() & after.keys()):
+        for stage, seconds in after[scale].items():
+            if stage in before[scale]:
+                old = before[scale][stage]
+                rows.append((scale, stage, old, seconds, round(seconds / old, 2) if old else None))
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10],
+                        help='multiples of BASE_SITES sites, e.g. 1 10 100 1000')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help='skip the traced run')
+    parser.add_argument('--data-dir', help='keep the generated files here')
+    parser.add_argument('--results-dir', default=DEFAULT_RESULTS_DIR)
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='compare two saved result files instead of running')
+    args = parser.parse_args()
+    if args.compare:
+        for row in compare(*args.compare):
+            print('{:>6} {:<28} {:>9} {:>9} {:>6}'.format(*map(str, row)))
+    else:
+        results = [benchmark(scale, args.data_dir, args.repeat, not args.no_memory)
+                   for scale in args.scales]
+        print(json.dumps(results, indent=2))
+        print(f'saved to {save(results, args.results_dir)}')
@@ -0,0 +1,121 @@
+"""data_context.py: Process wide store of the parsed and formatted Splunk exports"""
+from collections import Counter, defaultdict
+import threading
+import pandas as pd
+from frame_cache import FrameCache
+from frame_memory import compact_frame
+from history_store import HistoryStore
+from share_index import ShareIndex
+from share_mirror import ShareMirror
+
+DEFAULT_SPLUNK_PATH = "/Users/FDYPK0/OneDrive - USPS/NCP WAN/Splunk/"
+DEFAULT_SHARE_PATH = "/Volumes/TelcoInv"
+# Stored objects built from another stored frame, dropped along with it
+DERIVED_FRAMES: dict = {'tipne': ('tipne_phases',)}
+
+
+class DataContext:
+    """
+    Memoizes the formatted site list and tipne frames so each Splunk export is read and
+    formatted once per process. Site, Tipne, Sdc, ClassInterface, Plant and RD all get
+    their frames through the context returned by get_context(). Server keeps the vendor
+    statuses and MSP plants here too, so the reports of one process share those reads.
+
+    Frames handed out are shared between objects and should not be modified in place.
+    The frame_cache persists the formatted frames between runs and the share_index lets
+    every Server object reuse one listing of the TelcoInv share. share_path can point at
+    any local directory laid out like the share, e.g. in tests. When mirror_path is set
+    Server reads local copies of the share files kept in sync by a ShareMirror.
+    When tipne_chunksize is set Tipne streams tipne.csv that many rows at a time and
+    keeps only the phases the reports use, see Tipne.stream_tipne. process_workers > 1
+    formats and aggregates large frames on that many worker processes, see process_pool.
+    compact_frames stores the frames with categoricals for low cardinality text columns
+    and Arrow backed strings for the rest, see frame_memory.compact_frame. When
+    history_path is set the report runner appends every run's tables to a HistoryStore.
+    Objects derived from a frame, e.g. the phase partitions of tipne, are stored the same
+    way and dropped with it, see DERIVED_FRAMES.
+    """
+    def __init__(self, splunk_path: str = DEFAULT_SPLUNK_PATH,
+                 frame_cache: FrameCache = None,
+                 share_path: str = DEFAULT_SHARE_PATH,
+                 share_index_ttl: float = 300,
+                 mirror_path: str = None,
+                 mirror_compress: bool = False,
+                 tipne_chunksize: int = None,
+                 process_workers: int = None,
+                 compact_frames: bool = False,
+                 history_path: str = None) -> None:
+        self.splunk_path: str = splunk_path
+        self.frame_cache: FrameCache = frame_cache if frame_cache is not None else FrameCache()
+        self.share_path: str = share_path
+        self.share_index: ShareIndex = ShareIndex(share_path, ttl=share_index_ttl)
+        self.share_mirror: ShareMirror = (ShareMirror(mirror_path, compress=mirror_compress)
+                                          if mirror_path else None)
+        self.tipne_chunksize: int = tipne_chunksize
+        self.process_workers: int = process_workers
+        self.compact_frames: bool = compact_frames
+        self.history: HistoryStore = HistoryStore(history_path) if history_path else None
+        # Number of times each frame was built. Stays at 1 per frame for a process.
+        self.load_counts: Counter = Counter()
+        self._frames: dict = {}
+        self._lock = threading.Lock()
+        self._frame_locks: defaultdict = defaultdict(threading.Lock)
+        # Bumped by invalidate, a load only stores its frame if its name's was not
+        self._generations: Counter = Counter()
+
+    def get_frame(self, name: str, loader) -> pd.DataFrame:
+        """
+        Returns the frame stored under name. The loader is only called the first time
+        the frame is requested, concurrent callers wait for that first load.
+
+        returns: pd.DataFrame, or the object the loader built for derived entries
+        """
+        with self._lock:
+            frame_lock = self._frame_locks[name]
+        with frame_lock:
+            with self._lock:
+                if name in self._frames:
+                    return self._frames[name]
+                generation = self._generations[name]
+            frame = loader()
+            if self.compact_frames and isinstance(frame, pd.DataFrame):
+                frame = compact_frame(frame)
+            with self._lock:
+                # A frame invalidated while it loaded may be stale, it goes to this caller only
+                if self._generations[name] == generation:
+                    self._frames[name] = frame
+            self.load_counts[name] += 1
+            return frame
+
+    def invalidate(self, name: str = None) -> None:
+        """
+        Drops the stored frame and the objects derived from it so the next request
+        re-reads the source file. Drops every frame when no name is passed in. A load
+        running meanwhile does not store its frame.
+        """
+        with self._lock:
+            names = (list(self._frame_locks) if name is None
+                     else [name, *DERIVED_FRAMES.get(name, ())])
+            for stored in names:
+                self._frames.pop(stored, None)
+                self._generations[stored] += 1
+
+_context: DataContext = DataContext()
+
+
+def get_context() -> DataContext:
+    """
+    returns: the DataContext shared by the process
+    """
+    return _context
+
+
+def set_context(context: DataContext) -> DataContext:
+    """
+    Replaces the shared DataContext, e.g. to point the pipeline at another Splunk folder
+
+    returns: the DataContext now in use
+    """
+    global _context
+    _context = context
+    return _context
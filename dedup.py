@@ -0,0 +1,72 @@
+"""dedup.py: Row deduplication on a declared identity through 64-bit row hashes"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+from instrumentation import stage
+
+# Hash of a null in a text column
+NULL_HASH = np.uint64(0x9E3779B97F4A7C15)
+
+
+def column_hashes(values: pd.Series) -> np.ndarray:
+    """
+    Hashes a column through its distinct values: text columns are factorized and only
+    the distinct values are hashed, which is several times faster than hashing every
+    string. Numeric and categorical columns are hashed directly.
+
+    returns: np.ndarray of uint64
+    """
+    if is_numeric_dtype(values.dtype) or isinstance(values.dtype, pd.CategoricalDtype):
+        return pd.util.hash_pandas_object(values, index=False).to_numpy()
+    codes, uniques = pd.factorize(values)
+    by_code = np.append(pd.util.hash_array(np.asarray(uniques, dtype=object)), NULL_HASH)
+    # Nulls have code -1 and pick up the trailing NULL_HASH
+    return by_code[codes]
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Combines the column hashes of every row, the same way for every frame, so equal
+    rows hash equal
+
+    returns: np.ndarray of uint64
+    """
+    hashes = np.full(len(df), np.uint64(0x345678), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for column in df.columns:
+            hashes = (hashes ^ column_hashes(df[column])) * np.uint64(1000003)
+    return hashes
+
+
+class Dedup:
+    """
+    Drops rows repeating an earlier row's identity, like drop_duplicates(subset=columns)
+    keeping the first row. Each row's identity columns are hashed to one uint64, so
+    finding the repeats compares one integer per row instead of every column. Two
+    different identities sharing a hash would wrongly collapse; at 64 bits that is not
+    expected below billions of rows. columns=None uses every column.
+
+    A Dedup only declares the identity and keeps no state, so one instance can be shared
+    by concurrent runs.
+    """
+    def __init__(self, name: str, columns: tuple = None) -> None:
+        self.name: str = name
+        self.columns: tuple = columns
+
+    def hashes(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        returns: np.ndarray of uint64, the hash of each row's identity columns
+        """
+        return row_hashes(df if self.columns is None else df[list(self.columns)])
+
+    def unique(self, df: pd.DataFrame) -> tuple:
+        """
+        Keeps the first row of each identity
+
+        returns: tuple of (pd.DataFrame, int number of rows collapsed)
+        """
+        with stage(f'dedup.{self.name}', len(df)) as record:
+            keep = ~pd.Series(self.hashes(df), copy=False).duplicated().to_numpy()
+            unique = df[keep]
+            record.rows_out = len(unique)
+        return unique, len(df) - len(unique)
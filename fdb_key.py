@@ -0,0 +1,115 @@
+"""fdb_key.py: Canonical fdbid key shared by every frame the pipeline joins"""
+import hashlib
+import numpy as np
+import pandas as pd
+from instrumentation import traced
+
+FDB_KEY_DTYPE = 'Int64'
+# Placeholders used in the exports for sites without an fdbid yet
+NULL_IDS = frozenset(['', 'tbd', 'nan', '-'])
+# Flags the rows whose export lists an fdbid, see listed_ids
+LISTED_COLUMN = 'fdbid_listed'
+
+
+def odd_id_key(raw: str) -> int:
+    """
+    Maps an fdbid that is not a plain integer (e.g. hyphenated) to a stable negative
+    integer so it still joins with the same id in other files
+
+    returns: int
+    """
+    digest = hashlib.blake2b(raw.encode('utf-8'), digest_size=7).digest()
+    return -(int.from_bytes(digest, 'big') + 1)
+
+
+def to_fdb_key(fdbids: pd.Series) -> tuple:
+    """
+    Converts an fdbid column as read from csv (str, int or float) to the canonical key.
+    Integer ids become their value, odd ids a negative key from odd_id_key and
+    placeholders like 'TBD' become <NA>.
+
+    returns: tuple of (pd.Series of Int64 keys, pd.Series of the original text for odd ids)
+    """
+    text = fdbids.astype('string').str.strip()
+    numbers = pd.to_numeric(text, errors='coerce')
+    integral = (numbers % 1 == 0).fillna(False).astype(bool)
+    keys = pd.Series(pd.NA, index=fdbids.index, dtype=FDB_KEY_DTYPE)
+    keys[integral] = numbers[integral].astype('int64')
+
+    odd = text.notna() & ~integral & ~text.str.lower().isin(NULL_IDS)
+    raw = text.where(odd)
+    if odd.any():
+        odd_keys = {value: odd_id_key(value) for value in raw[odd].unique()}
+        keys[odd] = raw[odd].map(odd_keys).astype('int64')
+    return keys, raw
+
+
+def listed_ids(fdbids: pd.Series) -> pd.Series:
+    """
+    Flags the rows whose export lists an fdbid, placeholders such as 'TBD' included.
+    Placeholders have no key, so circuits are counted on this flag rather than on the
+    key: counting it gives the same numbers as counting the fdbid text did.
+
+    returns: pd.Series of float32, 1 where listed and NaN where blank, so counts come out
+    as int64 like counts of any numpy column
+    """
+    return pd.Series(np.where(fdbids.notna(), np.float32(1), np.float32(np.nan)),
+                     index=fdbids.index, dtype=np.float32)
+
+
+@traced('add_fdb_key')
+def add_fdb_key(df: pd.DataFrame, column: str = 'fdbid', sort: bool = True) -> pd.DataFrame:
+    """
+    Replaces the fdbid column with the canonical key, keeps odd ids in fdbid_raw and
+    sorts the frame by key so it can be used as the indexed side of a join. Frames built
+    from chunks pass sort=False and call sort_by_fdb_key once on the result.
+
+    returns: pd.DataFrame
+    """
+    keys, raw = to_fdb_key(df[column])
+    df = df.assign(**{'fdbid': keys, 'fdbid_raw': raw})
+    if column != 'fdbid':
+        df = df.drop(columns=[column])
+    return sort_by_fdb_key(df) if sort else df
+
+
+def sort_by_fdb_key(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Stable sort by key, rows without a key last
+
+    returns: pd.DataFrame with a fresh RangeIndex
+    """
+    return df.sort_values('fdbid', kind='stable', na_position='last').reset_index(drop=True)
+
+
+def key_index(fdbids) -> pd.Index:
+    """
+    Builds a unique, sorted index of fdbids for repeated membership tests
+
+    returns: pd.Index of Int64
+    """
+    return pd.Index(sorted(set(fdbids)), dtype=FDB_KEY_DTYPE)
+
+
+def in_key_index(keys: pd.Series, index: pd.Index) -> pd.Series:
+    """
+    Looks the keys up in a prebuilt key_index
+
+    returns: pd.Series of bool, False for <NA> keys
+    """
+    return pd.Series(index.get_indexer(keys) >= 0, index=keys.index)
+
+
+@traced('join_on_fdbid')
+def join_on_fdbid(left: pd.DataFrame, right: pd.DataFrame, how: str = 'left') -> pd.DataFrame:
+    """
+    Joins right onto left through an fdbid index on right, the replacement for
+    pd.merge(left, right, on='fdbid'). Rows without a key on right never match and
+    fdbid_raw is taken from left when both sides carry it.
+
+    returns: pd.DataFrame with a fresh RangeIndex, like pd.merge
+    """
+    right = right[right['fdbid'].notna()]
+    if 'fdbid_raw' in left.columns and 'fdbid_raw' in right.columns:
+        right = right.drop(columns=['fdbid_raw'])
+    return left.join(right.set_index('fdbid'), on='fdbid', how=how).reset_index(drop=True)
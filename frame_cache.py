@@ -0,0 +1,181 @@
+"""frame_cache.py: On disk cache of formatted frames keyed by the fingerprint of their source file"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from pathlib import Path
+import pandas as pd
+from instrumentation import stage
+
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'circuit_count_cost'
+# Bump when the formatting of a cached frame changes so old entries are not reused
+CACHE_VERSION = 6
+
+
+class FrameCache:
+    """
+    Stores the formatted frame built from a source csv so a warm run can skip the csv
+    parsing entirely. Each entry is keyed by the source path and the loader name and is
+    invalidated when the file's size, mtime and content hash no longer match. A changed
+    file only invalidates its own entry.
+
+    Entries are written to a temp file and moved into place with os.replace, so several
+    processes can use the same cache directory at once and never read a partial file.
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, enabled: bool = True) -> None:
+        self.cache_dir: Path = Path(cache_dir)
+        self.enabled: bool = enabled
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @staticmethod
+    def content_hash(path) -> str:
+        """
+        Hashes the file in blocks so large exports are not held in memory
+
+        returns: str hex digest
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def fingerprint(self, path, with_hash: bool = True) -> dict:
+        """
+        Builds the fingerprint of the source file. The content hash is only computed when
+        with_hash is True since it requires reading the whole file.
+
+        returns: dict with path, size, mtime_ns and sha256
+        """
+        stat = os.stat(path)
+        return {
+            'path': str(Path(path).resolve()),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': self.content_hash(path) if with_hash else None,
+        }
+
+    def _entry_name(self, name: str, path) -> str:
+        key = f'{CACHE_VERSION}:{name}:{Path(path).resolve()}'
+        return f"{name}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"
+
+    def _atomic_write(self, target: Path, write) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-', suffix=target.suffix)
+        os.close(fd)
+        try:
+            write(tmp)
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _read_manifest(self, manifest_path: Path):
+        try:
+            with open(manifest_path, encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _read_frame(data_path: Path) -> pd.DataFrame:
+        if data_path.suffix == '.parquet':
+            return pd.read_parquet(data_path)
+        with open(data_path, 'rb') as file:
+            return pickle.load(file)
+
+    def _write_frame(self, df: pd.DataFrame, stem: str) -> Path:
+        """
+        Writes parquet when the frame allows it. Mixed type object columns, e.g. tipne's
+        cutover_completed_date, cannot be stored as parquet and are pickled instead.
+
+        returns: Path of the written data file
+        """
+        try:
+            target = self.cache_dir / f'{stem}.parquet'
+            self._atomic_write(target, df.to_parquet)
+        except Exception:  # pylint: disable=broad-except
+            target = self.cache_dir / f'{stem}.pkl'
+            self._atomic_write(target, df.to_pickle)
+        return target
+
+    def load(self, name: str, path, loader) -> pd.DataFrame:
+        """
+        Returns the cached frame for the source path when its fingerprint still matches,
+        otherwise runs loader, stores the result and returns it.
+
+        returns: pd.DataFrame
+        """
+        with stage(f'frame_cache.load.{name}') as record:
+            frame = self._load(name, path, loader)
+            record.rows_out = len(frame)
+        return frame
+
+    def _load(self, name: str, path, loader) -> pd.DataFrame:
+        if not self.enabled:
+            return loader()
+        entry = self._entry_name(name, path)
+        manifest_path = self.cache_dir / f'{entry}.json'
+        manifest = self._read_manifest(manifest_path)
+        current = self.fingerprint(path, with_hash=False)
+
+        if manifest:
+            cached = manifest['fingerprint']
+            same_stat = (cached['size'], cached['mtime_ns']) == (current['size'], current['mtime_ns'])
+            if not same_stat and cached['size'] == current['size']:
+                # Touched or re-copied file, only the content hash can tell if it changed
+                current['sha256'] = self.content_hash(path)
+                same_stat = current['sha256'] == cached['sha256']
+                if same_stat:
+                    manifest['fingerprint'] = current
+                    try:
+                        self._write_manifest(manifest_path, manifest)
+                    except OSError:
+                        pass
+            if same_stat:
+                try:
+                    df = self._read_frame(self.cache_dir / manifest['data'])
+                    self.hits += 1
+                    return df
+                except (OSError, ValueError, pickle.UnpicklingError):
+                    # Entry replaced by another process in between, rebuild it
+                    pass
+
+        self.misses += 1
+        if current['sha256'] is None:
+            current['sha256'] = self.content_hash(path)
+        df = loader()
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            data_path = self._write_frame(df, f"{entry}-{current['sha256'][:16]}")
+            self._write_manifest(manifest_path, {'fingerprint': current, 'data': data_path.name})
+            self._remove_stale(entry, keep=data_path.name)
+        except OSError as error:
+            print(f"Unable to write cache entry for {path}: {error}")
+        return df
+
+    def _write_manifest(self, manifest_path: Path, manifest: dict) -> None:
+        def write(tmp):
+            with open(tmp, 'w', encoding='utf-8') as file:
+                json.dump(manifest, file)
+        self._atomic_write(manifest_path, write)
+
+    def _remove_stale(self, entry: str, keep: str) -> None:
+        """
+        Removes older data files of the same entry. Other entries are left untouched.
+        """
+        for data_path in self.cache_dir.glob(f'{entry}-*'):
+            if data_path.name != keep:
+                try:
+                    data_path.unlink()
+                except OSError:
+                    pass
+
+    def clear(self) -> None:
+        """
+        Removes every entry from the cache directory
+        """
+        if self.cache_dir.exists():
+            for cache_file in self.cache_dir.iterdir():
+                cache_file.unlink()
@@ -0,0 +1,112 @@
+"""frame_memory.py: Compact column layout for the ingested frames and a per frame memory report"""
+import sys
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+# Text columns with at most this share of distinct values become categoricals, e.g.
+# vendors, phases and statuses. Free text such as site names stays Arrow backed str.
+CATEGORY_MAX_RATIO = 0.5
+# The str dtype of pandas 3: Arrow storage with NaN as the missing value
+ARROW_STRING = pd.StringDtype('pyarrow', na_value=np.nan)
+
+
+def is_text(values: pd.Series) -> bool:
+    """
+    returns: True for object and string columns holding only strings and nulls
+    """
+    if isinstance(values.dtype, pd.StringDtype):
+        return True
+    return values.dtype == object and infer_dtype(values, skipna=True) in ('string', 'empty')
+
+
+def compact_frame(df: pd.DataFrame, category_max_ratio: float = CATEGORY_MAX_RATIO,
+                  keep: tuple = ('fdbid', 'fdbid_raw')) -> pd.DataFrame:
+    """
+    Low cardinality text columns become categoricals and other text columns Arrow backed
+    strings. Float columns keep float64: the costs are summed by vendor and float32 sums
+    round totals above 2**24 even when every value is exact. The fdbid key columns in
+    keep are left alone so every frame still joins on the canonical Int64 key.
+
+    returns: pd.DataFrame with the same values and a smaller footprint
+    """
+    columns: dict = {}
+    for column in df.columns:
+        values = df[column]
+        if column in keep or isinstance(values.dtype, pd.CategoricalDtype):
+            continue
+        if is_text(values):
+            distinct = values.nunique(dropna=True)
+            if distinct <= max(1, len(values) * category_max_ratio):
+                columns[column] = values.astype(ARROW_STRING).astype('category')
+            elif values.dtype != ARROW_STRING:
+                columns[column] = values.astype(ARROW_STRING)
+    return df.assign(**columns) if columns else df
+
+
+def frame_memory(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    returns: pd.DataFrame with the dtype and deep memory in MB of every column of df
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    return pd.DataFrame({'column': usage.index,
+                         'dtype': [str(df[column].dtype) for column in usage.index],
+                         'mb': (usage.to_numpy() / 2**20).round(3)})
+
+
+def memory_report(frames: dict) -> pd.DataFrame:
+    """
+    Totals the deep memory of each frame, e.g. {'merged_sl_tipne': df, ...}
+
+    returns: pd.DataFrame with frame, rows, columns and mb, largest first
+    """
+    rows = [{'frame': name, 'rows': len(df), 'columns': len(df.columns),
+             'mb': round(df.memory_usage(deep=True, index=False).sum() / 2**20, 3)}
+            for name, df in frames.items()]
+    return (pd.DataFrame(rows, columns=['frame', 'rows', 'columns', 'mb'])
+            .sort_values('mb', ascending=False).reset_index(drop=True))
+
+
+def pipeline_frames() -> dict:
+    """
+    Builds the frames the reports share in the current DataContext
+
+    returns: dict of frame name to pd.DataFrame
+    """
+    # Imported here as data_context imports this module
+    from sdc_class import Sdc
+    from site_tracking import ClassInterface
+    interface = ClassInterface()
+    merged_sl_tipne = interface.merged_sl_tipne
+    return {'site_list': interface.site_list.site_list_df,
+            'tipne': interface.tipne.tipne_df,
+            'merged_sl_tipne': merged_sl_tipne,
+            'sdc.merged_df': Sdc().merged_df}
+
+
+def compare_layouts(**context_kwargs) -> pd.DataFrame:
+    """
+    Builds the shared frames with and without compact_frames, see DataContext
+
+    returns: pd.DataFrame with the default and compact MB of each frame and their ratio
+    """
+    # Imported here as data_context imports this module
+    from data_context import DataContext, get_context, set_context
+    previous = get_context()
+    reports: dict = {}
+    try:
+        for compact in (False, True):
+            set_context(DataContext(compact_frames=compact, **context_kwargs))
+            reports['compact' if compact else 'default'] = (
+                memory_report(pipeline_frames()).set_index('frame')['mb'])
+    finally:
+        set_context(previous)
+    report = pd.DataFrame(reports)
+    report['ratio'] = (report['default'] / report['compact']).round(2)
+    return report.reset_index()
+
+
+if __name__ == '__main__':
+    # python frame_memory.py [splunk_path share_path]
+    paths = dict(zip(('splunk_path', 'share_path'), sys.argv[1:3]))
+    print(compare_layouts(**paths).to_string(index=False))
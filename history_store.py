@@ -0,0 +1,197 @@
+"""history_store.py: Local SQLite history of the per vendor report tables of every run"""
+import argparse
+import hashlib
+import json
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+DEFAULT_HISTORY_PATH = Path.home() / '.cache' / 'circuit_count_cost' / 'history.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_at TEXT NOT NULL,
+    source_key TEXT NOT NULL,
+    sources TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    report TEXT NOT NULL,
+    vendor TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS runs_run_at ON runs(run_at);
+CREATE INDEX IF NOT EXISTS metrics_trend ON metrics(report, vendor, metric);
+CREATE INDEX IF NOT EXISTS metrics_run ON metrics(run_id);
+"""
+
+
+def source_key(sources: dict) -> str:
+    """
+    Fingerprints with a content hash are keyed on it, the others on their path, size and
+    mtime_ns
+
+    returns: str hash of the source file fingerprints, equal for runs over the same files
+    """
+    fingerprints = {name: fingerprint.get('sha256') or fingerprint
+                    for name, fingerprint in sources.items()}
+    return hashlib.sha1(json.dumps(fingerprints, sort_keys=True).encode()).hexdigest()
+
+
+def long_rows(report: str, table: pd.DataFrame, vendor_column: str) -> pd.DataFrame:
+    """
+    Melts one report table to a row per vendor and numeric column
+
+    returns: pd.DataFrame with report, vendor, metric and value
+    """
+    metrics = [column for column in table.columns
+               if column != vendor_column and is_numeric_dtype(table[column].dtype)]
+    rows = (table[[vendor_column, *metrics]]
+            .melt(id_vars=vendor_column, var_name='metric', value_name='value')
+            .rename(columns={vendor_column: 'vendor'})
+            .dropna(subset=['vendor']))
+    rows['value'] = rows['value'].astype(float)
+    rows.insert(0, 'report', report)
+    return rows
+
+
+def as_run_at(value) -> str:
+    """
+    returns: str ISO timestamp as stored in runs.run_at
+    """
+    return pd.Timestamp(value).isoformat(timespec='seconds')
+
+
+class HistoryStore:
+    """
+    Appends the per vendor numbers of every report run to a SQLite file, along with the
+    run time and the fingerprints of the source files the run read. Tables are stored
+    long, one row per run, report, vendor and metric, so the Sdc, Plant and RD tables
+    share one layout and new columns need no migration.
+
+    Queries only read the SQLite file, never the csv exports. A connection is opened per
+    call so several threads and processes can use the same store.
+    """
+    def __init__(self, path=DEFAULT_HISTORY_PATH) -> None:
+        self.path: Path = Path(path)
+        self._ready: bool = False
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        returns: sqlite3.Connection to the store, the tables are created on first use
+        """
+        if not self._ready:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self._ready:
+            connection.executescript(SCHEMA)
+            self._ready = True
+        return connection
+
+    def record(self, tables: dict, vendor_columns: dict, sources: dict,
+               run_at=None, skip_unchanged: bool = True) -> int:
+        """
+        Appends one run. tables maps report names to their tables, vendor_columns maps
+        them to the vendor column and sources maps source names to the fingerprints of
+        the files read, see FrameCache.fingerprint. With skip_unchanged a run over the
+        same files as the last recorded run is not stored again. A run without tables is
+        stored with no metrics.
+
+        returns: int run_id of the stored run, or of the last run when skipped
+        """
+        key = source_key(sources)
+        with closing(self.connect()) as connection, connection:
+            if skip_unchanged:
+                last = connection.execute(
+                    'SELECT run_id, source_key FROM runs ORDER BY run_id DESC LIMIT 1').fetchone()
+                if last and last[1] == key:
+                    return last[0]
+            cursor = connection.execute(
+                'INSERT INTO runs (run_at, source_key, sources) VALUES (?, ?, ?)',
+                (as_run_at(run_at or datetime.now()), key, json.dumps(sources, sort_keys=True)))
+            run_id = cursor.lastrowid
+            connection.executemany(
+                'INSERT INTO metrics (run_id, report, vendor, metric, value) VALUES (?, ?, ?, ?, ?)',
+                [(run_id, *row) for report, table in tables.items()
+                 for row in long_rows(report, table, vendor_columns[report])
+                 .itertuples(index=False, name=None)])
+        return run_id
+
+    def runs(self, start=None, end=None) -> pd.DataFrame:
+        """
+        returns: pd.DataFrame of the runs between start and end (inclusive), oldest first
+        """
+        where, params = self._range(start, end)
+        with closing(self.connect()) as connection:
+            return pd.read_sql_query(
+                'SELECT run_id, run_at, source_key, sources '
+                f'FROM runs r {where} ORDER BY run_at, run_id',
+                connection, params=params, parse_dates=['run_at'])
+
+    def trend(self, report: str = None, vendor: str = None, metrics=None,
+              start=None, end=None) -> pd.DataFrame:
+        """
+        Reads the stored numbers, optionally for one report, one vendor, some metrics
+        and a time range
+
+        returns: pd.DataFrame with run_id, run_at, report, vendor, metric and value
+        """
+        where, params = self._range(start, end)
+        conditions: list = [where[len('WHERE '):]] if where else []
+        for column, value in (('report', report), ('vendor', vendor)):
+            if value is not None:
+                conditions.append(f'm.{column} = ?')
+                params.append(value)
+        if metrics is not None:
+            metrics = [metrics] if isinstance(metrics, str) else list(metrics)
+            conditions.append(f"m.metric IN ({', '.join('?' * len(metrics))})")
+            params.extend(metrics)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        with closing(self.connect()) as connection:
+            return pd.read_sql_query(
+                'SELECT r.run_id, r.run_at, m.report, m.vendor, m.metric, m.value '
+                f'FROM metrics m JOIN runs r ON r.run_id = m.run_id {where} '
+                'ORDER BY r.run_at, r.run_id, m.report, m.vendor, m.metric',
+                connection, params=params, parse_dates=['run_at'])
+
+    def vendor_trend(self, report: str, vendor: str, start=None, end=None) -> pd.DataFrame:
+        """
+        returns: pd.DataFrame with a row per run and a column per metric of the vendor
+        """
+        rows = self.trend(report, vendor, start=start, end=end)
+        return (rows.pivot_table(index=['run_id', 'run_at'], columns='metric', values='value',
+                                 sort=False)
+                .reset_index()
+                .rename_axis(columns=None))
+
+    @staticmethod
+    def _range(start, end) -> tuple:
+        conditions, params = [], []
+        if start is not None:
+            conditions.append('r.run_at >= ?')
+            params.append(as_run_at(start))
+        if end is not None:
+            conditions.append('r.run_at <= ?')
+            params.append(as_run_at(end))
+        return (f"WHERE {' AND '.join(conditions)}" if conditions else ''), params
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--path', default=DEFAULT_HISTORY_PATH)
+    parser.add_argument('--report', help='SDC, Plant or RD')
+    parser.add_argument('--vendor')
+    parser.add_argument('--metric', nargs='+')
+    parser.add_argument('--start')
+    parser.add_argument('--end')
+    args = parser.parse_args()
+    store = HistoryStore(args.path)
+    if args.report and args.vendor and not args.metric:
+        print(store.vendor_trend(args.report, args.vendor, args.start, args.end).to_string())
+    else:
+        print(store.trend(args.report, args.vendor, args.metric, args.start, args.end).to_string())
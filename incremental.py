@@ -0,0 +1,188 @@
+"""incremental.py: Keeps per vendor aggregates up to date by only reprocessing changed fdbids"""
+import os
+import pickle
+import tempfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from aggregation import masked_values
+from instrumentation import traced
+
+DEFAULT_STATE_DIR = Path.home() / '.cache' / 'circuit_count_cost' / 'incremental'
+# Bumped when the layout of the stored state changes, older states are then discarded
+STATE_VERSION = 1
+
+
+class IncrementalAggregate:
+    """
+    Stores, per (key, group) pair, the partial result of every aggregation.Metric along
+    with a hash of the input rows of each key. On update only the keys whose rows hashed
+    differently are re-aggregated: their old partials are subtracted from the group
+    totals and the new ones added, so the aggregation cost follows the number of changed
+    rows.
+
+    Distinct counts stay correct because a key contributes exactly 1 to its group's
+    nunique partial while it has any matching row, whatever the number of rows.
+
+    The state is pickled to state_dir/<name>.pkl between runs along with the signature
+    of the aggregate. A state stored for other metrics, e.g. before they were renamed,
+    is discarded and the next update aggregates everything.
+    """
+    ROWS = '_rows'
+
+    def __init__(self, name: str, group: str, metrics: list, key: str = 'fdbid',
+                 state_dir=DEFAULT_STATE_DIR) -> None:
+        for metric in metrics:
+            if metric.how == 'nunique' and metric.column != key:
+                raise ValueError(f"nunique is only supported on the key column {key}")
+        self.name: str = name
+        self.group: str = group
+        self.metrics: list = metrics
+        self.key: str = key
+        self.state_path: Path = Path(state_dir) / f'{name}.pkl'
+        # Number of keys re-aggregated by the last update
+        self.changed_keys: int = 0
+        self._state: dict = None
+
+    @property
+    def columns(self) -> list:
+        """
+        returns: the input columns the aggregate depends on
+        """
+        columns: list = [self.key, self.group]
+        for metric in self.metrics:
+            columns += [metric.column] + ([metric.mask] if metric.mask else [])
+        return list(dict.fromkeys(columns))
+
+    @property
+    def signature(self) -> tuple:
+        """
+        returns: tuple identifying the layout of the state, see STATE_VERSION
+        """
+        return (STATE_VERSION, self.group, self.key,
+                tuple((metric.name, metric.column, metric.how, metric.mask)
+                      for metric in self.metrics))
+
+    def key_hashes(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Combines the row hashes of each key. Summing keeps the result independent of the
+        row order while still counting duplicate rows.
+
+        returns: pd.Series of uint64 indexed by key
+        """
+        hashes = pd.util.hash_pandas_object(df[self.columns], index=False)
+        return hashes.groupby(df[self.key].values, dropna=False).sum()
+
+    def partials(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Aggregates the rows of each (key, group) pair
+
+        returns: pd.DataFrame indexed by (key, group) with a column per metric
+        """
+        work = pd.DataFrame({self.key: df[self.key].values, self.group: df[self.group].values})
+        how: dict = {self.ROWS: 'sum'}
+        for metric in self.metrics:
+            values = masked_values(df, metric)
+            if metric.how == 'sum':
+                work[metric.name] = values.values
+                how[metric.name] = 'sum'
+            else:
+                work[metric.name] = values.notna().astype('int64').values
+                how[metric.name] = 'max' if metric.how == 'nunique' else 'sum'
+        work[self.ROWS] = 1
+        return work.groupby([self.key, self.group], dropna=False, observed=True).agg(how)
+
+    @staticmethod
+    def _is_changed(keys, changed_keys: pd.Index) -> np.ndarray:
+        """
+        returns: np.ndarray of bool flagging the keys found in changed_keys. isin never
+        matches <NA> in Int64 keys, so null keys are matched separately.
+        """
+        return (np.asarray(keys.isin(changed_keys), dtype=bool)
+                | (np.asarray(keys.isna(), dtype=bool) & changed_keys.hasnans))
+
+    def _totals(self, partials: pd.DataFrame) -> pd.DataFrame:
+        return partials.groupby(level=self.group, dropna=False, observed=True).sum()
+
+    def load(self) -> dict:
+        """
+        returns: the stored state, None when there is no previous snapshot or it was
+        stored for another signature
+        """
+        if self._state is None and self.state_path.exists():
+            with open(self.state_path, 'rb') as file:
+                state = pickle.load(file)
+            if isinstance(state, dict) and state.get('signature') == self.signature:
+                self._state = state
+            else:
+                self.reset()
+        return self._state
+
+    def save(self) -> None:
+        """
+        Writes the state next to the other snapshots, replacing the old one atomically
+        """
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.state_path.parent, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as file:
+            pickle.dump(self._state, file)
+        os.replace(tmp, self.state_path)
+
+    def reset(self) -> None:
+        """
+        Drops the stored snapshot so the next update aggregates everything
+        """
+        self._state = None
+        self.state_path.unlink(missing_ok=True)
+
+    @traced('incremental.update')
+    def update(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Diffs df against the last snapshot by key and updates the affected groups
+
+        returns: pd.DataFrame with the group column and one column per metric
+        """
+        hashes: pd.Series = self.key_hashes(df)
+        state: dict = self.load()
+        if state is None:
+            partials = self.partials(df)
+            totals = self._totals(partials)
+            self.changed_keys = len(hashes)
+        else:
+            old_hashes: pd.Series = state['hashes']
+            common = old_hashes.index.intersection(hashes.index)
+            # Compared as aligned uint64 arrays, aligning with NaN would cast to float
+            same = old_hashes.reindex(common).values == hashes.reindex(common).values
+            changed_keys = (old_hashes.index.difference(common)
+                            .append(hashes.index.difference(common))
+                            .append(common[~same]))
+            self.changed_keys = len(changed_keys)
+            partials, totals = state['partials'], state['totals']
+            if len(changed_keys):
+                old_mask = self._is_changed(partials.index.get_level_values(self.key),
+                                            changed_keys)
+                old_partials = partials[old_mask]
+                new_partials = self.partials(df[self._is_changed(df[self.key], changed_keys)])
+                totals = (totals
+                          .sub(self._totals(old_partials), fill_value=0)
+                          .add(self._totals(new_partials), fill_value=0))
+                partials = pd.concat([partials[~old_mask], new_partials])
+        totals = totals[totals[self.ROWS] > 0]
+        self._state = {'signature': self.signature, 'hashes': hashes, 'partials': partials,
+                       'totals': totals}
+        self.save()
+        return self.result(totals)
+
+    def result(self, totals: pd.DataFrame) -> pd.DataFrame:
+        """
+        Formats the stored totals as the report table
+
+        returns: pd.DataFrame
+        """
+        # groupby drops null groups, do the same so the tables match the full runs
+        totals = totals[totals.index.notna()]
+        result = totals.drop(columns=[self.ROWS]).sort_index().reset_index()
+        for metric in self.metrics:
+            if metric.how != 'sum':
+                result[metric.name] = np.rint(result[metric.name]).astype('int64')
+        return result
@@ -0,0 +1,219 @@
+"""instrumentation.py: Opt in per stage timing, row counts and memory deltas for the report pipeline"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+import pandas as pd
+
+# Set to a file path to trace a whole run, e.g. CIRCUIT_TRACE=trace.json python plants.py
+TRACE_ENV = 'CIRCUIT_TRACE'
+# Set as well to record memory deltas through tracemalloc
+TRACE_MEMORY_ENV = 'CIRCUIT_TRACE_MEMORY'
+
+
+class _Disabled:
+    """
+    Shared no-op stage handed out while tracing is off, so an instrumented block costs
+    one attribute check
+    """
+    rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_DISABLED = _Disabled()
+
+
+class StageRecord:
+    """
+    One timed stage. rows_out can be set inside the with block when the stage does not
+    return a frame.
+    """
+    def __init__(self, tracer, name: str, rows_in: int = None) -> None:
+        self.tracer = tracer
+        self.name: str = name
+        self.rows_in: int = rows_in
+        self.rows_out: int = None
+        self.start: float = None
+        self.memory_start: int = None
+
+    def __enter__(self):
+        self.memory_start = self.tracer.traced_memory()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        end = time.perf_counter()
+        memory_end = self.tracer.traced_memory()
+        delta = (None if memory_end is None or self.memory_start is None
+                 else round((memory_end - self.memory_start) / 2**20, 3))
+        self.tracer.record({
+            'name': self.name,
+            'start': self.start,
+            'seconds': end - self.start,
+            'thread': threading.get_ident(),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'memory_delta_mb': delta,
+        })
+
+
+def frame_rows(value) -> int:
+    """
+    returns: the number of rows of a frame or series, None for anything else
+    """
+    return len(value) if isinstance(value, (pd.DataFrame, pd.Series)) else None
+
+
+class Tracer:
+    """
+    Collects a record per stage: wall time, rows in and out and, when memory is traced,
+    the change in memory allocated by Python and NumPy. Stages nest and may run on worker
+    threads; each record keeps its thread so the trace shows them side by side.
+
+    Disabled by default. Use stage() around a block, or traced() on a function whose
+    frame arguments and result give the row counts.
+    """
+    def __init__(self) -> None:
+        self.enabled: bool = False
+        self.memory: bool = False
+        self.events: list = []
+        self.origin: float = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def enable(self, memory: bool = False) -> None:
+        """
+        Starts recording. memory=True also starts tracemalloc, which slows the run down.
+        """
+        self.reset()
+        self.enabled = True
+        self.memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def disable(self) -> None:
+        """
+        Stops recording, the events recorded so far are kept
+        """
+        self.enabled = False
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.memory = False
+
+    def reset(self) -> None:
+        """
+        Drops the recorded events
+        """
+        with self._lock:
+            self.events = []
+            self.origin = time.perf_counter()
+
+    def traced_memory(self) -> int:
+        """
+        returns: bytes currently traced by tracemalloc, None when memory is not traced
+        """
+        return tracemalloc.get_traced_memory()[0] if self.memory else None
+
+    def record(self, event: dict) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    def stage(self, name: str, rows_in: int = None):
+        """
+        Context manager timing the block as one stage
+
+        returns: StageRecord, or a shared no-op while disabled
+        """
+        if not self.enabled:
+            return _DISABLED
+        return StageRecord(self, name, rows_in)
+
+    def traced(self, name: str = None):
+        """
+        Decorator timing every call of the function as one stage. Rows in are the rows of
+        the frame arguments, rows out those of the returned frame.
+        """
+        def decorator(function):
+            stage_name = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                counts = [frame_rows(value) for value in (*args, *kwargs.values())]
+                counts = [count for count in counts if count is not None]
+                with self.stage(stage_name, sum(counts) if counts else None) as record:
+                    result = function(*args, **kwargs)
+                    record.rows_out = frame_rows(result)
+                return result
+            return wrapper
+        return decorator
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Totals the recorded stages by name, slowest first
+
+        returns: pd.DataFrame with calls, seconds, rows_in, rows_out and memory_delta_mb
+        """
+        columns = ['name', 'calls', 'seconds', 'rows_in', 'rows_out', 'memory_delta_mb']
+        if not self.events:
+            return pd.DataFrame(columns=columns)
+        events = pd.DataFrame(self.events)
+        # Unknown row counts and deltas stay NaN instead of summing to 0
+        total = lambda values: values.astype(float).sum(min_count=1)
+        return (events.groupby('name')
+                .agg(calls=('seconds', 'size'), seconds=('seconds', 'sum'),
+                     rows_in=('rows_in', total), rows_out=('rows_out', total),
+                     memory_delta_mb=('memory_delta_mb', total))
+                .sort_values('seconds', ascending=False)
+                .reset_index()[columns])
+
+    def chrome_trace(self) -> dict:
+        """
+        Formats the events in the Chrome trace event format, which chrome://tracing,
+        Perfetto and speedscope open as a flame chart
+
+        returns: dict
+        """
+        threads: dict = {}
+        trace_events: list = []
+        for event in sorted(self.events, key=lambda event: event['start']):
+            args = {key: event[key] for key in ('rows_in', 'rows_out', 'memory_delta_mb')
+                    if event[key] is not None}
+            trace_events.append({
+                'name': event['name'],
+                'ph': 'X',
+                'ts': round((event['start'] - self.origin) * 1e6, 1),
+                'dur': round(event['seconds'] * 1e6, 1),
+                'pid': os.getpid(),
+                'tid': threads.setdefault(event['thread'], len(threads)),
+                'args': args,
+            })
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def save(self, path) -> Path:
+        """
+        Writes the Chrome trace of the recorded events
+
+        returns: Path of the file written
+        """
+        path = Path(path)
+        path.write_text(json.dumps(self.chrome_trace()))
+        return path
+
+
+TRACER = Tracer()
+stage = TRACER.stage
+traced = TRACER.traced
+
+if os.environ.get(TRACE_ENV):
+    TRACER.enable(memory=bool(os.environ.get(TRACE_MEMORY_ENV)))
+    atexit.register(TRACER.save, os.environ[TRACE_ENV])
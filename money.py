@@ -0,0 +1,105 @@
+"""money.py: Vectorized parsing of the currency columns of the site list"""
+import numpy as np
+import pandas as pd
+from instrumentation import traced
+
+# What Site.format_nrc has always extracted from an nrc value
+MONEY_PATTERN = r'([\d,]+\.\d{2})'
+# Values that mean "no amount yet", parsed straight to NaN
+PLACEHOLDERS = frozenset(['', '-', 'tbd', 'nan'])
+# Rows are parsed in chunks to bound the char matrix of a long column
+CHUNK_ROWS = 65536
+# Integer cents stay exact in a float64 up to 15 digits
+MAX_DIGITS = 15
+# Widest value the fast path can parse: '$', the digits with a comma per three and '.'.
+# Values are cut one char past it when building the char matrix, so a long note cannot
+# widen the matrix; cut values fail the fast path and go to the fallback whole.
+MAX_AMOUNT_CHARS = 1 + MAX_DIGITS + MAX_DIGITS // 3 + 1
+
+_DOLLAR, _COMMA, _DOT, _ZERO, _NINE = (ord(char) for char in '$,.09')
+
+
+def _fast_chunk(text: np.ndarray) -> tuple:
+    """
+    Parses the values shaped like '$1,234.56' or '1234.56' from their code points. The
+    chars are walked one column at a time over all rows, checking the shape and
+    accumulating the digits into integer cents.
+
+    returns: tuple of (np.ndarray of float amounts, np.ndarray of bool, True where parsed)
+    """
+    n = len(text)
+    codes = text.view(np.uint32).reshape(n, text.dtype.itemsize // 4)
+    lengths = (codes != 0).sum(axis=1)
+    width = int(lengths.max()) if n else 0
+    # One contiguous row of code points per char position, up to the longest value
+    columns = codes[:, :width].T.copy()
+    dot_at = lengths - 3
+    ok = (lengths >= 4) & (lengths <= MAX_AMOUNT_CHARS)
+    has_amount = np.zeros(n, dtype=bool)
+    cents = np.zeros(n, dtype=np.int64)
+    digits = np.zeros(n, dtype=np.int64)
+    for position in range(width):
+        chars = columns[position]
+        values = chars - _ZERO
+        # Chars below '0' wrap around, so one comparison finds the digits
+        is_digit = values < 10
+        before_dot = position < dot_at
+        amount_char = is_digit | (before_dot & (chars == _COMMA))
+        allowed = amount_char | (chars == _DOLLAR) if position == 0 else amount_char
+        at_dot = dot_at == position
+        ok &= (allowed & ~at_dot) | (at_dot & (chars == _DOT)) | (position >= lengths)
+        has_amount |= before_dot & amount_char
+        cents = np.where(is_digit, cents * 10 + values, cents)
+        digits += is_digit
+    ok &= has_amount & (digits <= MAX_DIGITS)
+    # Exact cents / 100 rounds to the same float as float('1234.56')
+    return np.where(ok, cents / 100, np.nan), ok
+
+
+def _fallback(text: pd.Series, how: str) -> pd.Series:
+    """
+    Parses the values the fast path could not
+
+    returns: pd.Series of float
+    """
+    if how == 'extract':
+        return (text.str.extract(MONEY_PATTERN)[0]
+                .str.replace(',', '', regex=False)
+                .astype(float))
+    cleaned = text.str.replace(r'[$,\s]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce').astype(float)
+
+
+@traced('parse_money')
+def parse_money(values: pd.Series, fallback: str = 'extract') -> pd.Series:
+    """
+    Parses a currency column such as nrc or old_mrc. '$1,234.56' style values take a
+    vectorized fast path, placeholders ('-', 'TBD', blanks) become NaN and only the
+    remaining rows go through the fallback:
+    'extract' pulls the first amount out of the text like Site.format_nrc always did,
+    'numeric' drops '$' and commas and converts the rest, NaN when it is not a number.
+
+    returns: pd.Series of float aligned with values
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    if values.dtype != object and not pd.api.types.is_string_dtype(values):
+        values = values.astype(str)
+    amounts = np.full(len(values), np.nan)
+    parsed = np.zeros(len(values), dtype=bool)
+    for start in range(0, len(values), CHUNK_ROWS):
+        # Going through object, to_numpy(dtype=str) truncates arrow backed strings
+        chunk: np.ndarray = (values.iloc[start:start + CHUNK_ROWS]
+                             .to_numpy(dtype=object, na_value='')
+                             .astype(f'U{MAX_AMOUNT_CHARS + 1}'))
+        stop = start + len(chunk)
+        amounts[start:stop], parsed[start:stop] = _fast_chunk(chunk)
+
+    rest = np.flatnonzero(~parsed)
+    if len(rest):
+        leftover: pd.Series = values.iloc[rest]
+        placeholder = (leftover.isna()
+                       | leftover.str.strip().str.lower().isin(PLACEHOLDERS)).to_numpy()
+        if not placeholder.all():
+            amounts[rest[~placeholder]] = _fallback(leftover[~placeholder], fallback).to_numpy()
+    return pd.Series(amounts, index=values.index, name=values.name)
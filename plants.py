@@ -1,23 +1,63 @@
 """Class used to get counts and cost for plants"""
+from functools import cached_property
 import pandas as pd
+from aggregation import Metric, aggregate
+from dedup import Dedup
+from fdb_key import LISTED_COLUMN, join_on_fdbid
+from incremental import DEFAULT_STATE_DIR, IncrementalAggregate
+from instrumentation import traced
 from server_class import Server
 from site_tracking import ClassInterface, Tipne
+from status_classifier import STATUS_CLASSIFIER
+
+# Plant counts are grouped by new_provider over the plant statuses
+PLANT_COUNT_METRICS: list = [
+    Metric('Assigned', LISTED_COLUMN, 'count'),
+    Metric('Deployed', LISTED_COLUMN, 'count', mask='is_complete'),
+]
+# A phase 2 tipne circuit is identified by these columns, copies of a circuit only
+# differ in old_service_number. phase is left out, it is the same on every row of the
+# phase 2 partition the circuits are taken from.
+PLANT_CIRCUITS = Dedup('plant_circuits',
+                       ('fdbid', 'new_provider', 'status', 'cutover_completed_date'))
+# Rows of merged_sl_tipne repeated in every column
+PLANT_ROWS = Dedup('plant_rows')
+# Plant costs are grouped by new_vendor over the plant rows of the site list
+PLANT_COST_METRICS: list = [
+    Metric('legacy_yearly_cost', 'legacy_yearly_cost', 'sum'),
+    Metric('yearly_cost', 'yearly_cost', 'sum'),
+]
 
 class Plant:
     """
     Phase 2 Sites are considered plants. This class uses the server and class interface
     classes to get the statuses of the sites and then calculates the cost and counts.
 
+    Constructing a Plant reads nothing. plant_df is built on first access and kept until
+    invalidate() is called.
     """
-    def __init__(self) -> None:
+    def __init__(self, interface: ClassInterface = None) -> None:
         self.server = Server()
-        self.interface = ClassInterface()
+        # A shared interface whose merged_sl_tipne is already built is used as is
+        self.interface = interface if interface is not None else ClassInterface()
         self.tipne = Tipne()
-        self.tipne.get_tipne()
-        self.interface.add_cutover_column()
-        self.plant_df = self.get_plants()
         self.plants_fdb = []
+        # Rows dropped by each Dedup of this Plant, by Dedup name
+        self.collapsed: dict = {}
 
+    @cached_property
+    def plant_df(self) -> pd.DataFrame:
+        """
+        returns: pd.DataFrame of the phase 2 rows of the interface's merged_sl_tipne
+        """
+        return self.get_plants()
+
+    def invalidate(self) -> None:
+        """
+        Drops plant_df and the interface's merged_sl_tipne so both are built again
+        """
+        self.__dict__.pop('plant_df', None)
+        self.interface.invalidate()
 
     def filter_to_phase_2(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -29,13 +69,14 @@ class Plant:
 
     def get_plants(self):
         """
-        gets the plants from the interface object's attribute, merged_sl_tipne
+        gets the plants from the phase 2 partition of the interface object's attribute,
+        merged_sl_tipne, without repeated rows, see PLANT_ROWS
 
         returns: pd.DataFrame
         """
-        return (
-            self.filter_to_phase_2(self.interface.merged_sl_tipne)
-        ).drop_duplicates()
+        plants, self.collapsed[PLANT_ROWS.name] = PLANT_ROWS.unique(
+            self.interface.merged_phases.get('2'))
+        return plants
 
 
     def merge_tipne(self):
@@ -45,29 +86,23 @@ class Plant:
         returns: pd.DataFrame
         """
         tipne_df: pd.DataFrame = self.server.run()
-        plants: pd.DataFrame = self.tipne.tipne_df
-        # Drop old_service_number to make circuits that are the same appear the same
-        # Drop duplicates to drop the same circuits
-        plants: pd.DataFrame = (self.filter_to_phase_2(plants)
-                  .drop(['old_service_number'], axis=1)
-                  .drop_duplicates()
-        )
+        # Keep one row per phase 2 circuit, see PLANT_CIRCUITS
+        plants, self.collapsed[PLANT_CIRCUITS.name] = PLANT_CIRCUITS.unique(
+            self.tipne.get_phases().get('2'))
+        plants = plants.drop(['old_service_number'], axis=1)
         self.plants_fdb = plants['fdbid'].unique()
 
-        return pd.merge(plants, tipne_df, on='fdbid', how='left')
+        return join_on_fdbid(plants, tipne_df)
 
     def group_by_vendor(self) -> pd.DataFrame:
         """
-        Gets the assigned and deployed count grouped by vendor and returns the two merged
+        Gets the assigned and deployed count grouped by vendor in one aggregation pass
 
         returns: pd.DataFrame
         """
         df: pd.DataFrame = self.merge_tipne()
-        assigned_count: pd.DataFrame = df.groupby('new_provider')['fdbid'].count().reset_index()
-        completed_count: pd.DataFrame = self.group_by_vendor_complted(df)
-        return (pd.merge(assigned_count, completed_count, on='new_provider', how='left')
-                .rename(columns={'fdbid_x': 'Assigned', 'fdbid_y': 'Deployed'})
-        )
+        return aggregate(df.assign(is_complete=self.completed_mask(df)),
+                         'new_provider', PLANT_COUNT_METRICS)
 
     def group_by_vendor_complted(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -76,11 +111,18 @@ class Plant:
 
         returns: pd.DataFrame
         """
-        completed_statuses: list = (['Cutover One Circuit Only - Complete',
-                                     'Cutover Full - Complete'])
-        completed_statuses_lower: list = [status.lower() for status in completed_statuses] # Lowercase for matching
-        completed_df: pd.DataFrame = df[df['status'].str.lower().isin(completed_statuses_lower)]
-        return completed_df.groupby('new_provider')['fdbid'].count().reset_index()
+        completed_df: pd.DataFrame = df[self.completed_mask(df)]
+        return completed_df.groupby('new_provider', observed=True)['fdbid'].count().reset_index()
+
+    @staticmethod
+    def completed_mask(df: pd.DataFrame) -> pd.Series:
+        """
+        Flags rows whose tipne status is a completed cutover
+
+        returns: pd.Series of bool
+        """
+        # See status_classifier.COMPLETED_STATUSES
+        return STATUS_CLASSIFIER.flag(df['status'], 'is_complete')
 
     def get_financials(self) -> pd.DataFrame:
         """
@@ -88,6 +130,7 @@ class Plant:
 
         returns pd.DataFrame
         """
+        self.interface.site_list.get_site_list()
         site_list: pd.DataFrame = self.interface.site_list.site_list_df
 
         # self.plants_fdb houses the phase 2 fdbids needed for filtering
@@ -96,17 +139,12 @@ class Plant:
 
     def merge_costs(self, df: pd.DataFrame)-> pd.DataFrame:
         """
-        Uses the get_yearly sum and get_legacy_cost functions to create two dataframes
-        and then merge those two dataframes for a complete cost dataframe
+        Sums the legacy and yearly costs by vendor in one aggregation pass for a complete
+        cost dataframe
 
         returns pd.DataFrame
         """
-        new_cost: pd.DataFrame = self.get_yearly_sum(df)
-        legacy_cost: pd.DataFrame = self.get_legacy_cost(df)
-        return (pd.merge(legacy_cost, new_cost, on='new_vendor', how='left')
-                .rename({'new_vendor': 'new_provider',
-                         'yearly_cost': 'TIPNe Cost',
-                         'legacy_cost': 'Legacy Cost'}))
+        return aggregate(df, 'new_vendor', PLANT_COST_METRICS)
 
     def get_yearly_sum(self, df:pd.DataFrame) -> pd.DataFrame:
         """
@@ -114,7 +152,7 @@ class Plant:
 
         returns pd.DataFrame
         """
-        return (df.groupby('new_vendor')['yearly_cost']
+        return (df.groupby('new_vendor', observed=True)['yearly_cost']
                 .sum()
                 .reset_index()
         )
@@ -125,22 +163,51 @@ class Plant:
 
         returns pd.DataFrame
         """
-        return (df.groupby('new_vendor')['legacy_yearly_cost']
+        return (df.groupby('new_vendor', observed=True)['legacy_yearly_cost']
                 .sum()
                 .reset_index()
         )
 
-    def get_final_plant_df(self) -> pd.DataFrame:
+    @traced('plant.get_final_plant_df')
+    def get_final_plant_df(self, incremental: bool = False) -> pd.DataFrame:
         """
-        Runs the Plant class to get counts and cost for sites
+        Runs the Plant class to get counts and cost for sites.
+        See incremental_final_plant_df for incremental=True.
 
         returns merged pd.DataFrame of counts and cost
         """
+        if incremental:
+            return self.incremental_final_plant_df()
         count: pd.DataFrame = self.group_by_vendor()
         costs: pd.DataFrame = self.get_financials()
         return (pd.merge(count, costs, left_on='new_provider', right_on='new_vendor', how='left')
                 .drop(['new_vendor'], axis=1)
         )
+
+    def incremental_final_plant_df(self, state_dir=DEFAULT_STATE_DIR) -> pd.DataFrame:
+        """
+        Builds the get_final_plant_df table by diffing the plant statuses and the plant
+        site list rows against the last run, re-aggregating only changed fdbids
+
+        returns merged pd.DataFrame of counts and cost
+        """
+        df: pd.DataFrame = self.merge_tipne()
+        count: pd.DataFrame = (
+            IncrementalAggregate('plant_counts', 'new_provider', PLANT_COUNT_METRICS,
+                                 state_dir=state_dir)
+            .update(df.assign(is_complete=self.completed_mask(df)))
+        )
+
+        self.interface.site_list.get_site_list()
+        site_list: pd.DataFrame = self.interface.site_list.site_list_df
+        costs: pd.DataFrame = (
+            IncrementalAggregate('plant_costs', 'new_vendor', PLANT_COST_METRICS,
+                                 state_dir=state_dir)
+            .update(site_list[site_list['fdbid'].isin(self.plants_fdb)])
+        )
+        return (pd.merge(count, costs, left_on='new_provider', right_on='new_vendor', how='left')
+                .drop(['new_vendor'], axis=1)
+        )
     
     def dummy(self): 
         print('testing github')
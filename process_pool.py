@@ -0,0 +1,177 @@
+"""process_pool.py: Opt in process pool for the CPU bound formatting and aggregation steps"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from data_context import get_context
+from instrumentation import traced
+
+# Smaller frames are processed in the calling process, shipping them costs more than it
+# saves. A guess, not measured on a multi core host: on one core format_site_list took
+# 0.64s serial and 3.9s on a spawned pool, so time both before raising process_workers.
+PROCESS_MIN_ROWS = 200_000
+
+_pools: dict = {}
+_pools_lock = threading.Lock()
+
+
+def pool_workers(rows: int) -> int:
+    """
+    returns: the number of worker processes to use for a frame of rows, 0 when the
+    DataContext does not enable the pool, the frame is too small to be worth it or the
+    host has a single core, where the workers would only take turns with this process
+    """
+    workers = get_context().process_workers
+    if (os.cpu_count() or 1) < 2:
+        return 0
+    return workers if workers and workers > 1 and rows >= PROCESS_MIN_ROWS else 0
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Workers are spawned rather than forked, forking a process that runs the report
+    runner's threads can deadlock. The pool is kept for the life of the process so the
+    start up cost is paid once.
+
+    returns: ProcessPoolExecutor
+    """
+    with _pools_lock:
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pools[workers]
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(cancel_futures=True)
+        _pools.clear()
+
+
+def to_ipc(df: pd.DataFrame) -> pa.Buffer:
+    """
+    returns: pa.Buffer holding df as an Arrow IPC stream
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def from_ipc(buffer) -> pd.DataFrame:
+    """
+    returns: pd.DataFrame read from an Arrow IPC stream, extension dtypes restored
+    """
+    with pa.ipc.open_stream(buffer) as reader:
+        return reader.read_all().to_pandas()
+
+
+def to_shared(df: pd.DataFrame) -> tuple:
+    """
+    Writes df as Arrow IPC into a shared memory block for the workers
+
+    returns: tuple of (SharedMemory, size in bytes)
+    """
+    buffer = to_ipc(df)
+    block = shared_memory.SharedMemory(create=True, size=max(buffer.size, 1))
+    block.buf[:buffer.size] = memoryview(buffer).cast('B')
+    return block, buffer.size
+
+
+def from_shared(name: str, size: int) -> pd.DataFrame:
+    """
+    Copies the stream out once so the frame does not point into the block, which the
+    parent unlinks as soon as the results are in
+
+    returns: pd.DataFrame read from the shared memory block written by to_shared
+    """
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        stream = bytes(block.buf[:size])
+    finally:
+        block.close()
+    return from_ipc(pa.py_buffer(stream))
+
+
+def _run_partition(function, name: str, size: int, args: tuple) -> bytes:
+    """
+    Worker side of map_frames
+
+    returns: bytes of the Arrow IPC stream of function's result
+    """
+    return to_ipc(function(from_shared(name, size), *args)).to_pybytes()
+
+
+@traced('process_pool.map_frames')
+def map_frames(function, frames: list, workers: int, args: tuple = ()) -> list:
+    """
+    Runs function(frame, *args) for every frame on the process pool. Frames go to the
+    workers through shared memory and the results come back as Arrow IPC, so no frame is
+    pickled. function must be importable by the workers, i.e. defined at module level.
+
+    returns: list of pd.DataFrame results in the order of frames
+    """
+    blocks: list = [to_shared(frame) for frame in frames]
+    try:
+        futures = [get_pool(workers).submit(_run_partition, function, block.name, size, args)
+                   for block, size in blocks]
+        return [from_ipc(pa.py_buffer(future.result())) for future in futures]
+    finally:
+        for block, _ in blocks:
+            block.close()
+            block.unlink()
+
+
+def partition_rows(df: pd.DataFrame, parts: int) -> list:
+    """
+    returns: list of parts contiguous slices of df
+    """
+    bounds = np.linspace(0, len(df), parts + 1).astype(int)
+    return [df.iloc[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def partition_by_key(df: pd.DataFrame, key: pd.Series, parts: int) -> list:
+    """
+    Splits df so all rows with the same key land in the same part, e.g. every row of an
+    fdbid. Keys are hashed so the parts come out about the same size.
+
+    returns: list of parts frames
+    """
+    buckets = pd.util.hash_pandas_object(key, index=False).to_numpy() % parts
+    return [df[buckets == part] for part in range(parts)]
+
+
+def _group_aggregate(df: pd.DataFrame, by: str, named: dict) -> pd.DataFrame:
+    return df.groupby(by, observed=True).agg(**named).reset_index()
+
+
+@traced('process_pool.aggregate')
+def aggregate_partitioned(work: pd.DataFrame, by: str, named: dict, workers: int,
+                          key: pd.Series = None) -> pd.DataFrame:
+    """
+    Runs the named aggregation of aggregation.aggregate over partitions of work on the
+    pool and combines the partial results.
+
+    With a key every key's rows share a partition, so the parts scale with the worker
+    count and distinct counts of the key still add up: the partials are summed by group.
+    Without one the rows are split by group, one group never spans two partitions and
+    the partials are simply concatenated.
+
+    returns: pd.DataFrame like aggregation.aggregate
+    """
+    if key is not None:
+        partials = map_frames(_group_aggregate, partition_by_key(work, key, workers), workers,
+                              (by, named))
+        return pd.concat(partials).groupby(by, observed=True).sum().reset_index()
+    groups = work[by].drop_duplicates().dropna()
+    parts = partition_by_key(work, work[by], min(workers, max(len(groups), 1)))
+    partials = map_frames(_group_aggregate, parts, workers, (by, named))
+    return pd.concat(partials).sort_values(by).reset_index(drop=True)
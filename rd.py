@@ -1,13 +1,62 @@
+from functools import cached_property
 from site_tracking import ClassInterface
 import pandas as pd
+from aggregation import Metric, aggregate
+from fdb_key import LISTED_COLUMN, in_key_index
+from incremental import DEFAULT_STATE_DIR, IncrementalAggregate
+from instrumentation import traced
+
+# Phase buckets reported by RD, in report column order
+PHASE_BUCKETS = {
+    'Single Transport': ['4'],
+    'LEO': ['LEO'],
+    'Broadband': ['1', '3', 'SP'],
+}
+
+PHASE_TO_BUCKET = {phase: bucket for bucket, phases in PHASE_BUCKETS.items() for phase in phases}
+# These numbers match up with Tipne Project Tracking
+RD_PHASES = list(PHASE_TO_BUCKET)
+
+# Counts and legacy cost of the RD table, grouped by new_provider. Circuits are counted
+# on LISTED_COLUMN so those with a placeholder fdbid such as 'TBD' still count.
+RD_METRICS = [
+    Metric('assigned', LISTED_COLUMN, 'count'),
+    Metric('deployed', LISTED_COLUMN, 'count', mask='is_deployed'),
+    Metric('legacy_yearly_cost', 'legacy_yearly_cost', 'sum'),
+]
+# Count and cost of each phase bucket
+PHASE_METRICS = [
+    metric for bucket in PHASE_BUCKETS for metric in (
+        Metric(f'{bucket} Count', LISTED_COLUMN, 'count', mask=f'in_{bucket}'),
+        Metric(f'{bucket} Cost', 'yearly_cost', 'sum', mask=f'in_{bucket}'),
+    )
+]
 
 class RD:
-    def __init__(self):
-        self.interface = ClassInterface()
-        self.interface.add_cutover_column()
-        self.rd_df = pd.DataFrame()
+    """
+    Constructing an RD reads nothing. rd_df is built on first access and kept until
+    invalidate() is called.
+    """
+    def __init__(self, interface: ClassInterface = None):
+        # A shared interface whose merged_sl_tipne is already built is used as is
+        self.interface = interface if interface is not None else ClassInterface()
+
+    @cached_property
+    def rd_df(self):
+        """
+        returns: pd.DataFrame of the RD phase rows of merged_sl_tipne, SDC sites left out
+        """
+        return self.get_rd_df()
+
+    def invalidate(self):
+        """
+        Drops rd_df and the interface's merged_sl_tipne so both are built again
+        """
+        self.__dict__.pop('rd_df', None)
+        self.interface.invalidate()
 
     @staticmethod
+    @traced('rd.merge_abstract')
     def merge_abstract(df_1, df_2):
         return pd.merge(df_1, df_2, on='new_provider', how='outer')
     
@@ -15,35 +64,31 @@ class RD:
         return rd_df[rd_df["is_cutover"] == True]
 
     def get_vendor_counts(self, rd_df: pd.DataFrame, col_rename: str):
-        return rd_df.groupby('new_provider')['fdbid'].count().reset_index().rename(columns={'fdbid': col_rename})
+        return rd_df.groupby('new_provider', observed=True)['fdbid'].count().reset_index().rename(columns={'fdbid': col_rename})
     
     def get_yearly_cost_by_vendor(self, rd_df:pd.DataFrame, mrc_col: str):
-        return rd_df.groupby('new_provider')[mrc_col].sum()
+        return rd_df.groupby('new_provider', observed=True)[mrc_col].sum()
     
     def get_rd_df(self):
-        df = self.interface.merged_sl_tipne
-        phases = ['1', '3', '4', 'SP','LEO'] # These numbers match up with Tipne Project Tracking
-        slim_df = df[(df['phase'].isin(phases)) & ~df['fdbid'].isin(self.interface.sdc.sdc_fdbs)]
+        """
+        Takes the RD_PHASES rows of merged_sl_tipne from its phase partitions, where they
+        are one slice, and leaves the SDC sites out
+
+        returns: pd.DataFrame grouped by phase
+        """
+        df = self.interface.merged_phases.select(RD_PHASES)
+        slim_df = df[~in_key_index(df['fdbid'], self.interface.sdc.sdc_index)]
         self.rd_df = slim_df
+        return slim_df
 
+    @traced('rd.run_phases')
     def run_phases(self):
-        phases = [['4'], ['LEO'], ['1', '3', 'SP']]
-        df_list = [self.get_phase_cost_counts(phase) for phase in phases] 
-        return self.merge_list(df_list)
-
-    def merge_list(self, df_list):
-        init_df = df_list[0]
-        rest_df = df_list[1:]
-        for df in rest_df:
-            init_df = self.merge_abstract(init_df, df)
-        return init_df
-
-    def get_phase_cost_counts(self, phase:list):
-        phase_df = self.rd_df[(self.rd_df['phase'].isin(phase)) & (~self.rd_df['fdbid'].isin(self.interface.sdc.sdc_fdbs))]
-        count = self.get_vendor_counts(phase_df, 'Count')
-        cost = self.get_yearly_cost_by_vendor(phase_df, 'yearly_cost')
-        return self.merge_abstract(count, cost)
-        
+        """
+        Gets the count and cost of every PHASE_BUCKETS bucket and provider from one
+        aggregation of PHASE_METRICS, one column per bucket and metric, e.g. 'LEO Count'.
+        Providers missing from a bucket count 0.
+        """
+        return aggregate(self.metric_frame(), 'new_provider', PHASE_METRICS)
 
     def get_assigned_deployed_counts(self):
         assign_counts = self.get_vendor_counts(self.rd_df, 'assigned')
@@ -53,24 +98,31 @@ class RD:
     def get_legacy_costs(self):
         return self.get_yearly_cost_by_vendor(self.rd_df, 'legacy_yearly_cost')
     
+    def metric_frame(self):
+        """
+        Adds the deployed and phase bucket masks RD_METRICS and PHASE_METRICS refer to
+        """
+        masks = {'is_deployed': self.rd_df['is_cutover'] == True}
+        for bucket, phases in PHASE_BUCKETS.items():
+            masks[f'in_{bucket}'] = self.rd_df['phase'].isin(phases)
+        return self.rd_df.assign(**masks)
+
+    @traced('rd.merge')
     def merge(self):
-        self.get_rd_df()
-        assigned, deployed = self.get_assigned_deployed_counts()
-        legacy_cost = self.get_legacy_costs()
-        counts = pd.merge(assigned, deployed, on='new_provider', how='left')
-        counts_cost = pd.merge(counts, legacy_cost, on='new_provider', how='left')
-        return (self.merge_abstract(counts_cost, self.run_phases())
-                .fillna(0)
-                .rename(columns={'Count_x': 'Single Transport Count',
-                                 'yearly_cost_x': 'Single Transport Cost',
-                                 'Count_y': 'LEO Count',
-                                 'yearly_cost_y': 'LEO Cost',
-                                 'Count': 'Broadband Count',
-                                 'yearly_cost': 'Broadband Cost'})
-        )
-    
-    
-    
+        # The counts, legacy cost and phase buckets come out of one aggregation pass, with
+        # the metrics incremental_merge updates
+        return aggregate(self.metric_frame(), 'new_provider', RD_METRICS + PHASE_METRICS)
+
+    def incremental_merge(self, state_dir=DEFAULT_STATE_DIR):
+        """
+        Builds the merge table by diffing rd_df against the last run's snapshot and
+        re-aggregating only the fdbids whose rows changed
+        """
+        incremental = IncrementalAggregate('rd', 'new_provider', RD_METRICS + PHASE_METRICS,
+                                           state_dir=state_dir)
+        return incremental.update(self.metric_frame())
+
+
 if __name__ == '__main__':
     rd = RD()
     print(rd.merge())
\ No newline at end of file
@@ -0,0 +1,281 @@
+"""report_runner.py: Builds the SDC, Plant and RD tables and their overview from one dependency graph"""
+import argparse
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+import pandas as pd
+from data_context import get_context
+from history_store import HistoryStore
+from instrumentation import stage
+from plants import Plant
+from rd import PHASE_BUCKETS, RD
+from sdc_class import Sdc
+from server_class import Server
+from site_tracking import ClassInterface, Site, Tipne
+
+
+@dataclass
+class Node:
+    """
+    One step of the report graph. function receives a dict of the results of the nodes
+    named in deps and returns this node's result.
+    """
+    name: str
+    function: object
+    deps: tuple = ()
+
+
+class ReportRunner:
+    """
+    Runs a graph of Nodes on a thread pool. A node starts as soon as all of its deps are
+    done, so independent reads overlap, and every node runs once per run no matter how
+    many nodes depend on it. Shared frames are also memoized by the DataContext, so the
+    Sdc, Plant and RD objects built by the nodes reuse the reads of earlier nodes.
+    """
+    def __init__(self, nodes: list = None, max_workers: int = None) -> None:
+        self.nodes: dict = {node.name: node for node in (nodes or REPORT_NODES)}
+        self.max_workers: int = max_workers
+        # Wall time of each node of the last run
+        self.timings: dict = {}
+
+    def order(self, targets=None) -> list:
+        """
+        Topologically sorts the targets (every node by default) and their dependencies
+
+        returns: list of node names, dependencies first
+        """
+        ordered: list = []
+        state: dict = {}
+
+        def visit(name: str) -> None:
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Dependency cycle through node {name}")
+            if name not in self.nodes:
+                raise KeyError(f"Unknown node {name}")
+            state[name] = 'visiting'
+            for dep in self.nodes[name].deps:
+                visit(dep)
+            state[name] = 'done'
+            ordered.append(name)
+
+        for target in targets or self.nodes:
+            visit(target)
+        return ordered
+
+    def dependents(self, names) -> set:
+        """
+        returns: set of the named nodes and every node depending on them, directly or not
+        """
+        found: set = set(names)
+        changed: bool = True
+        while changed:
+            changed = False
+            for node in self.nodes.values():
+                if node.name not in found and found.intersection(node.deps):
+                    found.add(node.name)
+                    changed = True
+        return found
+
+    def _run_node(self, name: str, results: dict):
+        node = self.nodes[name]
+        start = time.perf_counter()
+        with stage(f'report_runner.{name}'):
+            result = node.function({dep: results[dep] for dep in node.deps})
+        self.timings[name] = time.perf_counter() - start
+        return result
+
+    def run(self, targets=None, reuse: dict = None) -> dict:
+        """
+        Runs the targets and everything they depend on. Nodes whose result is in reuse,
+        e.g. from an earlier run, are not run again. The first node to fail stops the
+        run and its exception is raised once the running nodes finish.
+
+        returns: dict of node name to result
+        """
+        reuse = reuse or {}
+        pending: list = [name for name in self.order(targets) if name not in reuse]
+        results: dict = {name: result for name, result in reuse.items() if name in self.nodes}
+        self.timings = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running: dict = {}
+            while pending or running:
+                for name in [name for name in pending
+                             if all(dep in results for dep in self.nodes[name].deps)]:
+                    pending.remove(name)
+                    running[executor.submit(self._run_node, name, results)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        pending.clear()
+                        wait(running)
+                        raise future.exception()
+                    results[name] = future.result()
+        return results
+
+
+def build_sdc(results: dict) -> Sdc:
+    """
+    returns: Sdc with its merged_df built
+    """
+    sdc = Sdc()
+    sdc.merged_df
+    return sdc
+
+
+def build_interface(results: dict) -> ClassInterface:
+    """
+    Only RD reads the interface's sdc, for the SDC fdbids, so the interface does not
+    wait for the Sdc node
+
+    returns: ClassInterface with merged_sl_tipne built
+    """
+    interface = ClassInterface()
+    interface.merged_sl_tipne
+    return interface
+
+
+def load_site_list(results: dict) -> Site:
+    """
+    returns: Site with its site list loaded
+    """
+    site = Site()
+    site.get_site_list()
+    return site
+
+
+def load_tipne(results: dict) -> Tipne:
+    """
+    returns: Tipne with its project tracking loaded
+    """
+    tipne = Tipne()
+    tipne.get_tipne()
+    return tipne
+
+
+def record_history(results: dict) -> int:
+    """
+    Appends the report tables to the DataContext's HistoryStore, keyed by the
+    fingerprints of the Splunk exports and the share files the run read
+
+    returns: int run_id, None when the DataContext keeps no history
+    """
+    context = get_context()
+    if context.history is None:
+        return None
+    files: dict = {'site_list': context.splunk_path + 'site_list.csv',
+                   'tipne': context.splunk_path + 'tipne.csv', **results['share']}
+    # Size and mtime_ns tell a new export apart without reading every file again
+    sources: dict = {name: context.frame_cache.fingerprint(path, with_hash=False)
+                     for name, path in files.items() if path}
+    tables: dict = {'SDC': results['sdc_table'], 'Plant': results['plant_table'],
+                    'RD': results['rd_table']}
+    vendor_columns: dict = {report: columns[0] for report, columns in REPORT_COLUMNS.items()}
+    return context.history.record(tables, vendor_columns, sources)
+
+
+REPORT_NODES: list = [
+    Node('share', lambda results: Server().get_latest_files()),
+    Node('site_list', load_site_list),
+    Node('tipne', load_tipne),
+    Node('vendor_statuses', lambda results: Server().get_sdc_site_tracking(), ('share',)),
+    Node('msp', lambda results: Server().run(), ('share',)),
+    Node('sdc', build_sdc, ('site_list', 'vendor_statuses')),
+    Node('interface', build_interface, ('site_list', 'tipne')),
+    Node('sdc_table', lambda results: results['sdc'].merge_count_costs(), ('sdc',)),
+    Node('plant_table', lambda results: Plant(results['interface']).get_final_plant_df(),
+         ('interface', 'msp')),
+    Node('rd_table', lambda results: RD(results['interface']).merge(), ('interface',)),
+    Node('overview', lambda results: overview(
+        {'SDC': results['sdc_table'], 'Plant': results['plant_table'],
+         'RD': results['rd_table']}), ('sdc_table', 'plant_table', 'rd_table')),
+    Node('history', record_history, ('share', 'sdc_table', 'plant_table', 'rd_table')),
+]
+
+# Nodes holding the report tables and their overview
+TABLE_NODES: tuple = ('sdc_table', 'plant_table', 'rd_table', 'overview')
+# Nodes a full refresh runs, the tables plus the history record
+REPORT_TARGETS: tuple = (*TABLE_NODES, 'history')
+
+# Vendor, assigned and deployed columns of each report table
+REPORT_COLUMNS: dict = {
+    'SDC': ('new_vendor', 'Assigned', 'Deployed'),
+    'Plant': ('new_provider', 'Assigned', 'Deployed'),
+    'RD': ('new_provider', 'assigned', 'deployed'),
+}
+
+
+def report_rows(report: str, table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Puts one report table in the common overview layout. RD's yearly cost is the sum
+    of its phase bucket costs.
+
+    returns: pd.DataFrame with vendor, report, Assigned, Deployed and the costs
+    """
+    vendor, assigned, deployed = REPORT_COLUMNS[report]
+    if report == 'RD':
+        yearly_cost = table[[f'{bucket} Cost' for bucket in PHASE_BUCKETS]].sum(axis=1)
+    else:
+        yearly_cost = table['yearly_cost']
+    return pd.DataFrame({
+        'vendor': table[vendor],
+        'report': report,
+        'Assigned': table[assigned],
+        'Deployed': table[deployed],
+        'legacy_yearly_cost': table['legacy_yearly_cost'],
+        'yearly_cost': yearly_cost,
+    })
+
+
+def overview(tables: dict) -> pd.DataFrame:
+    """
+    Combines the report tables into one row per vendor: the assigned and deployed counts
+    of every report, their totals and the summed legacy and current yearly costs
+
+    returns: pd.DataFrame
+    """
+    rows = pd.concat([report_rows(report, table) for report, table in tables.items()],
+                     ignore_index=True)
+    counts = rows.pivot_table(index='vendor', columns='report', values=['Assigned', 'Deployed'],
+                              aggfunc='sum')
+    columns = [(metric, report) for report in tables for metric in ('Assigned', 'Deployed')]
+    counts = counts.reindex(columns=columns)
+    counts.columns = [f'{report} {metric}' for metric, report in columns]
+    totals = rows.groupby('vendor')[['Assigned', 'Deployed', 'legacy_yearly_cost',
+                                     'yearly_cost']].sum()
+    return counts.join(totals).fillna(0).reset_index()
+
+
+def write_tables(results: dict, output_dir, names=TABLE_NODES) -> list:
+    """
+    Writes each named table of a run as output_dir/<name>.csv
+
+    returns: list of the Paths written
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths: list = []
+    for name in names:
+        results[name].to_csv(output_dir / f'{name}.csv', index=False)
+        paths.append(output_dir / f'{name}.csv')
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, help='threads running the graph nodes')
+    parser.add_argument('--output-dir', help='also write each table as csv here')
+    parser.add_argument('--history', help='append the tables to this HistoryStore file')
+    args = parser.parse_args()
+    if args.history:
+        get_context().history = HistoryStore(args.history)
+    runner = ReportRunner(max_workers=args.workers)
+    tables = runner.run(REPORT_TARGETS)
+    for name in TABLE_NODES:
+        print(f'{name}\n{tables[name]}\n')
+    if args.output_dir:
+        write_tables(tables, args.output_dir)
+    print({name: round(seconds, 3) for name, seconds in runner.timings.items()})
@@ -0,0 +1,199 @@
+"""report_service.py: Local HTTP service serving the report tables from memory with ETags"""
+import argparse
+import hashlib
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from report_runner import TABLE_NODES
+from watch import Watcher
+
+CONTENT_TYPES: dict = {
+    'json': 'application/json',
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+class Snapshot:
+    """
+    The tables of one refresh and the fingerprint of the source files they were built
+    from. Snapshots are never modified once published, readers keep the one they got.
+    Serialized tables are kept so each format is encoded once per snapshot.
+    """
+    def __init__(self, tables: dict, fingerprint: str) -> None:
+        self.tables: dict = tables
+        self.fingerprint: str = fingerprint
+        self._encoded: dict = {}
+
+    def etag(self, name: str, fmt: str) -> str:
+        """
+        returns: str ETag of the table in the format, changes only with the source files
+        """
+        return f'"{self.fingerprint}-{name}-{fmt}"'
+
+    def encode(self, name: str, fmt: str) -> bytes:
+        """
+        returns: bytes of the table as json records, csv or parquet
+        """
+        key = (name, fmt)
+        if key not in self._encoded:
+            table = self.tables[name]
+            if fmt == 'json':
+                body = table.to_json(orient='records').encode('utf-8')
+            elif fmt == 'csv':
+                body = table.to_csv(index=False).encode('utf-8')
+            else:
+                buffer = io.BytesIO()
+                table.to_parquet(buffer, index=False)
+                body = buffer.getvalue()
+            self._encoded[key] = body
+        return self._encoded[key]
+
+
+def source_fingerprint(stats: dict) -> str:
+    """
+    returns: str hash of the size and mtime of every watched source file
+    """
+    listing = sorted((path, size, mtime_ns) for path, (_, size, mtime_ns) in stats.items())
+    return hashlib.sha1(json.dumps(listing).encode()).hexdigest()[:20]
+
+
+class ReportService:
+    """
+    Holds the latest report tables in memory and refreshes them in the background
+    through a Watcher, so a changed file only reruns the tables it feeds. Requests never
+    run the pipeline, they read the last published Snapshot. Refreshes are single
+    flighted: a refresh requested while one is running waits for it instead of starting
+    another.
+    """
+    def __init__(self, watcher: Watcher = None, interval: float = 5.0) -> None:
+        self.watcher: Watcher = watcher if watcher is not None else Watcher()
+        self.interval: float = interval
+        self.snapshot: Snapshot = None
+        # Number of refreshes that ran any pipeline node
+        self.runs: int = 0
+        self._refresh_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread = None
+
+    def refresh(self) -> Snapshot:
+        """
+        Polls the sources and publishes a new Snapshot when anything was rerun
+
+        returns: Snapshot current after the refresh
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            # A refresh is in flight, its result is as fresh as ours would be
+            with self._refresh_lock:
+                return self.snapshot
+        try:
+            ran = self.watcher.poll()
+            if ran or self.snapshot is None:
+                self.runs += bool(ran)
+                tables = {name: self.watcher.results[name] for name in TABLE_NODES}
+                self.snapshot = Snapshot(tables, source_fingerprint(self.watcher.stats))
+                self._ready.set()
+            return self.snapshot
+        finally:
+            self._refresh_lock.release()
+
+    def current(self, timeout: float = None) -> Snapshot:
+        """
+        returns: the latest Snapshot, waiting for the first refresh if needed
+        """
+        if not self._ready.wait(timeout):
+            raise TimeoutError('The first refresh has not finished')
+        return self.snapshot
+
+    def _poll_forever(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as error:  # pylint: disable=broad-except
+                # Keep serving the last good tables, e.g. while a file is half copied. The
+                # watcher keeps the change pending, so the next refresh tries it again.
+                print(f"Refresh failed: {error}")
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        """
+        Starts the background refresh thread
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll_forever, name='report-refresh',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the background refresh thread once its current refresh finishes
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def handler(self):
+        """
+        returns: BaseHTTPRequestHandler class serving this service's snapshots
+        """
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?')[0].strip('/')
+                if path in ('', 'tables'):
+                    return self.send_body(200, json.dumps(list(TABLE_NODES)).encode(),
+                                          CONTENT_TYPES['json'])
+                name, _, fmt = path[len('tables/'):].partition('.')
+                fmt = fmt or 'json'
+                if not path.startswith('tables/') or name not in TABLE_NODES \
+                        or fmt not in CONTENT_TYPES:
+                    return self.send_body(404, b'{"error": "not found"}', CONTENT_TYPES['json'])
+                try:
+                    snapshot = service.current(timeout=300)
+                except TimeoutError:
+                    return self.send_body(503, b'{"error": "tables not built yet"}',
+                                          CONTENT_TYPES['json'])
+                etag = snapshot.etag(name, fmt)
+                if etag in self.headers.get('If-None-Match', ''):
+                    return self.send_body(304, b'', None, etag)
+                return self.send_body(200, snapshot.encode(name, fmt), CONTENT_TYPES[fmt], etag)
+
+            def send_body(self, status: int, body: bytes, content_type: str,
+                          etag: str = None) -> None:
+                self.send_response(status)
+                if content_type:
+                    self.send_header('Content-Type', content_type)
+                if etag:
+                    self.send_header('ETag', etag)
+                    self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                return None
+
+        return Handler
+
+    def serve(self, host: str = '127.0.0.1', port: int = 8050) -> ThreadingHTTPServer:
+        """
+        returns: ThreadingHTTPServer bound to host and port, call serve_forever on it
+        """
+        return ThreadingHTTPServer((host, port), self.handler())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--interval', type=float, default=5.0, help='seconds between scans')
+    args = parser.parse_args()
+    service = ReportService(interval=args.interval)
+    service.start()
+    server = service.serve(args.host, args.port)
+    print(f'Serving {", ".join(TABLE_NODES)} on http://{args.host}:{server.server_port}/tables/')
+    server.serve_forever()
@@ -1,54 +1,88 @@
 """ SDC class is used to capture specfic logic for SDC sites and their unique statuses"""
-import time
 import asyncio
+from functools import cached_property
 import pandas as pd
+from aggregation import Metric, aggregate
+from fdb_key import in_key_index, join_on_fdbid, key_index
+from incremental import DEFAULT_STATE_DIR, IncrementalAggregate
+from instrumentation import traced
 from server_class import Server
 from site_tracking import Tipne, Site
+from status_classifier import STATUS_CLASSIFIER
+
+# Metrics of the final SDC table, grouped by new_vendor. nunique is used to get the
+# number of unique sites for a vendor.
+SDC_METRICS: list = [
+    Metric('Assigned', 'fdbid', 'nunique'),
+    Metric('Deployed', 'fdbid', 'nunique', mask='is_deployed'),
+    Metric('legacy_yearly_cost', 'legacy_yearly_cost', 'sum'),
+    Metric('yearly_cost', 'yearly_cost', 'sum'),
+]
+
+# Hard coded list determined manually
+SDC_FDBS: tuple = (
+    1589779, 1388480, 1599136, 1578072, 1578792, 1582789, 1599154, 1582791, 1599160,
+    1579662, 1582794, 1578073, 1579657, 1578793, 1599153, 1579664, 1579654, 1582556,
+    1599157, 1582554, 1582785, 1582543, 1579658, 1582778, 1582133, 1582550, 1599158,
+    1582129, 1599146, 1582837, 1585537, 1599155, 1582542, 1594603, 1594598, 1578797,
+    1579666, 1582135, 1578794, 1582549, 1589776, 1582790, 1579659, 1582553, 1436550,
+    1587292, 1582128, 1582781, 1599137, 1582551, 1589778, 1582131, 1582783, 1578796,
+    1582777, 1599147, 1579667, 1579660, 1582126, 1579653, 1582793, 1582541, 1599151,
+    1578798, 1583378, 1599149, 1578795, 1578074, 1582548, 1582130, 1583040, 1599161,
+    1594602, 1599152, 1582780, 1579663, 1579652, 1583380, 1582788, 1582127, 1577752,
+    1594600, 1594597, 1599145, 1582555, 1451470, 1583039, 1582546, 1574856, 1582124,
+    1352332, 1582123, 1582786, 1587280, 1587281, 1594601, 1594605, 1599156, 1599144,
+    1601568, 1434108, 1594599, 1579656, 1579665, 1578075, 1579661, 1582552, 1582132,
+    1594596, 1566914, 1578799, 1599138,
+)
+# Prebuilt hash index of the SDC fdbids, shared by every membership test
+SDC_FDB_INDEX = key_index(SDC_FDBS)
 
 
 class Sdc:
     """
     The SDC class is used to store FDB IDs that are SDCs to filter out from the site list.
+
+    Constructing an Sdc reads nothing. merged_df is built on first access and kept until
+    invalidate() is called.
     """
     def __init__(self):
         self.server: Server = Server()
         self.tipne: Tipne = Tipne()
         self.site_list: Site = Site()
-        self.tipne.get_tipne()
-        self.site_list.get_site_list()
-        # Hard coded list determined manually
-        self.sdc_fdbs: list= [
-                1589779, 1388480, 1599136, 1578072, 1578792, 1582789, 1599154, 1582791, 1599160,
-                1579662, 1582794, 1578073, 1579657, 1578793, 1599153, 1579664, 1579654, 1582556,
-                1599157, 1582554, 1582785, 1582543, 1579658, 1582778, 1582133, 1582550, 1599158,
-                1582129, 1599146, 1582837, 1585537, 1599155, 1582542, 1594603, 1594598, 1578797,
-                1579666, 1582135, 1578794, 1582549, 1589776, 1582790, 1579659, 1582553, 1436550,
-                1587292, 1582128, 1582781, 1599137, 1582551, 1589778, 1582131, 1582783, 1578796,
-                1582777, 1599147, 1579667, 1579660, 1582126, 1579653, 1582793, 1582541, 1599151,
-                1578798, 1583378, 1599149, 1578795, 1578074, 1582548, 1582130, 1583040, 1599161,
-                1594602, 1599152, 1582780, 1579663, 1579652, 1583380, 1582788, 1582127, 1577752,
-                1594600, 1594597, 1599145, 1582555, 1451470, 1583039, 1582546, 1574856, 1582124,
-                1352332, 1582123, 1582786, 1587280, 1587281, 1594601, 1594605, 1599156, 1599144,
-                1601568, 1434108, 1594599, 1579656, 1579665, 1578075, 1579661, 1582552, 1582132,
-                1594596, 1566914, 1578799, 1599138,
-            ]
+        self.sdc_fdbs: list = list(SDC_FDBS)
+        self.sdc_index = SDC_FDB_INDEX
         self.sdc_server_status_df: pd.DataFrame = pd.DataFrame()
         self.sdc_df: pd.DataFrame = pd.DataFrame()
-        self.merged_df = asyncio.run(self.main())
+
+    @cached_property
+    def merged_df(self) -> pd.DataFrame:
+        """
+        The SDC rows of the site list merged with the vendor statuses
+
+        returns: pd.DataFrame
+        """
+        return asyncio.run(self.main())
+
+    def invalidate(self) -> None:
+        """
+        Drops merged_df so the next access merges again. The frames it is built from are
+        memoized by the DataContext, see DataContext.invalidate to re-read the files.
+        """
+        self.__dict__.pop('merged_df', None)
 
     async def get_statuses(self) -> None:
         """
         Runs the server class's get_sdc_site_tracking method to get latest
         vendor statuses for SDC sites.
 
-        Attempted async function calls to improve run time with network IO operations
-        No known benefit perceived with tests of syncrhonous calls
+        The blocking read runs in a worker thread so the event loop is free while
+        the vendor files are fetched. The server reads the vendor files in parallel.
 
         returns: None but sets the member attribute sdc_server_status_df
         to the df of the returned file
         """
-        temp_df: pd.DataFrame= self.server.get_sdc_site_tracking()
-        temp_df['fdbid'] = temp_df['fdbid'].astype(str)
+        temp_df: pd.DataFrame= await asyncio.to_thread(self.server.get_sdc_site_tracking)
         self.sdc_server_status_df = temp_df
 
     async def filter_site_list(self):
@@ -57,31 +91,29 @@ class Sdc:
 
         returns: None but sets the sdc_df attribute to the trimmed dataframe
         """
+        self.site_list.get_site_list()
         temp_df = self.site_list.site_list_df
-        # Convert to string for merges. Nulls prevent int casting
-        str_sdc_fdbs = [str(fdb) for fdb in self.sdc_fdbs]
-        self.sdc_df = temp_df[temp_df['fdbid'].isin(str_sdc_fdbs)]
+        # fdbid is the canonical Int64 key, see fdb_key
+        self.sdc_df = temp_df[in_key_index(temp_df['fdbid'], self.sdc_index)]
 
     async def main(self, merge_on='fdbid'):
         """
          call to run the filter_site_list and get_statuses methods.
-         chosen due to network IO. No time saved however
+         Both run concurrently, filtering the site list while the network IO is in flight
          returns: pd.DataFrame of the merged sdc_df with the server statuses
         """
-        await self.get_statuses()
-        await self.filter_site_list()
+        await asyncio.gather(self.get_statuses(), self.filter_site_list())
+        if merge_on == 'fdbid':
+            return join_on_fdbid(self.sdc_df, self.sdc_server_status_df)
         return pd.merge(self.sdc_df, self.sdc_server_status_df, on=merge_on, how='left')
 
     def get_counts(self):
         """
-        Gets the counts from get_assigned_counts and get_deployed_counts methods
-        and merges the dfs together.
+        Gets the assigned and deployed site counts by vendor from one aggregation pass
         returns: pd.DataFrame of the merged counts
         """
 
-        assigned = self.get_assigned_counts(self.merged_df)
-        deployed = self.get_deployed_counts(self.merged_df)
-        return pd.merge(assigned ,deployed, on='new_vendor', how='left').fillna(0)
+        return aggregate(self.metric_frame(), 'new_vendor', SDC_METRICS[:2])
 
     def get_assigned_counts(self, df):
         """
@@ -90,7 +122,7 @@ class Sdc:
         returns pd.DataFrame of vendor assigned counts
         """
         # nunique() is used to get the number of unique sites for a vendor
-        return df.groupby('new_vendor')['fdbid'].nunique().reset_index()
+        return df.groupby('new_vendor', observed=True)['fdbid'].nunique().reset_index()
 
     def get_deployed_counts(self, df):
         """
@@ -98,24 +130,39 @@ class Sdc:
 
         returns: pd.DataFrame with deployed counts
         """
-        # vdr_status and vendor status come from Server method
-        deployed = df[
-            (df['vdr_status_1'].str.lower().str.contains('complete')) |
-            (df['vdr_status_2'].str.lower().str.contains('complete')) |
-            (df['vendor_status'].str.lower().str.contains('complete'))
-        ]
+        deployed = df[self.deployed_mask(df)]
         # nunique() is chosent to get the number of unique sites for vendors
-        return deployed.groupby('new_vendor')['fdbid'].nunique().reset_index()
+        return deployed.groupby('new_vendor', observed=True)['fdbid'].nunique().reset_index()
+
+    @staticmethod
+    def deployed_mask(df: pd.DataFrame) -> pd.Series:
+        """
+        Flags rows where any of the vendor statuses is complete
+
+        returns: pd.Series of bool
+        """
+        # vdr_status and vendor status come from Server method
+        return (
+            STATUS_CLASSIFIER.flag(df['vdr_status_1'], 'is_deployed') |
+            STATUS_CLASSIFIER.flag(df['vdr_status_2'], 'is_deployed') |
+            STATUS_CLASSIFIER.flag(df['vendor_status'], 'is_deployed')
+        )
+
+    def metric_frame(self) -> pd.DataFrame:
+        """
+        Adds the deployed mask SDC_METRICS refers to onto merged_df
+
+        returns: pd.DataFrame
+        """
+        return self.merged_df.assign(is_deployed=self.deployed_mask(self.merged_df))
 
     def get_costs(self) -> pd.DataFrame:
         """
-        Calls the leg_costs and cur_costs methods and merges them into one df of costs
+        Gets the legacy and current costs by vendor from one aggregation pass
 
         returns: pd.DataFrame of merged costs
         """
-        leg_costs: pd.DataFrame = self.get_legacy_costs(self.merged_df)
-        cur_costs: pd.DataFrame = self.get_current_costs(self.merged_df)
-        return pd.merge(leg_costs, cur_costs, on='new_vendor', how='left').reset_index().fillna(0)
+        return aggregate(self.metric_frame(), 'new_vendor', SDC_METRICS[2:])
 
     def get_legacy_costs(self, df:pd.DataFrame) -> pd.DataFrame:
         """
@@ -123,7 +170,7 @@ class Sdc:
 
         returns: pd.DataFrame of legacy costs
         """
-        return df.groupby('new_vendor')['legacy_yearly_cost'].sum().reset_index()
+        return df.groupby('new_vendor', observed=True)['legacy_yearly_cost'].sum().reset_index()
 
     def get_current_costs(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -131,18 +178,33 @@ class Sdc:
 
         returns: pd.DataFrame of current costs
         """
-        return df.groupby('new_vendor')['yearly_cost'].sum().reset_index()
+        return df.groupby('new_vendor', observed=True)['yearly_cost'].sum().reset_index()
+
+    @traced('sdc.merge_count_costs')
+    def merge_count_costs(self, incremental: bool = False) -> pd.DataFrame:
+        """
+        Builds the final product to be used in the table: assigned and deployed site counts
+        with legacy and current costs per vendor, all computed in a single grouped pass.
+        See incremental_count_costs for incremental=True.
+
+        returns pd.DataFrame for the final table
+        """
+        if incremental:
+            return self.incremental_count_costs()
+        return aggregate(self.metric_frame(), 'new_vendor', SDC_METRICS)
 
-    def merge_count_costs(self) -> pd.DataFrame:
+    def incremental_count_costs(self, state_dir=DEFAULT_STATE_DIR) -> pd.DataFrame:
         """
-        Merges the counts and costs into the final product to be used in the table
+        Builds the merge_count_costs table by diffing merged_df against the snapshot
+        of the last run and re-aggregating only the fdbids whose rows changed
 
         returns pd.DataFrame for the final table
         """
-        return pd.merge(self.get_counts(), self.get_costs(), on='new_vendor', how='left')
+        incremental = IncrementalAggregate('sdc', 'new_vendor', SDC_METRICS, state_dir=state_dir)
+        return incremental.update(self.metric_frame())
 
 
 if __name__ == '__main__':
-    start = time.time()
+    # Set CIRCUIT_TRACE=trace.json to get the stage timings, see instrumentation
     sdc = Sdc()
     print(sdc.merge_count_costs())
@@ -1,14 +1,24 @@
 """The server class handles logic to get the latest files from the TelcoInv Server that houses the Plant and SDC statuses that are the most accurate
 """
-import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from pathlib import Path
+import sys
+import time
 import pandas as pd
+from data_context import get_context
+from fdb_key import add_fdb_key
+from instrumentation import traced
+from status_classifier import STATUS_CLASSIFIER
+from vendor_schema import MSP_SCHEMA, get_vendor_schema
 
 
 class Server:
-    def __init__(self) -> None:
+    def __init__(self, parallel: bool = True, max_workers: int = None) -> None:
         self.msp_df: pd.DataFrame = pd.DataFrame()
+        # Vendor files are read on a thread pool when parallel is True.
+        # max_workers defaults to one thread per vendor file.
+        self.parallel: bool = parallel
+        self.max_workers: int = max_workers
         # Param dict is used to pass the file prefix name later in function calls
         self.param_dict: dict = {
             'Granite': 'Granite_site_tracking_special_projects',
@@ -23,15 +33,37 @@ class Server:
         Get's the newest file based on the param passed in. The function call is used for both
         msp (plant class) and site_trackign (sdc class)
 
+        The share is listed once through the shared ShareIndex rather than on every call.
+
         returns: File Path.
         """
-        server = Path(r"/Volumes/TelcoInv")
-        potential_files: list = ([file for file in server.iterdir()
-                                  if param.lower() in str(file).lower() and
-                                  'leo' not in str(file).lower()]
-        )
-        return max(potential_files, key=os.path.getmtime) if potential_files else None
+        return self.stage_files([get_context().share_index.latest(param)])[0]
+
+    def get_latest_files(self) -> dict:
+        """
+        Resolves the msp file and every vendor file in param_dict from a single listing
+        of the share
+
+        returns: dict of param to File Path
+        """
+        latest: dict = get_context().share_index.latest_many(['msp', *self.param_dict.values()])
+        return dict(zip(latest, self.stage_files(list(latest.values()))))
+
+    @staticmethod
+    def stage_files(files: list) -> list:
+        """
+        Swaps share paths for their local mirror copies when a mirror is configured on the
+        DataContext. Only files that changed since the last run are copied.
+
+        returns: list of File Paths in the same order
+        """
+        mirror = get_context().share_mirror
+        if mirror is None:
+            return files
+        local_files: dict = mirror.sync(files)
+        return [local_files[file] for file in files]
 
+    @traced('server.get_fdb_status')
     def get_fdb_status(self):
         """
         Gets the status for plants (phase 2) from the server. Calls the get_latest_file() function.
@@ -40,41 +72,59 @@ class Server:
         """
         latest_file = self.get_latest_file()
         if latest_file:
-            # dtype = str used due to inconsistencies in fdbid
-            df = pd.read_csv(latest_file, encoding='latin1', dtype=str)
-            df['Vdr_Status'] = df['Vdr_Status'].str.strip().str.lower()
-            return df[['FDB ID', 'Date_Truck Roll 2/MSP_Cmplt', 'Vdr_Status']]
+            return get_context().frame_cache.load(
+                'msp', latest_file, lambda: self.read_fdb_status(latest_file))
         else:
             print("No MSP file found.")
             return pd.DataFrame()
 
-    def get_sdc_site_tracking(self):
+    @staticmethod
+    def read_fdb_status(file) -> pd.DataFrame:
+        """
+        Reads only the plant status columns of the MSP file, see MSP_SCHEMA
+
+        returns: pd.DataFrame
+        """
+        df = MSP_SCHEMA.read(file)
+        df['Vdr_Status'] = df['Vdr_Status'].str.strip().str.lower().astype('category')
+        return df
+
+    @traced('server.get_sdc_site_tracking')
+    def get_sdc_site_tracking(self, parallel: bool = None, use_cache: bool = True):
         """
         Gets the sdc statuses from the server by using the param dictionary established upon
-        instantiation
+        instantiation. The statuses are read once per process, see DataContext, unless
+        use_cache is False.
 
         returns: pd.DataFrame with sdc statuses
         """
+        if not use_cache:
+            return self.read_sdc_site_tracking(parallel, use_cache=False)
+        return get_context().get_frame('sdc_site_tracking',
+                                       lambda: self.read_sdc_site_tracking(parallel))
 
-        sp_files: list = []
-        for vendor, value in self.param_dict.items():
-            param: str = self.param_dict[vendor]
-            file:str = str(self.get_latest_file(param))
-            sdc_status_df: pd.DataFrame = pd.read_csv(file, encoding='latin1', dtype=str)
-            sdc_status_df.rename(columns={
-                'FDB_ID': 'fdbid',
-                'Circuit1_Vdr_Status': 'vdr_status_1',
-                'Circuit2_Vdr_Status': 'vdr_status_2',
-                'FDB': 'fdbid',
-                'Vendor_Status': 'vendor_status',
-            }, inplace=True)
+    @traced('server.read_sdc_site_tracking')
+    def read_sdc_site_tracking(self, parallel: bool = None, use_cache: bool = True):
+        """
+        Reads the latest file of every vendor in param_dict and combines their statuses.
 
-            try:
-                slim_sdc:pd.DataFrame = sdc_status_df[['fdbid', 'vdr_status_1', 'vdr_status_2']]
-            except KeyError:
-                slim_sdc = sdc_status_df[['fdbid', 'vendor_status']]
+        The vendor files are read and parsed at the same time on a bounded thread pool
+        unless parallel (defaulting to self.parallel) is False. Files are combined in
+        param_dict order either way so the output does not depend on the mode.
 
-            sp_files.append(slim_sdc)
+        returns: pd.DataFrame with sdc statuses
+        """
+        parallel = self.parallel if parallel is None else parallel
+        latest_files: dict = self.get_latest_files()
+        files: list = [(vendor, str(latest_files[param])) for vendor, param in self.param_dict.items()]
+        read = lambda vendor_file: self.load_site_tracking(*vendor_file, use_cache)
+
+        if parallel:
+            workers: int = self.max_workers or len(files)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                sp_files: list = list(executor.map(read, files))
+        else:
+            sp_files = [read(vendor_file) for vendor_file in files]
 
         final_df: pd.DataFrame = pd.concat(sp_files, axis=0, ignore_index=True)
         final_df = (final_df.dropna(subset=[
@@ -82,12 +132,63 @@ class Server:
             'vdr_status_2',
             'vendor_status'],
             how='all'))
-        final_df['fdbid'] = final_df['fdbid'].fillna('0').astype(int)
-        return final_df
+        # concat falls back to object when the vendor files have different categories
+        status_columns = ['vdr_status_1', 'vdr_status_2', 'vendor_status']
+        final_df[status_columns] = final_df[status_columns].astype('category')
+        return add_fdb_key(final_df)
 
+    @traced('server.load_site_tracking')
+    def load_site_tracking(self, vendor: str, file: str, use_cache: bool = True) -> pd.DataFrame:
+        """
+        Gets one vendor file's statuses, through the frame cache unless use_cache is False
+
+        returns: pd.DataFrame
+        """
+        if not use_cache:
+            return self.read_site_tracking(vendor, file)
+        return get_context().frame_cache.load(
+            'site_tracking', file, lambda: self.read_site_tracking(vendor, file))
+
+    def compare_ingestion(self, repeat: int = 1) -> dict:
+        """
+        Times serial and parallel reads of the same vendor files. The frame cache is
+        bypassed so both modes parse the csv files.
+
+        returns: dict with the best wall time in seconds for 'serial' and 'parallel'
+        """
+        timings: dict = {}
+        for mode, parallel in (('serial', False), ('parallel', True)):
+            runs: list = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                self.get_sdc_site_tracking(parallel=parallel, use_cache=False)
+                runs.append(time.perf_counter() - start)
+            timings[mode] = min(runs)
+        return timings
+
+    @staticmethod
+    def read_site_tracking(vendor: str, file) -> pd.DataFrame:
+        """
+        Reads one vendor site tracking file. The vendor's schema probes the header to pick
+        the fdbid and status columns present and only those columns are parsed.
+
+        returns: pd.DataFrame
+        """
+        return get_vendor_schema(vendor).read(file)
+
+    @traced('server.run')
     def run(self):
         """
-        Runs the get_fdb_status() method and formats the plants df
+        Runs the get_fdb_status() method and formats the plants df. The plants are built
+        once per process, see DataContext.
+
+        returns: pd.DataFrame with plants
+        """
+        return get_context().get_frame('msp_plants', self.format_plants)
+
+    def format_plants(self) -> pd.DataFrame:
+        """
+        Fills the MSP completion dates of the plant statuses
 
         returns: pd.DataFrame with plants
         """
@@ -102,8 +203,7 @@ class Server:
                 (plants['Date_Truck Roll 2/MSP_Cmplt'] == datetime(2099, 1, 1).date())
         )
         plants.loc[mask, 'Date_Truck Roll 2/MSP_Cmplt'] = datetime(2025,1,1).date()
-        plants.rename(columns={'FDB ID': 'fdbid'}, inplace=True)
-        return plants
+        return add_fdb_key(plants, column='FDB ID')
 
     def get_num_cutover_complete(self):
         """
@@ -113,15 +213,14 @@ class Server:
         returns int with number of cutovers.
         """
         df = self.run()
-        return len(df[df['Vdr_Status'].str.lower()
-                       .isin(['complete',
-                             'cutover one circuit only - complete',
-                             'cutover full - complete'])]
-        )
+        return int(STATUS_CLASSIFIER.flag(df['Vdr_Status'], 'is_msp_complete').sum())
 
 
 if __name__ == '__main__':
     server_ = Server()
-    temp = server_.get_sdc_site_tracking()
-    print(temp)
+    if '--compare' in sys.argv:
+        print(server_.compare_ingestion(repeat=3))
+    else:
+        temp = server_.get_sdc_site_tracking()
+        print(temp)
     # print(df)
@@ -0,0 +1,90 @@
+"""share_index.py: Directory index of the TelcoInv share built from a single scandir pass"""
+import os
+import threading
+import time
+from pathlib import Path
+from instrumentation import traced
+
+
+class ShareIndex:
+    """
+    Lists the share once and keeps the name and mtime of every file so the newest file
+    for any number of prefixes can be answered without walking the share again. The
+    listing is reused until it is older than ttl seconds.
+
+    Files with any of the exclude words in their name (e.g. LEO trackers) are skipped,
+    matching the filtering Server.get_latest_file has always done.
+    """
+    def __init__(self, root, ttl: float = 300, exclude: tuple = ('leo',)) -> None:
+        self.root: Path = Path(root)
+        self.ttl: float = ttl
+        self.exclude: tuple = exclude
+        # Number of directory scans done, one per ttl window
+        self.scans: int = 0
+        self._entries: list = []
+        self._scanned_at: float = None
+        self._lock = threading.Lock()
+
+    @traced('share_index.scan')
+    def refresh(self) -> None:
+        """
+        Scans the share once, keeping (lowercase name, path, mtime) for each file
+        """
+        entries: list = []
+        with os.scandir(self.root) as listing:
+            for entry in listing:
+                name: str = entry.name.lower()
+                if any(word in name for word in self.exclude):
+                    continue
+                try:
+                    if entry.is_file():
+                        entries.append((name, Path(entry.path), entry.stat().st_mtime))
+                except OSError:
+                    # File removed between the listing and the stat
+                    continue
+        self._entries = entries
+        self._scanned_at = time.monotonic()
+        self.scans += 1
+
+    def entries(self) -> list:
+        """
+        returns: list of (lowercase name, Path, mtime), rescanning when the ttl expired
+        """
+        with self._lock:
+            if self._scanned_at is None or time.monotonic() - self._scanned_at > self.ttl:
+                self.refresh()
+            return self._entries
+
+    def files(self, prefix: str) -> list:
+        """
+        returns: list of (Path, mtime) for every file whose name contains the prefix
+        """
+        prefix = prefix.lower()
+        return [(path, mtime) for name, path, mtime in self.entries() if prefix in name]
+
+    def latest(self, prefix: str):
+        """
+        returns: Path of the newest file whose name contains the prefix, None if no match
+        """
+        return self.latest_many([prefix])[prefix]
+
+    def latest_many(self, prefixes) -> dict:
+        """
+        Resolves the newest file for each prefix from the same listing
+
+        returns: dict of prefix to Path (None if no file matched)
+        """
+        lowered: dict = {prefix: prefix.lower() for prefix in prefixes}
+        newest: dict = {prefix: (None, None) for prefix in prefixes}
+        for name, path, mtime in self.entries():
+            for prefix, lower in lowered.items():
+                if lower in name and (newest[prefix][1] is None or mtime > newest[prefix][1]):
+                    newest[prefix] = (path, mtime)
+        return {prefix: path for prefix, (path, _) in newest.items()}
+
+    def invalidate(self) -> None:
+        """
+        Forces the next lookup to rescan the share
+        """
+        with self._lock:
+            self._scanned_at = None
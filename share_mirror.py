@@ -0,0 +1,109 @@
+"""share_mirror.py: Local mirror of the TelcoInv files the Server reads"""
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from instrumentation import traced
+
+
+class ShareMirror:
+    """
+    Keeps a local copy of the share files selected by Server.get_latest_file. A file is
+    only copied over the network when its size or mtime differ from the copy made last
+    time, so repeat runs against an unchanged share do no bulk transfer.
+
+    When compress is True copies are stored gzipped (file.csv.gz). pandas infers the
+    compression from the suffix so readers do not need to know.
+    """
+    MANIFEST = 'mirror_manifest.json'
+
+    def __init__(self, mirror_root, compress: bool = False) -> None:
+        self.mirror_root: Path = Path(mirror_root)
+        self.compress: bool = compress
+        # Number of files copied from the share, for checking repeat runs stay local
+        self.copies: int = 0
+        self._lock = threading.Lock()
+
+    def _manifest_path(self) -> Path:
+        return self.mirror_root / self.MANIFEST
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self._manifest_path(), encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, manifest: dict) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.mirror_root, prefix='.tmp-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file)
+        os.replace(tmp, self._manifest_path())
+
+    def local_path(self, source) -> Path:
+        """
+        returns: Path the source file is mirrored to
+        """
+        name = Path(source).name
+        return self.mirror_root / (name + '.gz' if self.compress else name)
+
+    def _copy(self, source: Path, target: Path, mtime_ns: int) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.mirror_root, prefix='.tmp-')
+        os.close(fd)
+        try:
+            if self.compress:
+                with open(source, 'rb') as src, gzip.open(tmp, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+            else:
+                shutil.copyfile(source, tmp)
+            # Keep the share's mtime so the frame cache sees an unchanged file as unchanged
+            os.utime(tmp, ns=(mtime_ns, mtime_ns))
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.copies += 1
+
+    @traced('share_mirror.sync')
+    def sync(self, sources) -> dict:
+        """
+        Copies each source file whose size or mtime changed since the last sync
+
+        returns: dict of source Path to local Path (None sources map to None)
+        """
+        self.mirror_root.mkdir(parents=True, exist_ok=True)
+        local_files: dict = {}
+        with self._lock:
+            manifest: dict = self._read_manifest()
+            changed: bool = False
+            for source in sources:
+                if source is None:
+                    local_files[source] = None
+                    continue
+                source = Path(source)
+                stat = os.stat(source)
+                target = self.local_path(source)
+                entry: dict = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                               'local': target.name}
+                if manifest.get(str(source)) != entry or not target.exists():
+                    self._copy(source, target, stat.st_mtime_ns)
+                    manifest[str(source)] = entry
+                    changed = True
+                local_files[source] = target
+            if changed:
+                self._write_manifest(manifest)
+        return local_files
+
+    def prune(self) -> None:
+        """
+        Removes local copies whose source file is no longer on the share
+        """
+        self.mirror_root.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            manifest: dict = self._read_manifest()
+            for source in [source for source in manifest if not Path(source).exists()]:
+                (self.mirror_root / manifest.pop(source)['local']).unlink(missing_ok=True)
+            self._write_manifest(manifest)
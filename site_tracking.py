@@ -1,10 +1,24 @@
 """temp.py: This module instantiates Site and Tipne dfs"""
 from dataclasses import dataclass
 from datetime import datetime
-import asyncio
+from functools import cached_property
+import threading
 import pandas as pd
-import numpy as np
-from server_class import Server
+from data_context import get_context
+from fdb_key import LISTED_COLUMN, add_fdb_key, join_on_fdbid, listed_ids, sort_by_fdb_key
+from instrumentation import traced
+from money import parse_money
+from phase_partitions import PhasePartitions
+from process_pool import map_frames, partition_rows, pool_workers
+from status_classifier import STATUS_CLASSIFIER
+from vendor_schema import TIPNE_SCHEMA
+
+# Tipne phases any report looks at: Plant reports phase 2, RD the phases of
+# rd.PHASE_BUCKETS
+REPORT_PHASES = frozenset(['1', '2', '3', '4', 'SP', 'LEO'])
+# Sort order of the phase partitions: Plant's phase 2, then the phases RD reads, so
+# each report's rows are one slice of the partitioned frame
+PHASE_ORDER = ('2', '1', '3', '4', 'SP', 'LEO')
 
 @dataclass
 class FileManager:
@@ -13,7 +27,7 @@ class FileManager:
 
     """
     def __init__(self):
-        self.splunk_path = "/Users/FDYPK0/OneDrive - USPS/NCP WAN/Splunk/"
+        self.splunk_path = get_context().splunk_path
         self.site_list_path = 'site_list.csv'
         self.tipne_path = 'tipne.csv'
 
@@ -28,22 +42,63 @@ class Site(FileManager):
 
     def get_site_list(self):
         """
-        Makes assigns the site_list variable to the member variable site_list_df
+        Makes assigns the site_list variable to the member variable site_list_df.
+        The file is only read and formatted once per process, see DataContext.
         """
-        site_list = pd.read_csv(self.splunk_path + self.site_list_path)
-        site_list = self.format_site_list(site_list)
-        self.site_list_df = site_list
+        self.site_list_df = get_context().get_frame('site_list', self.read_site_list)
 
-    def format_site_list(self, site_list: pd.DataFrame):
+    def read_site_list(self):
+        """
+        Reads the site list from the file path and formats it. Served from the
+        on disk frame cache when the file has not changed since the last run.
+
+        returns: pd.DataFrame
+        """
+        path = self.splunk_path + self.site_list_path
+        return get_context().frame_cache.load(
+            'site_list', path, lambda: self.format_site_list(self.read_csv(path)))
+
+    @staticmethod
+    @traced('read_csv.site_list')
+    def read_csv(path) -> pd.DataFrame:
         """
-        Formats the fdbid, nrc, and mrc columns into format and dytpes needed
+        returns: pd.DataFrame of the raw site list
         """
-        # fdbid formatted as a string to allow for '-' in column
-        site_list['fdbid'] = site_list['fdbid'].replace('TBD', np.nan).dropna().astype(str)
+        return pd.read_csv(path)
+
+    @traced('site.format_site_list')
+    def format_site_list(self, site_list: pd.DataFrame):
+        """
+        Formats the fdbid, nrc, and mrc columns into format and dytpes needed.
+        The row wise parsing runs on the process pool for large site lists when the
+        DataContext enables it, the mean fills need the whole column and run here.
+        """
+        workers = pool_workers(len(site_list))
+        if workers:
+            parts = map_frames(Site.parse_values, partition_rows(site_list, workers), workers)
+            site_list = pd.concat(parts, ignore_index=True)
+        else:
+            site_list = self.parse_values(site_list)
+        site_list = sort_by_fdb_key(site_list)
         site_list = self.format_nrc(site_list).pipe(self.format_old_mrc)
         site_list = self.format_mrc(site_list).pipe(self.add_yearly_cost)
         return site_list
 
+    @staticmethod
+    def parse_values(site_list: pd.DataFrame) -> pd.DataFrame:
+        """
+        The row wise part of format_site_list: the fdbid key and the nrc, old_mrc and mrc
+        amounts. format_nrc and format_old_mrc then only have the mean fills left to do.
+
+        returns: pd.DataFrame in the input row order
+        """
+        # fdbid becomes the canonical Int64 key. Non numeric ids such as 'A-1' get a
+        # negative key and are kept in fdbid_raw, placeholders such as '-' become <NA>
+        site_list = add_fdb_key(site_list, sort=False)
+        return site_list.assign(nrc=parse_money(site_list['nrc']),
+                                old_mrc=parse_money(site_list['old_mrc'], fallback='numeric'),
+                                mrc=site_list['mrc'].astype(float))
+
     def format_mrc(self, site_list: pd.DataFrame):
         """
         Formats that mrc as a float
@@ -60,9 +115,9 @@ class Site(FileManager):
 
     def format_old_mrc(self, site_list: pd.DataFrame):
         """
-        Formats old mrc as a numerical column that can be used in computations
+        Fills the old mrc amounts parse_values could not read, e.g. '-', 'TBD' and
+        blanks, with the mean
         """
-        site_list['old_mrc'] = site_list['old_mrc'].replace('-', np.nan).dropna().astype(float)
         site_list['old_mrc'] = site_list['old_mrc'].fillna(site_list['old_mrc'].mean())
         site_list = self.add_yearly_legacy_cost(site_list)
         return site_list
@@ -78,17 +133,8 @@ class Site(FileManager):
     @staticmethod
     def format_nrc(site_list: pd.DataFrame):
         """
-        Formats NRC column by extracting digits, replacing commas,
-        and filling nulls with the mean value
+        Fills the nrc amounts parse_values could not read with the mean value
         """
-
-        site_list['nrc'] = (site_list['nrc'].astype(str)
-                            .str.extract(r'([\d,]+\.\d{2})')[0]
-                            .str.replace(',', '', regex=True)
-                            .astype(float)
-        )
-
-        # Causes a TypeError if performed in line above
         site_list['nrc'] = site_list['nrc'].fillna(site_list['nrc'].mean())
         return site_list
 
@@ -102,166 +148,153 @@ class Tipne(FileManager):
 
     def get_tipne(self):
         """
-        Gets the tipne project tracking from the file path
+        Gets the tipne project tracking. The file is only read once per process,
+        see DataContext.
         """
-        tipne = pd.read_csv(self.splunk_path + self.tipne_path, low_memory=False)
-        # Future date needed to prevent counting as a cutover.
-        tipne.fillna({'cutover_completed_date':datetime(2099, 1, 1)}, inplace=True)
-        self.tipne_df = tipne
+        self.tipne_df = get_context().get_frame('tipne', self.read_tipne)
 
-    def get_phase_dict(self):
-        """
-        Unsure of importance of function yet
+    def read_tipne(self):
         """
-        phases = self.tipne_df['phase'].unique()
-        return {phase: self.tipne_df[self.tipne_df['phase'] == phase] for phase in phases}
-    
-class Sdc:
-    """
-    The SDC class is used to store FDB IDs that are SDCs to filter out from the site list.
-    """
-    def __init__(self):
-        self.server: Server = Server()
-        self.tipne: Tipne = Tipne()
-        self.site_list: Site = Site()
-        self.tipne.get_tipne()
-        self.site_list.get_site_list()
-        # Hard coded list determined manually
-        self.sdc_fdbs: list= [
-                1589779, 1388480, 1599136, 1578072, 1578792, 1582789, 1599154, 1582791, 1599160,
-                1579662, 1582794, 1578073, 1579657, 1578793, 1599153, 1579664, 1579654, 1582556,
-                1599157, 1582554, 1582785, 1582543, 1579658, 1582778, 1582133, 1582550, 1599158,
-                1582129, 1599146, 1582837, 1585537, 1599155, 1582542, 1594603, 1594598, 1578797,
-                1579666, 1582135, 1578794, 1582549, 1589776, 1582790, 1579659, 1582553, 1436550,
-                1587292, 1582128, 1582781, 1599137, 1582551, 1589778, 1582131, 1582783, 1578796,
-                1582777, 1599147, 1579667, 1579660, 1582126, 1579653, 1582793, 1582541, 1599151,
-                1578798, 1583378, 1599149, 1578795, 1578074, 1582548, 1582130, 1583040, 1599161,
-                1594602, 1599152, 1582780, 1579663, 1579652, 1583380, 1582788, 1582127, 1577752,
-                1594600, 1594597, 1599145, 1582555, 1451470, 1583039, 1582546, 1574856, 1582124,
-                1352332, 1582123, 1582786, 1587280, 1587281, 1594601, 1594605, 1599156, 1599144,
-                1601568, 1434108, 1594599, 1579656, 1579665, 1578075, 1579661, 1582552, 1582132,
-                1594596, 1566914, 1578799, 1599138,
-            ]
-        self.sdc_server_status_df: pd.DataFrame = pd.DataFrame()
-        self.sdc_df: pd.DataFrame = pd.DataFrame()
-        self.merged_df = asyncio.run(self.main())
+        Reads the tipne project tracking from the file path, streamed in chunks when the
+        DataContext sets tipne_chunksize. Served from the on disk frame cache when the
+        file has not changed since the last run.
 
-    """
-        Attempted async function calls to improve run time with network IO operations
-        No known benefit perceived with tests of syncrhonous calls
-    """
-    async def get_statuses(self) -> None:
+        returns: pd.DataFrame
         """
-        Runs the server class's get_sdc_site_tracking method to get latest
-        vendor statuses for SDC sites.
+        path = self.splunk_path + self.tipne_path
+        chunksize = get_context().tipne_chunksize
+        if chunksize:
+            return get_context().frame_cache.load(
+                'tipne_stream', path, lambda: self.stream_tipne(path, chunksize))
+        return get_context().frame_cache.load('tipne', path, lambda: self.format_tipne(path))
 
-        returns: None but sets the member attribute sdc_server_status_df
-        to the df of the returned file
-        """
-        temp_df: pd.DataFrame= self.server.get_sdc_site_tracking()
-        temp_df['fdbid'] = temp_df['fdbid'].astype(str)
-        self.sdc_server_status_df = temp_df
-
-    async def filter_site_list(self):
+    @staticmethod
+    def fill_cutover_date(tipne: pd.DataFrame) -> pd.DataFrame:
         """
-        Async method to filter to the SDC sites from the site list attribute
-
-        returns: None but sets the sdc_df attribute to the trimmed dataframe
+        returns: pd.DataFrame with the missing cutover dates filled
         """
-        temp_df = self.site_list.site_list_df
-        # Convert to string for merges. Nulls prevent int casting
-        str_sdc_fdbs = [str(fdb) for fdb in self.sdc_fdbs] 
-        self.sdc_df = temp_df[temp_df['fdbid'].isin(str_sdc_fdbs)]
+        # Future date needed to prevent counting as a cutover.
+        return tipne.fillna({'cutover_completed_date': datetime(2099, 1, 1)})
 
-    async def main(self, merge_on='fdbid'):
+    @staticmethod
+    def flag_listed(tipne: pd.DataFrame) -> pd.DataFrame:
         """
-         call to run the filter_site_list and get_statuses methods.
-         chosen due to network IO. No time saved however
-         returns: pd.DataFrame of the merged sdc_df with the server statuses
+        returns: pd.DataFrame with the LISTED_COLUMN the circuit counts are taken on,
+        from the fdbid text before it becomes the key
         """
-        await self.get_statuses()
-        await self.filter_site_list()
-        return pd.merge(self.sdc_df, self.sdc_server_status_df, on=merge_on, how='left')
+        return tipne.assign(**{LISTED_COLUMN: listed_ids(tipne['fdbid'])})
 
-    def get_counts(self):
-        """
-        Gets the counts from get_assigned_counts and get_deployed_counts methods
-        and merges the dfs together.
-        returns: pd.DataFrame of the merged counts
+    @staticmethod
+    @traced('tipne.format_tipne')
+    def format_tipne(path):
         """
+        Parses the columns of the tipne csv used downstream, see TIPNE_SCHEMA,
+        and fills the cutover date
 
-        assigned = self.get_assigned_counts(self.merged_df)
-        deployed = self.get_deployed_counts(self.merged_df)
-        return pd.merge(assigned ,deployed, on='new_vendor', how='left').fillna(0)
-
-    def get_assigned_counts(self, df):
+        returns: pd.DataFrame
         """
-        Calculates number of unique fdbs assigned by vendor
+        tipne = Tipne.fill_cutover_date(TIPNE_SCHEMA.read(path))
+        return add_fdb_key(Tipne.flag_listed(tipne))
 
-        returns pd.DataFrame of vendor assigned counts
+    @staticmethod
+    @traced('tipne.stream_tipne')
+    def stream_tipne(path, chunksize: int, phases=REPORT_PHASES):
         """
-        # nunique() is used to get the number of unique sites for a vendor
-        return df.groupby('new_vendor')['fdbid'].nunique().reset_index()
+        Builds the format_tipne frame chunksize rows at a time: each chunk keeps only the
+        TIPNE_SCHEMA columns and the given phases (all of them when phases is None), gets
+        its cutover date filled and its fdbid key before the next chunk is parsed. The
+        rows come out in the same order as format_tipne, so the reports are identical.
 
-    def get_deployed_counts(self, df):
+        returns: pd.DataFrame
         """
-        Calculates deployed sites using the statsues obtained from the server method
+        chunks: list = []
+        for chunk in TIPNE_SCHEMA.read_chunks(path, chunksize):
+            if phases is not None:
+                chunk = chunk[chunk['phase'].isin(phases)]
+            chunks.append(add_fdb_key(Tipne.flag_listed(Tipne.fill_cutover_date(chunk)),
+                                      sort=False))
+        return sort_by_fdb_key(TIPNE_SCHEMA.concat(chunks))
 
-        returns: pd.DataFrame with deployed counts
+    def get_phases(self) -> PhasePartitions:
         """
-        # vdr_status and vendor status come from Server method
-        deployed = df[
-            (df['vdr_status_1'].str.lower().str.contains('complete')) |
-            (df['vdr_status_2'].str.lower().str.contains('complete')) |
-            (df['vendor_status'].str.lower().str.contains('complete'))
-        ]
-        # nunique() is chosent to get the number of unique sites for vendors
-        return deployed.groupby('new_vendor')['fdbid'].nunique().reset_index()
+        Gets the tipne frame partitioned by phase. The partitions are built once per
+        process from the memoized tipne frame, see DataContext.
 
-    def get_costs(self):
+        returns: PhasePartitions
         """
-        Calls the leg_costs and cur_costs methods and merges them into one df of costs
+        self.get_tipne()
+        return get_context().get_frame(
+            'tipne_phases', lambda: PhasePartitions(self.tipne_df, PHASE_ORDER))
 
-        returns: pd.DataFrame of merged costs
+    def get_phase_dict(self):
         """
-        leg_costs: pd.DataFrame = self.get_legacy_costs(self.merged_df)
-        cur_costs: pd.DataFrame = self.get_current_costs(self.merged_df)
-        return pd.merge(leg_costs, cur_costs, on='new_vendor', how='left').reset_index().fillna(0)
-
-    def get_legacy_costs(self, df:pd.DataFrame) -> pd.DataFrame:
+        returns: dict of each phase to its tipne rows, rows without a phase left out
         """
-        Calculates the legacy costs of the circuits using legacy_yearly_cost
+        partitions = self.get_phases()
+        return {phase: partitions.get(phase) for phase in partitions.phases}
 
-        returns: pd.DataFrame of legacy costs
-        """
-        return df.groupby('new_vendor')['legacy_yearly_cost'].sum().reset_index()
+class ClassInterface:
+    """
+    Encapsulates the instantiations and sequence of running the classes.
 
-    def get_current_costs(self, df: pd.DataFrame) -> pd.DataFrame:
+    Constructing one reads nothing. merged_sl_tipne, its phase partitions merged_phases
+    and sdc are built on first access and kept until invalidate() is called. Threads
+    sharing an interface, e.g. the report runner's Plant and RD, wait for one build of
+    merged_sl_tipne and merged_phases.
+    """
+    def __init__(self, sdc=None):
+        self.site_list = Site()
+        self.tipne = Tipne()
+        # An Sdc already built elsewhere, e.g. by the report runner, can be passed in
+        if sdc is not None:
+            self.sdc = sdc
+        self._merged_sl_tipne: pd.DataFrame = None
+        self._merged_phases: PhasePartitions = None
+        # Reentrant as merged_phases builds merged_sl_tipne while holding it
+        self._build_lock = threading.RLock()
+
+    @cached_property
+    def sdc(self):
+        """
+        returns: Sdc, built on first access
         """
-        Calculates current costs by summing yearly_cost
+        # Imported here as sdc_class imports Site and Tipne from this module
+        from sdc_class import Sdc
+        return Sdc()
 
-        returns: pd.DataFrame of current costs
+    @property
+    def merged_sl_tipne(self) -> pd.DataFrame:
         """
-        return df.groupby('new_vendor')['yearly_cost'].sum().reset_index()
+        The tipne circuits merged with the site list, with the is_cutover column
 
-    def merge_count_costs(self) -> pd.DataFrame:
+        returns: pd.DataFrame
         """
-        Merges the counts and costs into the final product to be used in the table
+        with self._build_lock:
+            if self._merged_sl_tipne is None:
+                self.add_cutover_column()
+            return self._merged_sl_tipne
 
-        returns pd.DataFrame for the final table
+    @property
+    def merged_phases(self) -> PhasePartitions:
         """
-        return pd.merge(self.get_counts(), self.get_costs(), on='new_vendor', how='left')
+        merged_sl_tipne partitioned by phase, see PHASE_ORDER
 
+        returns: PhasePartitions
+        """
+        with self._build_lock:
+            if self._merged_phases is None:
+                self._merged_phases = PhasePartitions(self.merged_sl_tipne, PHASE_ORDER)
+            return self._merged_phases
 
-class ClassInterface:
-    """
-    Encapsulates the instantiations and sequence of running the classes.
-    """
-    def __init__(self):
-        self.site_list = Site()
-        self.tipne = Tipne()
-        self.sdc = Sdc()
-        self.merged_sl_tipne = pd.DataFrame()
+    def invalidate(self) -> None:
+        """
+        Drops merged_sl_tipne and merged_phases so the next access merges again. The
+        frames they are built from are memoized by the DataContext, see
+        DataContext.invalidate to re-read them.
+        """
+        with self._build_lock:
+            self._merged_sl_tipne = None
+            self._merged_phases = None
 
     def initiate(self):
         """
@@ -271,35 +304,33 @@ class ClassInterface:
         self.site_list.get_site_list()
         self.tipne.get_tipne()
 
+    @traced('class_interface.merge_tipne_site_list')
     def merge_tipne_site_list(self):
         """
-        Initiates the Site and Tipne class and merged them
+        Initiates the Site and Tipne class and merged them through the site list's fdbid index
         """
         self.initiate()  # Needed to make the respective classes run
-        merged_df = (pd.merge(self.tipne.tipne_df[['fdbid', 'new_provider', 'phase','status']],
-                              self.site_list.site_list_df[['fdbid', 'mrc', 'nrc', 'old_mrc', 
-                                                           'yearly_cost', 'legacy_yearly_cost']],
-                              on='fdbid',
-                              how='left')
-        )
+        merged_df = join_on_fdbid(self.tipne.tipne_df[['fdbid', LISTED_COLUMN, 'new_provider',
+                                                       'phase', 'status']],
+                                  self.site_list.site_list_df[['fdbid', 'mrc', 'nrc', 'old_mrc',
+                                                               'yearly_cost', 'legacy_yearly_cost']])
         return merged_df
 
     def add_cutover_column(self):
         """
         Takes the merged df from the merge_tipne_site_list function
-        and adds boolean cutover column for computations
+        and adds boolean cutover column for computations. Rebuilds merged_sl_tipne.
+
+        returns: pd.DataFrame
         """
         merged_df = self.merge_tipne_site_list()
 
-        merged_df['is_cutover'] = (merged_df['status']
-                .str.lower()
-                .str.contains(
-                            'cutover complete|' \
-                            'cutover one circuit only|' \
-                            'cutover mc complete', regex=True
-                            )
-        )
-        self.merged_sl_tipne = merged_df
+        # See status_classifier.CUTOVER_PATTERN
+        merged_df['is_cutover'] = STATUS_CLASSIFIER.flag(merged_df['status'], 'is_cutover')
+        with self._build_lock:
+            self._merged_sl_tipne = merged_df
+            self._merged_phases = None
+        return merged_df
 
 
 
@@ -0,0 +1,70 @@
+"""status_classifier.py: Shared vocabulary for classifying tipne, vendor and MSP statuses"""
+import re
+import numpy as np
+import pandas as pd
+from instrumentation import traced
+
+# Tipne statuses counted as a cutover by ClassInterface
+CUTOVER_PATTERN = re.compile('cutover complete|cutover one circuit only|cutover mc complete')
+# Vendor statuses counted as deployed by Sdc
+DEPLOYED_WORD = 'complete'
+# Tipne statuses counted as a completed plant by Plant
+COMPLETED_STATUSES = frozenset(['cutover one circuit only - complete', 'cutover full - complete'])
+# MSP statuses counted as a completed cutover by Server
+MSP_COMPLETE_STATUSES = frozenset(['complete', *COMPLETED_STATUSES])
+
+# Each rule receives a lowercased status
+STATUS_RULES: dict = {
+    'is_cutover': lambda status: CUTOVER_PATTERN.search(status) is not None,
+    'is_deployed': lambda status: DEPLOYED_WORD in status,
+    'is_complete': lambda status: status in COMPLETED_STATUSES,
+    'is_msp_complete': lambda status: status in MSP_COMPLETE_STATUSES,
+}
+
+
+class StatusClassifier:
+    """
+    Status columns hold a few dozen distinct values over hundreds of thousands of rows.
+    The column is viewed as a categorical, each rule is evaluated once per category and
+    the result is broadcast back to the rows through the category codes. Null statuses
+    are never flagged.
+    """
+    def __init__(self, rules: dict = None) -> None:
+        self.rules: dict = rules if rules is not None else STATUS_RULES
+
+    @staticmethod
+    def as_category(statuses: pd.Series) -> pd.Series:
+        """
+        returns: the statuses as a categorical Series, unchanged if already categorical
+        """
+        if isinstance(statuses.dtype, pd.CategoricalDtype):
+            return statuses
+        return statuses.astype('category')
+
+    def flag(self, statuses: pd.Series, rule: str) -> pd.Series:
+        """
+        Applies one rule to the column
+
+        returns: pd.Series of bool aligned with statuses
+        """
+        return self.classify(statuses, [rule])[rule]
+
+    @traced('status_classifier.classify')
+    def classify(self, statuses: pd.Series, rules: list = None) -> pd.DataFrame:
+        """
+        Applies the rules (all of them by default) to the column
+
+        returns: pd.DataFrame with one bool column per rule, aligned with statuses
+        """
+        categorical: pd.Series = self.as_category(statuses)
+        lowered: list = [str(category).lower() for category in categorical.cat.categories]
+        codes: np.ndarray = categorical.cat.codes.to_numpy()
+        flags: dict = {}
+        for rule in rules or self.rules:
+            by_category = np.array([self.rules[rule](status) for status in lowered] + [False])
+            # Null statuses have code -1 and pick up the trailing False
+            flags[rule] = by_category[codes]
+        return pd.DataFrame(flags, index=statuses.index)
+
+
+STATUS_CLASSIFIER = StatusClassifier()
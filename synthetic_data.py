@@ -0,0 +1,174 @@
+"""synthetic_data.py: Writes Splunk exports and TelcoInv share files with made up sites for tests and benchmarks"""
+import os
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from sdc_class import SDC_FDBS
+from server_class import Server
+
+# Number of sites at scale 1, the generated site list has BASE_SITES * scale rows
+BASE_SITES = 1000
+VENDORS = ['Lumen', 'Comcast', 'Verizon', 'Granite', 'Hughes']
+PHASES = ['1', '2', '3', '4', 'SP', 'LEO']
+PHASE_WEIGHTS = [0.25, 0.2, 0.15, 0.2, 0.1, 0.1]
+# Spellings seen in the exports, matched case insensitively downstream
+TIPNE_STATUSES = ['Cutover Complete', 'Cutover One Circuit Only - Complete',
+                  'Cutover Full - Complete', 'CUTOVER FULL - COMPLETE', 'cutover mc complete',
+                  'Ordered', 'In Progress', 'Site Survey Scheduled', None]
+VENDOR_STATUSES = ['Complete', 'COMPLETE', 'complete', 'Pending', 'In Progress',
+                   'Install Scheduled', None]
+MSP_STATUSES = ['Complete', ' complete', 'Cutover One Circuit Only - Complete ',
+                'cutover full - complete', 'Pending', 'On Hold']
+STATES = ['AL', 'CA', 'CO', 'FL', 'GA', 'IL', 'NY', 'OH', 'TX', 'WA']
+
+
+def fdb_ids(rng: np.random.Generator, sites: int) -> np.ndarray:
+    """
+    Draws unique fdbids, starting with the SDC fdbids, with the odd values the site list
+    export has: 'TBD' for sites without an id yet and a few hyphenated ids
+
+    returns: np.ndarray of str
+    """
+    ids = rng.choice(np.arange(1_000_000, 1_000_000 + sites * 4), sites, replace=False)
+    ids = ids[~np.isin(ids, SDC_FDBS)]
+    sdc = min(len(SDC_FDBS), sites // 10)
+    ids = np.concatenate([np.array(SDC_FDBS[:sdc]), ids])[:sites]
+    rng.shuffle(ids)
+    text = ids.astype(str).astype(object)
+    text[rng.random(sites) < 0.01] = 'TBD'
+    odd = rng.random(sites) < 0.002
+    text[odd] = [f'{fdbid}-{suffix}' for fdbid, suffix in
+                 zip(ids[odd], rng.integers(1, 9, odd.sum()))]
+    return text
+
+
+def currency(rng: np.random.Generator, amounts: np.ndarray) -> np.ndarray:
+    """
+    Formats nrc like the export: '$1,234.56' with '-', 'TBD' and blanks mixed in
+
+    returns: np.ndarray of object
+    """
+    text = np.array([f'${amount:,.2f}' for amount in amounts], dtype=object)
+    draw = rng.random(len(amounts))
+    text[draw < 0.05] = '-'
+    text[(draw >= 0.05) & (draw < 0.07)] = 'TBD'
+    text[(draw >= 0.07) & (draw < 0.08)] = None
+    return text
+
+
+def site_list(rng: np.random.Generator, sites: int) -> pd.DataFrame:
+    """
+    returns: pd.DataFrame laid out like site_list.csv
+    """
+    old_mrc = np.array([f'{amount:.2f}' for amount in rng.gamma(2, 80, sites)], dtype=object)
+    old_mrc[rng.random(sites) < 0.05] = '-'
+    return pd.DataFrame({
+        'fdbid': fdb_ids(rng, sites),
+        'site_name': [f'Facility {number}' for number in range(sites)],
+        'state': rng.choice(STATES, sites),
+        'new_vendor': rng.choice(VENDORS, sites),
+        'mrc': rng.gamma(2, 60, sites).round(2),
+        'nrc': currency(rng, rng.gamma(2, 900, sites)),
+        'old_mrc': old_mrc,
+    })
+
+
+def tipne(rng: np.random.Generator, sites: pd.DataFrame) -> pd.DataFrame:
+    """
+    One or two circuits per site, the second one mostly with the same provider
+
+    returns: pd.DataFrame laid out like tipne.csv
+    """
+    circuits = sites.loc[sites.index.repeat(rng.integers(1, 3, len(sites)))]
+    rows = len(circuits)
+    statuses = rng.choice(np.array(TIPNE_STATUSES, dtype=object), rows)
+    complete = pd.Series(statuses).str.lower().str.contains('complete', na=False).to_numpy()
+    dates = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 600, rows), unit='D')
+    switched = rng.random(rows) < 0.1
+    return pd.DataFrame({
+        'fdbid': circuits['fdbid'].to_numpy(),
+        'site_name': circuits['site_name'].to_numpy(),
+        'new_provider': np.where(switched, rng.choice(VENDORS, rows),
+                                 circuits['new_vendor'].to_numpy()),
+        'phase': rng.choice(PHASES, rows, p=PHASE_WEIGHTS),
+        'status': statuses,
+        'cutover_completed_date': np.where(complete, dates.strftime('%Y-%m-%d'), None),
+        'old_service_number': [f'OSN{number:08d}' for number in range(rows)],
+        'notes': rng.choice(['', 'Awaiting LOA', 'Dual circuit', 'See ticket'], rows),
+    })
+
+
+def msp(rng: np.random.Generator, tipne_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Statuses of the phase 2 plants, some fdbids reported twice
+
+    returns: pd.DataFrame laid out like the MSP export
+    """
+    plants = tipne_df.loc[tipne_df['phase'] == '2', 'fdbid'].to_numpy()
+    rows = len(plants) + len(plants) // 20
+    dates = pd.Timestamp('2024-06-01') + pd.to_timedelta(rng.integers(0, 400, rows), unit='D')
+    completed = rng.random(rows) < 0.6
+    return pd.DataFrame({
+        'Region': rng.choice(['East', 'West', 'Central'], rows),
+        'FDB ID': rng.choice(plants, rows) if len(plants) else np.full(rows, 'TBD'),
+        'Date_Truck Roll 2/MSP_Cmplt': np.where(completed, dates.strftime('%m/%d/%Y'), None),
+        'Vdr_Status': rng.choice(MSP_STATUSES, rows),
+        'Comments': rng.choice(['', 'Rescheduled', 'Tech on site'], rows),
+    })
+
+
+def vendor_site_tracking(rng: np.random.Generator, vendor: str,
+                         sites: pd.DataFrame) -> pd.DataFrame:
+    """
+    The vendor's sites plus a third of the SDC sites. Hughes exports one status column
+    under different headers, the others two circuit statuses.
+
+    returns: pd.DataFrame laid out like the vendor's site tracking file
+    """
+    fdbids = np.concatenate([sites.loc[sites['new_vendor'] == vendor, 'fdbid'].to_numpy(),
+                             rng.choice(np.array(SDC_FDBS, dtype=str), len(SDC_FDBS) // 3,
+                                        replace=False)])
+    rows = len(fdbids)
+    statuses = np.array(VENDOR_STATUSES, dtype=object)
+    if vendor == 'Hughes':
+        return pd.DataFrame({'FDB': fdbids, 'Vendor_Status': rng.choice(statuses, rows),
+                             'Install_Window': rng.choice(['AM', 'PM'], rows)})
+    return pd.DataFrame({'FDB_ID': fdbids,
+                         'Circuit1_Vdr_Status': rng.choice(statuses, rows),
+                         'Circuit2_Vdr_Status': rng.choice(statuses, rows),
+                         'Circuit1_Order': rng.integers(10**6, 10**7, rows)})
+
+
+def generate(root, scale: int = 1, seed: int = 0) -> dict:
+    """
+    Writes a synthetic site_list.csv and tipne.csv under root/splunk and the MSP and
+    vendor site tracking files under root/share, BASE_SITES * scale sites in all. An
+    older MSP file is written as well so the share holds more than one candidate.
+
+    returns: dict of the splunk_path and share_path to pass to DataContext
+    """
+    rng = np.random.default_rng(seed)
+    splunk, share = Path(root) / 'splunk', Path(root) / 'share'
+    splunk.mkdir(parents=True, exist_ok=True)
+    share.mkdir(parents=True, exist_ok=True)
+
+    sites = site_list(rng, BASE_SITES * scale)
+    sites.to_csv(splunk / 'site_list.csv', index=False)
+    tipne_df = tipne(rng, sites)
+    tipne_df.to_csv(splunk / 'tipne.csv', index=False)
+
+    msp_df = msp(rng, tipne_df)
+    msp_df.head(len(msp_df) // 2).to_csv(share / 'MSP_Status_2025-05-01.csv', index=False)
+    day = 24 * 3600
+    os.utime(share / 'MSP_Status_2025-05-01.csv', (time.time() - 30 * day,) * 2)
+    msp_df.to_csv(share / 'MSP_Status_2025-06-01.csv', index=False)
+    for vendor, prefix in Server().param_dict.items():
+        vendor_site_tracking(rng, vendor, sites).to_csv(share / f'{prefix}_2025-06-01.csv',
+                                                        index=False)
+    return {'splunk_path': str(splunk) + os.sep, 'share_path': str(share)}
+
+
+if __name__ == '__main__':
+    print(generate(sys.argv[1], scale=int(sys.argv[2]) if len(sys.argv) > 2 else 1))
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+import pandas as pd
+from backfill import backfill, file_date, snapshots
+from data_context import DataContext, get_context, set_context
+from frame_cache import FrameCache
+from sdc_class import Sdc
+from server_class import Server
+from synthetic_data import generate
+
+
+class TestSnapshots(unittest.TestCase):
+    def test_newest_file_on_or_before_each_date(self):
+        day = pd.Timestamp
+        history = {'msp': [(day('2025-01-01'), 'm1'), (day('2025-01-20'), 'm2')],
+                   'vendor': [(day('2025-01-10'), 'v1')]}
+        points = snapshots(history)
+        self.assertEqual([as_of for as_of, _ in points], [day('2025-01-10'), day('2025-01-20')])
+        self.assertEqual([files['msp'] for _, files in points], ['m1', 'm2'])
+        weekly = snapshots(history, freq='W')
+        self.assertEqual([files['vendor'] for _, files in weekly], ['v1', 'v1'])
+        self.assertEqual(file_date(Path('MSP_Status_2025-05-01.csv'), 0), day('2025-05-01'))
+
+
+class TestBackfill(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = generate(self.tmp.name)
+        # An older, shorter version of every vendor file
+        for prefix in Server().param_dict.values():
+            current = Path(self.paths['share_path']) / f'{prefix}_2025-06-01.csv'
+            old = pd.read_csv(current)
+            older = current.with_name(f'{prefix}_2025-05-01.csv')
+            old.head(len(old) // 2).to_csv(older, index=False)
+            os.utime(older, (os.path.getmtime(current) - 30 * 24 * 3600,) * 2)
+        self.history_path = os.path.join(self.tmp.name, 'history.sqlite')
+        self.previous = get_context()
+
+    def tearDown(self):
+        set_context(self.previous)
+        self.tmp.cleanup()
+
+    def use_context(self, **kwargs):
+        set_context(DataContext(frame_cache=FrameCache(enabled=False), **self.paths, **kwargs))
+
+    def test_latest_snapshot_matches_a_normal_run(self):
+        self.use_context()
+        current = Sdc().merge_count_costs().set_index('new_vendor')['Deployed']
+
+        self.use_context(history_path=self.history_path)
+        rows = backfill()
+        self.assertEqual(sorted(rows['as_of'].unique()),
+                         [pd.Timestamp('2025-05-01'), pd.Timestamp('2025-06-01')])
+        latest = rows[(rows['as_of'] == '2025-06-01') & (rows['report'] == 'SDC') &
+                      (rows['metric'] == 'Deployed')].set_index('vendor')['value']
+        self.assertEqual(latest.to_dict(), current.astype(float).to_dict())
+        self.assertEqual(len(get_context().history.runs()), 2)
+
+        self.use_context()
+        pd.testing.assert_frame_equal(backfill(workers=2), rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from data_context import DataContext, get_context, set_context
+from frame_cache import FrameCache
+from site_tracking import Site, Tipne
+
+
+class TestDataContext(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        splunk = self.tmp.name + os.sep
+        with open(splunk + 'site_list.csv', 'w') as file:
+            file.write('fdbid,nrc,old_mrc,mrc,new_vendor\n'
+                       '1589779,"$1,200.00",100.5,90,Lumen\n'
+                       'TBD,-,-,50,Comcast\n')
+        with open(splunk + 'tipne.csv', 'w') as file:
+            file.write('fdbid,new_provider,phase,status,cutover_completed_date,'
+                       'old_service_number\n'
+                       '1589779,Lumen,2,Cutover Full - Complete,2025-01-01,A1\n'
+                       '1599136,Comcast,4,Ordered,,B2\n')
+        self.previous = get_context()
+        set_context(DataContext(splunk_path=splunk,
+                                frame_cache=FrameCache(splunk + 'cache')))
+
+    def tearDown(self):
+        set_context(self.previous)
+        self.tmp.cleanup()
+
+    def test_each_file_loaded_once(self):
+        for _ in range(3):
+            Site().get_site_list()
+            Tipne().get_tipne()
+        self.assertEqual(get_context().load_counts['site_list'], 1)
+        self.assertEqual(get_context().load_counts['tipne'], 1)
+
+    def test_frames_are_shared(self):
+        first, second = Tipne(), Tipne()
+        first.get_tipne()
+        second.get_tipne()
+        self.assertIs(first.tipne_df, second.tipne_df)
+
+    def test_invalidate_reloads(self):
+        Site().get_site_list()
+        get_context().invalidate('site_list')
+        Site().get_site_list()
+        self.assertEqual(get_context().load_counts['site_list'], 2)
+
+    def test_frame_invalidated_while_loading_is_not_stored(self):
+        context = get_context()
+
+        def read_during_invalidate():
+            context.invalidate('site_list')
+            return 'stale'
+        self.assertEqual(context.get_frame('site_list', read_during_invalidate), 'stale')
+        self.assertEqual(context.get_frame('site_list', lambda: 'fresh'), 'fresh')
+        self.assertEqual(context.get_frame('site_list', lambda: 'again'), 'fresh')
+        self.assertEqual(context.load_counts['site_list'], 2)
+
+    def test_invalidate_drops_derived_frames(self):
+        phases = Tipne().get_phases()
+        self.assertIs(Tipne().get_phases(), phases)
+        self.assertEqual(phases.counts(), {'2': 1, '4': 1})
+        get_context().invalidate('tipne')
+        self.assertIsNot(Tipne().get_phases(), phases)
+        self.assertEqual(get_context().load_counts['tipne_phases'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import numpy as np
+import pandas as pd
+from dedup import Dedup
+
+
+class TestDedup(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'fdbid': pd.array([1, 1, 2, 2, 3, None, None], dtype='Int64'),
+            'phase': pd.array(['2', '2', '2', '1', '2', '2', '2'], dtype='str'),
+            'date': np.array(['a', 'a', None, None, 'b', None, None], dtype=object),
+            'old_service_number': ['x', 'y', 'z', 'z', 'w', 'v', 'v'],
+        })
+
+    def test_matches_drop_duplicates(self):
+        unique, collapsed = Dedup('all').unique(self.df)
+        pd.testing.assert_frame_equal(unique, self.df.drop_duplicates())
+        self.assertEqual(collapsed, 1)
+
+    def test_identity_columns(self):
+        columns = ['fdbid', 'phase', 'date']
+        unique, collapsed = Dedup('circuits', tuple(columns)).unique(self.df)
+        pd.testing.assert_frame_equal(unique, self.df.drop_duplicates(subset=columns))
+        self.assertEqual(collapsed, 2)
+
+    def test_equal_rows_hash_equal_across_frames(self):
+        dedup = Dedup('circuits', ('fdbid', 'phase', 'date'))
+        hashes = dedup.hashes(self.df)
+        np.testing.assert_array_equal(dedup.hashes(self.df.iloc[::-1])[::-1], hashes)
+        self.assertEqual(len(set(hashes.tolist())), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+import pandas as pd
+from fdb_key import (add_fdb_key, in_key_index, join_on_fdbid, key_index, listed_ids,
+                     to_fdb_key)
+
+
+class TestFdbKey(unittest.TestCase):
+    def test_str_int_and_float_ids_share_one_key(self):
+        for fdbids in (['1589779', 'TBD'], [1589779, None], [1589779.0, None]):
+            keys, _ = to_fdb_key(pd.Series(fdbids, dtype=object))
+            self.assertEqual(keys.dtype, 'Int64')
+            self.assertEqual(keys[0], 1589779)
+            self.assertTrue(pd.isna(keys[1]))
+
+    def test_odd_ids_keep_their_text_and_still_join(self):
+        left = add_fdb_key(pd.DataFrame({'fdbid': ['12-34', '1589779', 'TBD'], 'a': [1, 2, 3]}))
+        right = add_fdb_key(pd.DataFrame({'fdbid': ['1589779', '12-34', 'TBD'], 'b': [4, 5, 6]}))
+        self.assertEqual(list(left['fdbid_raw'].dropna()), ['12-34'])
+        joined = join_on_fdbid(left, right).set_index('a')
+        self.assertEqual(joined.loc[1, 'b'], 5)
+        self.assertEqual(joined.loc[2, 'b'], 4)
+        # Placeholder ids never join with each other
+        self.assertTrue(pd.isna(joined.loc[3, 'b']))
+
+    def test_placeholders_are_listed(self):
+        listed = listed_ids(pd.Series(['1589779', 'TBD', '-', None], dtype=object))
+        self.assertEqual(listed.count(), 3)
+
+    def test_key_index_membership(self):
+        keys, _ = to_fdb_key(pd.Series(['1589779', '1', 'TBD']))
+        self.assertEqual(list(in_key_index(keys, key_index([1589779, 1388480]))),
+                         [True, False, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from frame_cache import FrameCache
+
+
+class TestFrameCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, 'source.csv')
+        self.other = os.path.join(self.tmp.name, 'other.csv')
+        for path in (self.source, self.other):
+            with open(path, 'w') as file:
+                file.write('fdbid,nrc\n1589779,10.00\n')
+        self.cache = FrameCache(os.path.join(self.tmp.name, 'cache'))
+        self.loads = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def loader(self, path):
+        def load():
+            self.loads += 1
+            return pd.read_csv(path, dtype=str)
+        return load
+
+    def test_warm_load_skips_loader(self):
+        cold = self.cache.load('sample', self.source, self.loader(self.source))
+        warm = self.cache.load('sample', self.source, self.loader(self.source))
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(self.cache.hits, 1)
+        pd.testing.assert_frame_equal(cold, warm)
+
+    def test_changed_file_only_invalidates_its_entry(self):
+        self.cache.load('sample', self.source, self.loader(self.source))
+        self.cache.load('sample', self.other, self.loader(self.other))
+        with open(self.source, 'a') as file:
+            file.write('1599136,20.00\n')
+        changed = self.cache.load('sample', self.source, self.loader(self.source))
+        self.cache.load('sample', self.other, self.loader(self.other))
+        self.assertEqual(len(changed), 2)
+        self.assertEqual(self.loads, 3)
+
+    def test_touched_file_with_same_content_is_a_hit(self):
+        self.cache.load('sample', self.source, self.loader(self.source))
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.cache.load('sample', self.source, self.loader(self.source))
+        self.assertEqual(self.loads, 1)
+
+    def test_mixed_type_frames_are_pickled(self):
+        mixed = lambda: pd.DataFrame({'date': ['2025-01-01', pd.Timestamp(2099, 1, 1)]})
+        first = self.cache.load('mixed', self.source, mixed)
+        second = self.cache.load('mixed', self.source, mixed)
+        self.assertEqual(list(first['date']), list(second['date']))
+        self.assertEqual(self.cache.hits, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from data_context import DataContext, get_context, set_context
+from frame_cache import FrameCache
+from frame_memory import compact_frame, memory_report
+from report_runner import ReportRunner
+from synthetic_data import generate
+
+
+class TestCompactFrame(unittest.TestCase):
+    def test_column_layout(self):
+        df = pd.DataFrame({
+            'fdbid': pd.array([1, 2, 3, 4], dtype='Int64'),
+            'phase': np.array(['1', '2', '2', None], dtype=object),
+            'site_name': ['a', 'b', 'c', 'd'],
+            'mrc': [12345.0, 2.0, np.nan, 4.0],
+        })
+        compact = compact_frame(df)
+        self.assertEqual(compact['fdbid'].dtype, 'Int64')
+        self.assertIsInstance(compact['phase'].dtype, pd.CategoricalDtype)
+        self.assertIsInstance(compact['site_name'].dtype, pd.StringDtype)
+        # Exact in float32 too, but summed by vendor
+        self.assertEqual(compact['mrc'].dtype, np.float64)
+        self.assertEqual(compact['phase'].tolist()[:3], ['1', '2', '2'])
+        self.assertTrue(pd.isna(compact['phase'][3]))
+        self.assertEqual(memory_report({'df': df})['rows'].tolist(), [4])
+
+
+class TestCompactReports(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = generate(self.tmp.name)
+        self.previous = get_context()
+
+    def tearDown(self):
+        set_context(self.previous)
+        self.tmp.cleanup()
+
+    def test_reports_do_not_change(self):
+        tables = {}
+        for compact in (False, True):
+            set_context(DataContext(frame_cache=FrameCache(enabled=False),
+                                    compact_frames=compact, **self.paths))
+            tables[compact] = ReportRunner().run()
+        for name in ('sdc_table', 'plant_table', 'rd_table', 'overview'):
+            pd.testing.assert_frame_equal(tables[True][name], tables[False][name])
+        merged = ReportRunner().run(['interface'])['interface'].merged_sl_tipne
+        self.assertIsInstance(merged['new_provider'].dtype, pd.CategoricalDtype)
+
+    def test_whole_dollar_costs_do_not_change(self):
+        # Whole dollar costs survive a float32 round trip, their vendor totals do not
+        path = os.path.join(self.paths['splunk_path'], 'site_list.csv')
+        site_list = pd.read_csv(path, dtype=str)
+        def whole_dollars(values):
+            return (values * 10_000).round().clip(upper=2**24 - 1).astype('Int64')
+        site_list['mrc'] = whole_dollars(pd.to_numeric(site_list['mrc']))
+        old_mrc = pd.to_numeric(site_list['old_mrc'], errors='coerce')
+        site_list['old_mrc'] = site_list['old_mrc'].where(
+            old_mrc.isna(), whole_dollars(old_mrc).astype(str))
+        site_list.to_csv(path, index=False)
+        tables = {}
+        for compact in (False, True):
+            set_context(DataContext(frame_cache=FrameCache(enabled=False),
+                                    compact_frames=compact, **self.paths))
+            tables[compact] = ReportRunner().run()
+        for name in ('sdc_table', 'plant_table', 'rd_table', 'overview'):
+            pd.testing.assert_frame_equal(tables[True][name], tables[False][name],
+                                          check_exact=True)
+        self.assertGreater(tables[True]['sdc_table']['yearly_cost'].max(), 2**24)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from data_context import DataContext, get_context, set_context
+from frame_cache import FrameCache
+from history_store import HistoryStore
+from report_runner import ReportRunner
+from synthetic_data import generate
+
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = generate(self.tmp.name)
+        self.history_path = os.path.join(self.tmp.name, 'history.sqlite')
+        self.previous = get_context()
+
+    def tearDown(self):
+        set_context(self.previous)
+        self.tmp.cleanup()
+
+    def run_reports(self):
+        set_context(DataContext(frame_cache=FrameCache(enabled=False),
+                                history_path=self.history_path, **self.paths))
+        return ReportRunner().run()
+
+    def test_runs_are_recorded_once_per_source_files(self):
+        results = self.run_reports()
+        self.assertEqual(self.run_reports()['history'], results['history'])
+        store = HistoryStore(self.history_path)
+        self.assertEqual(len(store.runs()), 1)
+
+        sdc = store.trend('SDC', metrics=['Assigned'])
+        expected = results['sdc_table'].set_index('new_vendor')['Assigned']
+        self.assertEqual(sdc.set_index('vendor')['value'].to_dict(),
+                         expected.astype(float).to_dict())
+        self.assertEqual(set(store.trend()['report']), {'SDC', 'Plant', 'RD'})
+
+    def test_vendor_trend_over_a_time_range(self):
+        store = HistoryStore(self.history_path)
+        table = pd.DataFrame({'new_vendor': ['Lumen', 'Comcast'], 'Assigned': [3, 4]})
+        for day, assigned in (('2026-01-01', 3), ('2026-02-01', 5), ('2026-03-01', 8)):
+            store.record({'SDC': table.assign(Assigned=[assigned, 1])}, {'SDC': 'new_vendor'},
+                         {'site_list': {'sha256': day}}, run_at=day)
+        trend = store.vendor_trend('SDC', 'Lumen', start='2026-01-15')
+        self.assertEqual(trend['Assigned'].tolist(), [5.0, 8.0])
+        self.assertEqual(len(store.runs(end='2026-01-31')), 1)
+
+    def test_a_run_without_tables_is_recorded(self):
+        store = HistoryStore(self.history_path)
+        run_id = store.record({}, {}, {'site_list': {'sha256': 'a'}}, run_at='2026-01-01')
+        self.assertEqual(store.runs()['run_id'].tolist(), [run_id])
+        self.assertTrue(store.trend().empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from aggregation import Metric
+from incremental import IncrementalAggregate
+
+
+def sample_frame(rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    fdbids = rng.integers(1000, 1150, rows).astype(str).astype(object)
+    fdbids[::37] = np.nan
+    return pd.DataFrame({
+        'fdbid': fdbids,
+        'new_vendor': rng.choice(['Lumen', 'Comcast', 'Verizon'], rows),
+        'status': rng.choice(['Complete', 'Ordered', None], rows),
+        'yearly_cost': rng.integers(0, 5000, rows) / 4,
+    })
+
+
+def full_aggregate(df):
+    deployed = df[df['status'].str.contains('Complete', na=False)]
+    return (df.groupby('new_vendor')
+            .agg(sites=('fdbid', 'nunique'), rows=('fdbid', 'count'), cost=('yearly_cost', 'sum'))
+            .join(deployed.groupby('new_vendor')['fdbid'].nunique().rename('deployed'))
+            .fillna(0)
+            .reset_index())
+
+
+class TestIncrementalAggregate(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def aggregate(self):
+        return IncrementalAggregate('sample', 'new_vendor', [
+            Metric('sites', 'fdbid', 'nunique'),
+            Metric('rows', 'fdbid', 'count'),
+            Metric('cost', 'yearly_cost', 'sum'),
+            Metric('deployed', 'fdbid', 'nunique', mask='is_deployed'),
+        ], state_dir=self.tmp.name)
+
+    def run_update(self, df):
+        return self.aggregate().update(
+            df.assign(is_deployed=df['status'].str.contains('Complete', na=False)))
+
+    def assert_matches_full_run(self, result, df):
+        expected = full_aggregate(df)
+        pd.testing.assert_frame_equal(result[expected.columns], expected,
+                                      check_dtype=False, rtol=1e-9)
+
+    def test_update_matches_full_aggregation_after_changes(self):
+        df = sample_frame()
+        self.assert_matches_full_run(self.run_update(df), df)
+
+        changed = df.copy()
+        changed.loc[5, 'status'] = 'Complete'
+        changed.loc[6, 'new_vendor'] = 'Hughes'
+        changed = pd.concat([changed.drop(index=[7, 8]), sample_frame(3, seed=1)],
+                            ignore_index=True)
+        aggregate = self.aggregate()
+        result = aggregate.update(
+            changed.assign(is_deployed=changed['status'].str.contains('Complete', na=False)))
+        self.assert_matches_full_run(result, changed)
+        self.assertLess(aggregate.changed_keys, 15)
+
+    def test_unchanged_input_touches_no_keys(self):
+        df = sample_frame()
+        self.run_update(df)
+        aggregate = self.aggregate()
+        aggregate.update(df.sample(frac=1, random_state=2).assign(
+            is_deployed=lambda d: d['status'].str.contains('Complete', na=False)))
+        self.assertEqual(aggregate.changed_keys, 0)
+
+    def test_changed_null_keys_are_aggregated_again(self):
+        metrics = [Metric('cost', 'yearly_cost', 'sum'), Metric('rows', 'fdbid', 'count')]
+        df = pd.DataFrame({
+            'fdbid': pd.array([1, 2, None, None], dtype='Int64'),
+            'new_vendor': ['a', 'b', 'b', 'a'],
+            'yearly_cost': [1.0, 3.0, 4.0, 5.0],
+        })
+        IncrementalAggregate('nulls', 'new_vendor', metrics, state_dir=self.tmp.name).update(df)
+        changed = df.copy()
+        changed.loc[2, 'yearly_cost'] = 40.0
+        aggregate = IncrementalAggregate('nulls', 'new_vendor', metrics, state_dir=self.tmp.name)
+        result = aggregate.update(changed)
+        self.assertEqual(aggregate.changed_keys, 1)
+        self.assertEqual(result['cost'].tolist(), [6.0, 43.0])
+        self.assertEqual(result['rows'].tolist(), [1, 1])
+
+    def test_state_of_other_metrics_is_discarded(self):
+        df = sample_frame()
+        self.run_update(df)
+        renamed = IncrementalAggregate('sample', 'new_vendor', [
+            Metric('Assigned', 'fdbid', 'nunique'),
+            Metric('cost', 'yearly_cost', 'sum'),
+        ], state_dir=self.tmp.name)
+        self.assertIsNone(renamed.load())
+        result = renamed.update(df)
+        self.assertEqual(renamed.changed_keys, df['fdbid'].nunique(dropna=False))
+        expected = full_aggregate(df)
+        self.assertEqual(result['Assigned'].tolist(), expected['sites'].tolist())
+        self.assertEqual(result['cost'].tolist(), expected['cost'].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import threading
+import unittest
+import pandas as pd
+from instrumentation import Tracer
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.tracer = Tracer()
+
+        @self.tracer.traced('head')
+        def head(df: pd.DataFrame, rows: int) -> pd.DataFrame:
+            return df.head(rows)
+        self.head = head
+        self.df = pd.DataFrame({'fdbid': range(10)})
+
+    def test_disabled_records_nothing(self):
+        with self.tracer.stage('block') as record:
+            record.rows_out = 3
+        self.assertEqual(len(self.head(self.df, 2)), 2)
+        self.assertEqual(self.tracer.events, [])
+
+    def test_records_rows_and_nesting(self):
+        self.tracer.enable(memory=True)
+        try:
+            with self.tracer.stage('outer', rows_in=10) as record:
+                self.head(self.df, 4)
+                record.rows_out = 4
+        finally:
+            self.tracer.disable()
+        events = {event['name']: event for event in self.tracer.events}
+        self.assertEqual((events['head']['rows_in'], events['head']['rows_out']), (10, 4))
+        self.assertEqual(events['outer']['rows_out'], 4)
+        self.assertIsNotNone(events['head']['memory_delta_mb'])
+        self.assertGreaterEqual(events['outer']['seconds'], events['head']['seconds'])
+
+    def test_chrome_trace_per_thread(self):
+        self.tracer.enable()
+        worker = threading.Thread(target=self.head, args=(self.df, 1))
+        worker.start()
+        worker.join()
+        self.head(self.df, 2)
+        self.tracer.disable()
+        trace = self.tracer.chrome_trace()['traceEvents']
+        self.assertEqual([event['ph'] for event in trace], ['X', 'X'])
+        self.assertEqual({event['tid'] for event in trace}, {0, 1})
+        summary = self.tracer.summary()
+        self.assertEqual(summary.loc[0, 'calls'], 2)
+        self.assertEqual(summary.loc[0, 'rows_out'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
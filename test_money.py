@@ -0,0 +1,40 @@
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+import money
+from money import parse_money
+
+NRCS = pd.Series(['$1,234.56', '1234.56', '-', 'TBD', '', None, '$.12', '$1,234.567',
+                  'quote $12.30 incl. tax', ' $5.00 ', '12.5', '$99,999,999,999.99',
+                  '$123456789012345678.00', '$1,2,3.45', '$$1.00'] * 3, dtype=object)
+
+
+class TestParseMoney(unittest.TestCase):
+    def test_matches_the_regex_extract(self):
+        expected = (NRCS.astype(str).str.extract(r'([\d,]+\.\d{2})')[0]
+                    .str.replace(',', '', regex=False).astype(float))
+        pd.testing.assert_series_equal(parse_money(NRCS), expected, check_names=False)
+
+    def test_numeric_fallback_and_placeholders(self):
+        old_mrcs = pd.Series(['12.5', '100', '-', 'TBD', '$1,000.00', None, 'n/a'],
+                             index=range(10, 17))
+        result = parse_money(old_mrcs, fallback='numeric')
+        self.assertEqual(list(result.index), list(old_mrcs.index))
+        np.testing.assert_array_equal(result, [12.5, 100, np.nan, np.nan, 1000, np.nan, np.nan])
+
+    def test_long_values_skip_the_char_matrix(self):
+        values = pd.Series(['$1,234.56'] * 100 + ['call vendor ' * 300 + '$12.30'], dtype=object)
+        with mock.patch('money._fast_chunk', wraps=money._fast_chunk) as fast_chunk:
+            result = parse_money(values)
+        self.assertEqual(fast_chunk.call_args[0][0].dtype.itemsize // 4,
+                         money.MAX_AMOUNT_CHARS + 1)
+        self.assertEqual(result.iloc[-1], 12.30)
+        self.assertEqual(result.iloc[0], 1234.56)
+
+    def test_numeric_columns_pass_through(self):
+        self.assertEqual(parse_money(pd.Series([1, 2.5])).tolist(), [1.0, 2.5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import numpy as np
+import pandas as pd
+from phase_partitions import PhasePartitions
+
+
+class TestPhasePartitions(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'phase': pd.array(['1', '2', None, 'LEO', '2', 'Cancelled', '1'], dtype='str'),
+            'fdbid': range(7),
+        })
+        self.partitions = PhasePartitions(self.df, order=('2', '1', '3', 'LEO'))
+
+    def test_phase_rows_match_a_scan(self):
+        self.assertEqual(self.partitions.phases, ['2', '1', 'LEO', 'Cancelled'])
+        for phase in self.partitions.phases:
+            pd.testing.assert_frame_equal(self.partitions.get(phase),
+                                          self.df[self.df['phase'] == phase])
+        self.assertTrue(self.partitions.get('3').empty)
+        self.assertIs(self.partitions.get('2'), self.partitions.get('2'))
+        self.assertEqual(self.partitions.counts(), {'2': 2, '1': 2, 'LEO': 1, 'Cancelled': 1})
+
+    def test_neighbouring_phases_are_one_slice(self):
+        rows = self.partitions.select(['LEO', '1', '3'])
+        self.assertEqual(rows['fdbid'].tolist(), [0, 6, 3])
+        self.assertTrue(np.shares_memory(rows['fdbid'].to_numpy(),
+                                         self.partitions.frame['fdbid'].to_numpy()))
+        # Phases apart in the sort order are concatenated
+        self.assertEqual(self.partitions.select(['2', 'LEO'])['fdbid'].tolist(), [1, 4, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
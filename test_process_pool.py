@@ -0,0 +1,64 @@
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+import process_pool
+from aggregation import Metric, aggregate
+from data_context import DataContext, get_context, set_context
+from frame_cache import FrameCache
+from process_pool import from_ipc, to_ipc
+from site_tracking import Site
+from synthetic_data import generate
+
+
+class TestProcessPool(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = generate(self.tmp.name)
+        self.previous = get_context()
+
+    def tearDown(self):
+        set_context(self.previous)
+        self.tmp.cleanup()
+
+    def use_pool(self, workers):
+        set_context(DataContext(frame_cache=FrameCache(enabled=False),
+                                process_workers=workers, **self.paths))
+
+    def test_ipc_keeps_dtypes(self):
+        df = pd.DataFrame({'fdbid': pd.array([1, None, 3], dtype='Int64'),
+                           'vendor': pd.array(['a', None, 'c'], dtype='str'),
+                           'cost': [1.5, float('nan'), 2.0]})
+        pd.testing.assert_frame_equal(from_ipc(to_ipc(df)), df)
+
+    def test_single_core_runs_serial(self):
+        self.use_pool(4)
+        with mock.patch('process_pool.os.cpu_count', return_value=1):
+            self.assertEqual(process_pool.pool_workers(10 ** 6), 0)
+        with mock.patch('process_pool.os.cpu_count', return_value=8):
+            self.assertEqual(process_pool.pool_workers(10 ** 6), 4)
+            self.assertEqual(process_pool.pool_workers(10), 0)
+
+    def test_pool_matches_serial(self):
+        self.use_pool(None)
+        site_list = Site.read_csv(self.paths['splunk_path'] + 'site_list.csv')
+        serial = Site().format_site_list(site_list)
+        metrics = [Metric('sites', 'fdbid', 'nunique'), Metric('cost', 'yearly_cost', 'sum')]
+        # A distinct count of another column than fdbid needs the rows split by group
+        group_metrics = [Metric('sites', 'fdbid', 'count'), Metric('states', 'state', 'nunique')]
+        by_key = aggregate(serial, 'new_vendor', metrics)
+        by_group = aggregate(serial, 'new_vendor', group_metrics)
+
+        self.use_pool(2)
+        with mock.patch.object(process_pool, 'PROCESS_MIN_ROWS', 100), \
+                mock.patch('process_pool.os.cpu_count', return_value=2):
+            pooled = Site().format_site_list(site_list)
+            pd.testing.assert_frame_equal(pooled, serial)
+            with mock.patch('aggregation.aggregate_partitioned',
+                            wraps=process_pool.aggregate_partitioned) as partitioned:
+                pd.testing.assert_frame_equal(aggregate(serial, 'new_vendor', metrics), by_key)
+                pd.testing.assert_frame_equal(aggregate(serial, 'new_vendor', group_metrics),
+                                              by_group)
+            keys = [call.kwargs['key'] for call in partitioned.call_args_list]
+            self.assertIsNotNone(keys[0])
+            self.assertIsNone(keys[1])
@@ -0,0 +1,84 @@
+import tempfile
+import threading
+import unittest
+import pandas as pd
+from data_context import DataContext, get_context, set_context
+from frame_cache import FrameCache
+from plants import Plant
+from rd import RD
+from report_runner import Node, ReportRunner
+from sdc_class import Sdc
+from synthetic_data import generate
+
+
+class TestScheduler(unittest.TestCase):
+    def test_shared_nodes_run_once_and_siblings_overlap(self):
+        calls = []
+        both_started = threading.Barrier(2, timeout=5)
+
+        def leaf(name):
+            def function(results):
+                calls.append(name)
+                both_started.wait()
+                return 1
+            return function
+
+        nodes = [Node('a', leaf('a')), Node('b', leaf('b')),
+                 Node('c', lambda results: results['a'] + results['b'], ('a', 'b')),
+                 Node('d', lambda results: results['c'] * 10, ('c',)),
+                 Node('e', lambda results: results['c'] + results['d'], ('c', 'd'))]
+        results = ReportRunner(nodes).run(['e'])
+        self.assertEqual(results['e'], 22)
+        self.assertEqual(sorted(calls), ['a', 'b'])
+
+    def test_cycles_and_failures(self):
+        with self.assertRaises(ValueError):
+            ReportRunner([Node('a', len, ('b',)), Node('b', len, ('a',))]).order()
+        with self.assertRaises(ZeroDivisionError):
+            ReportRunner([Node('a', lambda results: 1 / 0)]).run()
+
+
+class TestReportRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = generate(self.tmp.name)
+        self.previous = get_context()
+
+    def tearDown(self):
+        set_context(self.previous)
+        self.tmp.cleanup()
+
+    def test_tables_match_the_standalone_reports(self):
+        set_context(DataContext(frame_cache=FrameCache(enabled=False), **self.paths))
+        results = ReportRunner().run()
+        self.assertTrue(all(count == 1 for count in get_context().load_counts.values()))
+
+        set_context(DataContext(frame_cache=FrameCache(enabled=False), **self.paths))
+        pd.testing.assert_frame_equal(results['sdc_table'], Sdc().merge_count_costs())
+        overview = results['overview']
+        self.assertEqual(overview['SDC Assigned'].sum(), results['sdc_table']['Assigned'].sum())
+        self.assertEqual(overview['Assigned'].sum(),
+                         overview[['SDC Assigned', 'Plant Assigned', 'RD Assigned']].sum().sum())
+
+    def test_placeholder_fdbids_are_counted(self):
+        set_context(DataContext(frame_cache=FrameCache(enabled=False), **self.paths))
+        rd = RD()
+        table = rd.merge().set_index('new_provider')
+        # The synthetic tipne has 'TBD' ids but no blank ones, so every row counts
+        self.assertGreater(rd.rd_df['fdbid'].isna().sum(), 0)
+        pd.testing.assert_series_equal(table['assigned'],
+                                       rd.rd_df.groupby('new_provider').size(),
+                                       check_names=False)
+        plant = Plant()
+        plants = plant.merge_tipne()
+        self.assertGreater(plants['fdbid'].isna().sum(), 0)
+        self.assertEqual(plant.group_by_vendor()['Assigned'].sum(), len(plants))
+
+    def test_rd_incremental_merge_matches_merge(self):
+        set_context(DataContext(frame_cache=FrameCache(enabled=False), **self.paths))
+        rd = RD()
+        pd.testing.assert_frame_equal(rd.incremental_merge(self.tmp.name + '/state'), rd.merge())
+
+
+if __name__ == '__main__':
+    unittest.main()
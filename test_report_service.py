@@ -0,0 +1,88 @@
+import io
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from pathlib import Path
+from unittest import mock
+import pandas as pd
+from data_context import DataContext, get_context, set_context
+from frame_cache import FrameCache
+from report_service import ReportService
+from synthetic_data import generate
+
+
+class TestReportService(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = generate(self.tmp.name)
+        self.previous = get_context()
+        set_context(DataContext(frame_cache=FrameCache(enabled=False), **self.paths))
+        self.service = ReportService()
+        self.server = self.service.serve(port=0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/tables/'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        set_context(self.previous)
+        self.tmp.cleanup()
+
+    def get(self, path, etag=None):
+        request = urllib.request.Request(self.url + path)
+        if etag:
+            request.add_header('If-None-Match', etag)
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.headers.get('ETag'), response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.headers.get('ETag'), b''
+
+    def test_concurrent_refreshes_run_the_pipeline_once(self):
+        threads = [threading.Thread(target=self.service.refresh) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.service.runs, 1)
+
+    def test_etags_follow_the_source_files(self):
+        self.service.refresh()
+        status, etag, body = self.get('sdc_table.csv')
+        self.assertEqual(status, 200)
+        table = pd.read_csv(io.BytesIO(body))
+        self.assertEqual(list(table.columns[:3]), ['new_vendor', 'Assigned', 'Deployed'])
+        self.assertEqual(self.get('sdc_table.csv', etag)[0], 304)
+        parquet = pd.read_parquet(io.BytesIO(self.get('plant_table.parquet')[2]))
+        self.assertEqual(len(parquet), len(self.service.current().tables['plant_table']))
+        self.assertEqual(self.get('missing.csv')[0], 404)
+
+        share = Path(self.paths['share_path'])
+        msp = pd.read_csv(share / 'MSP_Status_2025-06-01.csv')
+        msp.head(10).to_csv(share / 'MSP_Status_2025-06-08.csv', index=False)
+        self.service.refresh()
+        status, new_etag, _ = self.get('sdc_table.csv', etag)
+        self.assertEqual(status, 200)
+        self.assertNotEqual(new_etag, etag)
+        self.assertEqual(self.service.runs, 2)
+
+    def test_refresh_after_a_failure_republishes(self):
+        first = self.service.refresh()
+        share = Path(self.paths['share_path'])
+        msp = pd.read_csv(share / 'MSP_Status_2025-06-01.csv')
+        msp.head(10).to_csv(share / 'MSP_Status_2025-06-08.csv', index=False)
+        runner = self.service.watcher.runner
+        with mock.patch.object(runner, 'run', side_effect=OSError('share hiccup')):
+            with self.assertRaises(OSError):
+                self.service.refresh()
+        self.assertIs(self.service.current(), first)
+        second = self.service.refresh()
+        self.assertIsNot(second, first)
+        self.assertNotEqual(second.etag('plant_table', 'csv'), first.etag('plant_table', 'csv'))
+        self.assertEqual(self.service.runs, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,26 @@
+import tempfile
 import unittest
 import pandas as pd
+from data_context import DataContext, get_context, set_context
+from frame_cache import FrameCache
 from sdc_class import Sdc
+from synthetic_data import generate
 
 class TestSdc(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Runs against synthetic exports instead of the Splunk folder and the share
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.previous = get_context()
+        cls.paths = generate(cls.tmp.name)
+        cls.context = set_context(DataContext(frame_cache=FrameCache(enabled=False),
+                                              **cls.paths))
+
+    @classmethod
+    def tearDownClass(cls):
+        set_context(cls.previous)
+        cls.tmp.cleanup()
+
     def setUp(self):
         self.sdc = Sdc()
 
@@ -56,5 +74,19 @@ class TestSdc(unittest.TestCase):
         self.assertIn('fdbid', deployed.columns)
         self.assertTrue((deployed['fdbid'] >= 0).all())
 
+    def test_merged_df_is_lazy(self):
+        # Sassy: Nobody asked for the data yet, so nobody gets read
+        context = set_context(DataContext(frame_cache=FrameCache(enabled=False), **self.paths))
+        try:
+            sdc = Sdc()
+            self.assertEqual(sum(context.load_counts.values()), 0)
+            merged = sdc.merged_df
+            self.assertIs(sdc.merged_df, merged)
+            sdc.invalidate()
+            self.assertIsNot(sdc.merged_df, merged)
+            self.assertEqual(context.load_counts['site_list'], 1)
+        finally:
+            set_context(self.context)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+from share_index import ShareIndex
+
+
+class TestShareIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        files = {
+            'MSP_2025_01.csv': 100,
+            'MSP_2025_02.csv': 200,
+            'LEO_MSP_2025_03.csv': 300,
+            'Comcast_site_tracking_old.csv': 100,
+            'Comcast_site_tracking.csv': 150,
+        }
+        for name, mtime in files.items():
+            path = os.path.join(self.tmp.name, name)
+            open(path, 'w').close()
+            os.utime(path, (mtime, mtime))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_latest_many_uses_one_scan(self):
+        index = ShareIndex(self.tmp.name)
+        latest = index.latest_many(['msp', 'Comcast_site_tracking', 'Hughes_site_tracking'])
+        self.assertEqual(latest['msp'].name, 'MSP_2025_02.csv')
+        self.assertEqual(latest['Comcast_site_tracking'].name, 'Comcast_site_tracking.csv')
+        self.assertIsNone(latest['Hughes_site_tracking'])
+        index.latest('msp')
+        self.assertEqual(index.scans, 1)
+
+    def test_ttl_expiry_rescans(self):
+        index = ShareIndex(self.tmp.name, ttl=0)
+        index.latest('msp')
+        open(os.path.join(self.tmp.name, 'MSP_2025_04.csv'), 'w').close()
+        self.assertEqual(index.latest('msp').name, 'MSP_2025_04.csv')
+        self.assertEqual(index.scans, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from share_mirror import ShareMirror
+
+
+class TestShareMirror(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.share = os.path.join(self.tmp.name, 'share')
+        os.mkdir(self.share)
+        self.source = os.path.join(self.share, 'Comcast_site_tracking.csv')
+        with open(self.source, 'w') as file:
+            file.write('FDB,Vendor_Status\n1589779,Complete\n')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_unchanged_files_are_not_copied_again(self):
+        mirror = ShareMirror(os.path.join(self.tmp.name, 'mirror'))
+        mirror.sync([self.source])
+        mirror.sync([self.source])
+        self.assertEqual(mirror.copies, 1)
+        with open(self.source, 'a') as file:
+            file.write('1599136,Ordered\n')
+        local = mirror.sync([self.source])
+        self.assertEqual(mirror.copies, 2)
+        self.assertEqual(len(pd.read_csv(list(local.values())[0])), 2)
+
+    def test_compressed_copy_reads_like_the_source(self):
+        mirror = ShareMirror(os.path.join(self.tmp.name, 'mirror'), compress=True)
+        local = list(mirror.sync([self.source]).values())[0]
+        self.assertTrue(str(local).endswith('.csv.gz'))
+        pd.testing.assert_frame_equal(pd.read_csv(local), pd.read_csv(self.source))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+import pandas as pd
+from data_context import DataContext, get_context, set_context
+from frame_cache import FrameCache
+from site_tracking import ClassInterface, Tipne
+
+TIPNE_CSV = ('fdbid,new_provider,phase,status,cutover_completed_date,old_service_number,notes\n'
+             '1589779,Lumen,2,Cutover Full - Complete,2025-01-01,A1,x\n'
+             'TBD,Comcast,4,Ordered,,B2,y\n'
+             '1388480,Verizon,Cancelled,Ordered,,C3,z\n'
+             '1000001-2,Hughes,LEO,In Progress,,D4,\n'
+             '1000001,Granite,1,cutover mc complete,2025-03-04,E5,\n'
+             '1599136,Lumen,2,Site Survey Scheduled,,F6,\n'
+             '1388480,Lumen,SP,Cutover Complete,2025-02-02,G7,\n')
+
+
+class TestTipneStream(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'tipne.csv')
+        with open(self.path, 'w') as file:
+            file.write(TIPNE_CSV)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_matches_in_memory_read(self):
+        full = Tipne.format_tipne(self.path)
+        pd.testing.assert_frame_equal(Tipne.stream_tipne(self.path, 2, phases=None), full)
+        pd.testing.assert_frame_equal(
+            Tipne.stream_tipne(self.path, 3),
+            full[full['phase'] != 'Cancelled'].reset_index(drop=True))
+
+    def test_context_chunksize_streams(self):
+        previous = get_context()
+        set_context(DataContext(splunk_path=self.tmp.name + os.sep, tipne_chunksize=2,
+                                frame_cache=FrameCache(enabled=False)))
+        try:
+            tipne = Tipne()
+            tipne.get_tipne()
+        finally:
+            set_context(previous)
+        self.assertEqual(len(tipne.tipne_df), 6)
+        self.assertNotIn('notes', tipne.tipne_df.columns)
+
+
+class TestClassInterface(unittest.TestCase):
+    def test_threads_share_one_build(self):
+        interface = ClassInterface()
+        merges = []
+
+        def merge():
+            merges.append(threading.get_ident())
+            time.sleep(0.05)
+            return pd.DataFrame({'phase': ['2', '4'], 'status': ['Cutover Complete', 'Ordered']})
+        interface.merge_tipne_site_list = merge
+        threads = [threading.Thread(target=lambda: interface.merged_phases) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(merges), 1)
+        self.assertEqual(interface.merged_phases.counts(), {'2': 1, '4': 1})
+        interface.invalidate()
+        interface.merged_phases
+        self.assertEqual(len(merges), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
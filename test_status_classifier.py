@@ -0,0 +1,34 @@
+import unittest
+import pandas as pd
+from status_classifier import STATUS_CLASSIFIER
+
+STATUSES = pd.Series(['Cutover Complete', 'Cutover One Circuit Only - Complete',
+                      'CUTOVER FULL - COMPLETE', 'cutover mc complete', 'Complete',
+                      'Ordered', None, 'Ordered', 'Cutover Full - Complete'] * 3)
+
+
+class TestStatusClassifier(unittest.TestCase):
+    def test_matches_row_wise_string_ops(self):
+        lowered = STATUSES.str.lower()
+        expected = {
+            'is_cutover': lowered.str.contains(
+                'cutover complete|cutover one circuit only|cutover mc complete', na=False),
+            'is_deployed': lowered.str.contains('complete', na=False),
+            'is_complete': lowered.isin(['cutover one circuit only - complete',
+                                         'cutover full - complete']),
+            'is_msp_complete': lowered.isin(['complete', 'cutover one circuit only - complete',
+                                             'cutover full - complete']),
+        }
+        flags = STATUS_CLASSIFIER.classify(STATUSES)
+        for rule, values in expected.items():
+            self.assertEqual(list(flags[rule]), list(values.astype(bool)), rule)
+
+    def test_keeps_index_and_accepts_categoricals(self):
+        statuses = STATUSES.astype('category').set_axis(range(100, 100 + len(STATUSES)))
+        flags = STATUS_CLASSIFIER.flag(statuses, 'is_cutover')
+        self.assertEqual(list(flags.index), list(statuses.index))
+        self.assertEqual(flags.dtype, bool)
+
+
+if __name__ == '__main__':
+    unittest.main()
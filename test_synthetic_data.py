@@ -0,0 +1,30 @@
+import tempfile
+import unittest
+import pandas as pd
+from data_context import DataContext
+from synthetic_data import BASE_SITES, generate
+
+
+class TestSyntheticData(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = generate(self.tmp.name, scale=2, seed=1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_site_list_scale_and_messy_values(self):
+        site_list = pd.read_csv(self.paths['splunk_path'] + 'site_list.csv', dtype=str)
+        self.assertEqual(len(site_list), 2 * BASE_SITES)
+        self.assertIn('TBD', set(site_list['fdbid']))
+        self.assertIn('-', set(site_list['old_mrc']))
+        self.assertTrue(site_list['nrc'].str.startswith('$', na=False).any())
+
+    def test_share_resolves_latest_files(self):
+        share_index = DataContext(**self.paths).share_index
+        self.assertTrue(share_index.latest('msp').name.endswith('2025-06-01.csv'))
+        self.assertEqual(len(share_index.files('site_tracking')), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import pandas as pd
+from data_context import DataContext, get_context, set_context
+from frame_cache import FrameCache
+from report_runner import ReportRunner
+from synthetic_data import generate
+from watch import Watcher
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = generate(self.tmp.name)
+        self.previous = get_context()
+        set_context(DataContext(frame_cache=FrameCache(enabled=False), **self.paths))
+
+    def tearDown(self):
+        set_context(self.previous)
+        self.tmp.cleanup()
+
+    def test_only_reports_fed_by_the_new_file_are_refreshed(self):
+        watcher = Watcher()
+        self.assertIn('rd_table', watcher.poll())
+        self.assertEqual(watcher.poll(), set())
+        before = dict(watcher.results)
+
+        # A new MSP drop with only the completed plants
+        share = Path(self.paths['share_path'])
+        msp = pd.read_csv(share / 'MSP_Status_2025-06-01.csv')
+        msp[msp['Vdr_Status'].str.contains('omplete')].to_csv(
+            share / 'MSP_Status_2025-06-08.csv', index=False)
+        ran = watcher.poll()
+        self.assertEqual(ran, {'share', 'msp', 'plant_table', 'overview', 'history'})
+        self.assertIs(watcher.results['sdc_table'], before['sdc_table'])
+        self.assertIs(watcher.results['rd_table'], before['rd_table'])
+
+        set_context(DataContext(frame_cache=FrameCache(enabled=False), **self.paths))
+        fresh = ReportRunner().run(['plant_table'])
+        pd.testing.assert_frame_equal(watcher.results['plant_table'], fresh['plant_table'])
+
+    def test_site_list_change_refreshes_every_table(self):
+        watcher = Watcher()
+        watcher.poll()
+        site_list = os.path.join(self.paths['splunk_path'], 'site_list.csv')
+        with open(site_list, 'a') as file:
+            file.write('1999999,Facility X,TX,Lumen,10.0,$5.00,1.00\n')
+        ran = watcher.poll()
+        self.assertTrue({'site_list', 'sdc_table', 'plant_table', 'rd_table'} <= ran)
+        self.assertNotIn('tipne', ran)
+
+    def test_failed_refresh_is_retried(self):
+        watcher = Watcher(interval=0)
+        watcher.poll()
+        share = Path(self.paths['share_path'])
+        msp = pd.read_csv(share / 'MSP_Status_2025-06-01.csv')
+        msp.head(5).to_csv(share / 'MSP_Status_2025-06-08.csv', index=False)
+        with mock.patch.object(watcher.runner, 'run', side_effect=OSError('half copied')):
+            watcher.run(polls=1)
+        self.assertIn('plant_table', watcher.poll())
+        self.assertEqual(watcher.poll(), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""vendor_schema.py: Registry of the csv layouts read from the TelcoInv share and Splunk"""
+from dataclasses import dataclass, field
+import pandas as pd
+from pandas.api.types import union_categoricals
+from instrumentation import stage
+
+
+@dataclass
+class CsvSchema:
+    """
+    Describes which columns of a csv are needed and how they are named downstream.
+    The header is probed first so only the needed columns are parsed.
+
+    rename maps source headers to the names used downstream. column_sets are the
+    accepted sets of downstream columns, tried in order against the header.
+    """
+    name: str
+    column_sets: list
+    rename: dict = field(default_factory=dict)
+    dtypes: dict = field(default_factory=dict)
+    read_kwargs: dict = field(default_factory=dict)
+
+    def read_header(self, path) -> list:
+        """
+        Reads only the header row of the file
+
+        returns: list of the source column names
+        """
+        return list(pd.read_csv(path, nrows=0, **self.read_kwargs).columns)
+
+    def resolve(self, header: list) -> dict:
+        """
+        Picks the first column set the header can satisfy
+
+        returns: dict of source column name to downstream column name
+        """
+        available: dict = {}
+        for column in header:
+            target = self.rename.get(column, column)
+            # Keep the first source column when two headers rename to the same name
+            available.setdefault(target, column)
+        for columns in self.column_sets:
+            if all(column in available for column in columns):
+                return {available[column]: column for column in columns}
+        raise KeyError(f"{self.name}: none of {self.column_sets} found in header {header}")
+
+    def read_args(self, path) -> tuple:
+        """
+        Probes the header for the columns to parse
+
+        returns: tuple of (dict of source to downstream column name, dict of source dtypes)
+        """
+        source_to_target: dict = self.resolve(self.read_header(path))
+        dtypes: dict = {source: self.dtypes[target]
+                        for source, target in source_to_target.items() if target in self.dtypes}
+        return source_to_target, dtypes
+
+    def read(self, path) -> pd.DataFrame:
+        """
+        Reads just the resolved columns with their declared dtypes
+
+        returns: pd.DataFrame with the downstream column names, in column set order
+        """
+        source_to_target, dtypes = self.read_args(path)
+        with stage(f'read_csv.{self.name}') as record:
+            df = pd.read_csv(path, usecols=list(source_to_target), dtype=dtypes,
+                             **self.read_kwargs)
+            record.rows_out = len(df)
+        return df.rename(columns=source_to_target)[list(source_to_target.values())]
+
+    def read_chunks(self, path, chunksize: int):
+        """
+        Reads the resolved columns like read, chunksize rows at a time, so only one chunk
+        of the raw file is parsed in memory at once
+
+        returns: iterator of pd.DataFrame
+        """
+        source_to_target, dtypes = self.read_args(path)
+        with pd.read_csv(path, usecols=list(source_to_target), dtype=dtypes,
+                         chunksize=chunksize, **self.read_kwargs) as reader:
+            for df in reader:
+                yield df.rename(columns=source_to_target)[list(source_to_target.values())]
+
+    def concat(self, chunks: list) -> pd.DataFrame:
+        """
+        Concatenates frames from read_chunks. Categorical columns are unioned, a plain
+        concat would fall back to object when the chunks saw different categories.
+
+        returns: pd.DataFrame like read would have returned
+        """
+        df = pd.concat(chunks, ignore_index=True)
+        for column, dtype in self.dtypes.items():
+            if dtype == 'category' and column in df.columns and len(chunks):
+                df[column] = union_categoricals([chunk[column] for chunk in chunks],
+                                                sort_categories=True)
+        return df
+
+
+SITE_TRACKING_SCHEMA = CsvSchema(
+    name='site_tracking',
+    rename={
+        'FDB_ID': 'fdbid',
+        'Circuit1_Vdr_Status': 'vdr_status_1',
+        'Circuit2_Vdr_Status': 'vdr_status_2',
+        'FDB': 'fdbid',
+        'Vendor_Status': 'vendor_status',
+    },
+    column_sets=[['fdbid', 'vdr_status_1', 'vdr_status_2'], ['fdbid', 'vendor_status']],
+    # str due to inconsistencies in fdbid. Statuses have few distinct values.
+    dtypes={'fdbid': str, 'vdr_status_1': 'category', 'vdr_status_2': 'category',
+            'vendor_status': 'category'},
+    read_kwargs={'encoding': 'latin1'},
+)
+
+MSP_SCHEMA = CsvSchema(
+    name='msp',
+    column_sets=[['FDB ID', 'Date_Truck Roll 2/MSP_Cmplt', 'Vdr_Status']],
+    dtypes={'FDB ID': str, 'Date_Truck Roll 2/MSP_Cmplt': str, 'Vdr_Status': str},
+    read_kwargs={'encoding': 'latin1'},
+)
+
+TIPNE_SCHEMA = CsvSchema(
+    name='tipne',
+    column_sets=[['fdbid', 'new_provider', 'phase', 'status',
+                  'cutover_completed_date', 'old_service_number']],
+    dtypes={'fdbid': str, 'new_provider': str, 'phase': str, 'status': 'category',
+            'cutover_completed_date': str, 'old_service_number': str},
+)
+
+# Vendors share the site tracking layouts today. Register a vendor here when its
+# export needs its own rename map or column set.
+VENDOR_SCHEMAS: dict = {
+    'Granite': SITE_TRACKING_SCHEMA,
+    'Lumen': SITE_TRACKING_SCHEMA,
+    'Comcast': SITE_TRACKING_SCHEMA,
+    'Verizon': SITE_TRACKING_SCHEMA,
+    'Hughes': SITE_TRACKING_SCHEMA,
+}
+
+
+def get_vendor_schema(vendor: str) -> CsvSchema:
+    """
+    returns: the CsvSchema registered for the vendor, the site tracking schema otherwise
+    """
+    return VENDOR_SCHEMAS.get(vendor, SITE_TRACKING_SCHEMA)
@@ -0,0 +1,166 @@
+"""watch.py: Polls the Splunk folder and the share and refreshes only the reports a changed file feeds"""
+import argparse
+import os
+import time
+from pathlib import Path
+from data_context import get_context
+from instrumentation import traced
+from report_runner import REPORT_TARGETS, TABLE_NODES, ReportRunner, write_tables
+from server_class import Server
+
+# Per kind of source file: the DataContext frame built from it and the graph node that
+# reads it. Every node depending on that node is refreshed with it.
+WATCH_SOURCES: dict = {
+    'site_list': ('site_list', 'site_list'),
+    'tipne': ('tipne', 'tipne'),
+    'vendor': ('sdc_site_tracking', 'vendor_statuses'),
+    'msp': ('msp_plants', 'msp'),
+}
+# Kinds read from the share. A new dated file changes which file is the newest, so the
+# share listing is refreshed along with them.
+SHARE_KINDS = frozenset(['vendor', 'msp'])
+
+
+class Watcher:
+    """
+    Keeps the report graph's results in memory and polls the source files by size and
+    mtime, so no OS specific notification API is needed. When files change only their
+    frames are dropped from the DataContext and only the nodes depending on them are run
+    again; every other frame and table is reused as is.
+
+    on_update is called with the results and the set of refreshed nodes after each run.
+    """
+    def __init__(self, runner: ReportRunner = None, interval: float = 5.0,
+                 targets=REPORT_TARGETS, on_update=None) -> None:
+        self.runner: ReportRunner = runner if runner is not None else ReportRunner()
+        self.interval: float = interval
+        self.targets: tuple = tuple(targets)
+        self.on_update = on_update
+        self.vendor_prefixes: list = [prefix.lower() for prefix in Server().param_dict.values()]
+        self.results: dict = {}
+        self.stats: dict = {}
+
+    def classify(self, name: str) -> str:
+        """
+        returns: the WATCH_SOURCES kind of the file name, None for files no report reads
+        """
+        name = name.lower()
+        context = get_context()
+        if any(word in name for word in context.share_index.exclude):
+            return None
+        if name in ('site_list.csv', 'tipne.csv'):
+            return name[:-len('.csv')]
+        if 'msp' in name:
+            return 'msp'
+        if any(prefix in name for prefix in self.vendor_prefixes):
+            return 'vendor'
+        return None
+
+    def scan(self) -> dict:
+        """
+        Stats the two Splunk exports and lists the share once
+
+        returns: dict of path to (kind, size, mtime_ns)
+        """
+        context = get_context()
+        stats: dict = {}
+        for name in ('site_list.csv', 'tipne.csv'):
+            try:
+                stat = os.stat(context.splunk_path + name)
+                stats[context.splunk_path + name] = (self.classify(name), stat.st_size,
+                                                     stat.st_mtime_ns)
+            except OSError:
+                continue
+        with os.scandir(context.share_path) as listing:
+            for entry in listing:
+                kind = self.classify(entry.name)
+                if kind is None:
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # File removed between the listing and the stat
+                    continue
+                stats[entry.path] = (kind, stat.st_size, stat.st_mtime_ns)
+        return stats
+
+    def changed_kinds(self, stats: dict) -> set:
+        """
+        returns: set of the kinds of the files added, removed or modified since last scan
+        """
+        paths = self.stats.keys() | stats.keys()
+        return {(stats.get(path) or self.stats.get(path))[0]
+                for path in paths if self.stats.get(path) != stats.get(path)}
+
+    @traced('watch.refresh')
+    def refresh(self, kinds) -> set:
+        """
+        Drops the frames of the changed kinds and runs the nodes depending on them
+
+        returns: set of the nodes run
+        """
+        context = get_context()
+        nodes: set = set()
+        for kind in kinds:
+            frame, node = WATCH_SOURCES[kind]
+            context.invalidate(frame)
+            nodes.add(node)
+        stale: set = self.runner.dependents(nodes)
+        if SHARE_KINDS.intersection(kinds):
+            context.share_index.invalidate()
+            # The share node only lists the share, its dependents list it again anyway
+            stale.add('share')
+        reuse: dict = {name: result for name, result in self.results.items()
+                       if name not in stale}
+        self.results = self.runner.run(self.targets, reuse=reuse)
+        ran: set = set(self.runner.timings)
+        if self.on_update is not None:
+            self.on_update(self.results, ran)
+        return ran
+
+    def poll(self) -> set:
+        """
+        Scans once. The first scan runs every target, later ones only what changed.
+        The scan is only kept once the refresh succeeded, so files a failed refresh
+        could not read, e.g. half copied, are refreshed again by the next poll.
+
+        returns: set of the nodes run, empty when nothing changed
+        """
+        stats = self.scan()
+        if not self.results:
+            kinds = set(WATCH_SOURCES)
+        else:
+            kinds = self.changed_kinds(stats)
+        ran = self.refresh(kinds) if kinds else set()
+        self.stats = stats
+        return ran
+
+    def run(self, polls: int = None) -> None:
+        """
+        Polls every interval seconds, forever unless polls is given. A failed poll is
+        reported and retried at the next interval.
+        """
+        count = 0
+        while polls is None or count < polls:
+            started = time.monotonic()
+            try:
+                self.poll()
+            except Exception as error:  # pylint: disable=broad-except
+                print(f"Refresh failed: {error}")
+            count += 1
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--interval', type=float, default=5.0, help='seconds between scans')
+    parser.add_argument('--output-dir', help='write the refreshed tables as csv here')
+    args = parser.parse_args()
+
+    def report(results: dict, ran: set) -> None:
+        tables = [name for name in TABLE_NODES if name in ran]
+        print(f"{time.strftime('%H:%M:%S')} refreshed {', '.join(sorted(ran))}")
+        if args.output_dir and tables:
+            write_tables(results, Path(args.output_dir), tables)
+
+    Watcher(interval=args.interval, on_update=report).run()